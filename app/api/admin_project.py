@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException
-from app.services.storage import storage
+from app.services.storage import async_storage
 
 router = APIRouter(prefix="/admin/project", tags=["Project Management"])
 
 @router.post("/reset")
 async def reset_project():
     try:
-        storage.reset_project()
+        await async_storage.reset_project()
         return {"message": "Project reset successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from app.schemas.data_dictionary import DataField, DataFieldCreate, StandardValue, StandardValueCreate
-from app.services.storage import storage
+from app.database import unit_of_work
+from app.services.storage import async_storage
 from typing import List, Optional
 
 router = APIRouter(prefix="/data-dictionary", tags=["Data Dictionary"])
 
-@router.post("/fields", response_model=DataField)
+@router.post("/fields", response_model=DataField, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_field(field: DataFieldCreate):
-    field_id = storage.add_data_field(field.model_dump())
+    field_id = await async_storage.add_data_field(field.model_dump())
     return (await list_fields(field_id=field_id))[0]
 
 @router.get("/fields", response_model=List[DataField])
@@ -16,7 +17,7 @@ async def list_fields(
     search: Optional[str] = None,
     field_id: Optional[str] = None
 ):
-    fields = storage.get_data_fields()
+    fields = await async_storage.get_data_fields()
     
     if field_id:
         fields = [f for f in fields if f["id"] == field_id]
@@ -51,15 +52,15 @@ async def list_fields(
         
     return fields
 
-@router.post("/standard-values", response_model=StandardValue)
+@router.post("/standard-values", response_model=StandardValue, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_standard_value(sv: StandardValueCreate):
-    if not storage.get_data_field_by_id(sv.field_id):
+    if not await async_storage.get_data_field_by_id(sv.field_id):
         raise HTTPException(status_code=404, detail="Field not found")
-    sv_id = storage.add_standard_value(sv.model_dump())
-    return storage.get_standard_value_by_id(sv_id)
+    sv_id = await async_storage.add_standard_value(sv.model_dump())
+    return await async_storage.get_standard_value_by_id(sv_id)
 
 @router.get("/entities", response_model=List[str])
 async def list_entities():
-    fields = storage.get_data_fields()
+    fields = await async_storage.get_data_fields()
     entities = sorted(list(set(f["entity"] for f in fields)))
     return entities
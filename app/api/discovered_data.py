@@ -1,27 +1,57 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Response
 from app.schemas.discovered_data import DiscoveredDataEntity, DiscoveredDataField
-from app.services.storage import storage
+from app.database import unit_of_work
+from app.services.storage import async_storage
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.responses import trusted_list
 from typing import List, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/discovered-data", tags=["Discovered Data"])
 
 @router.get("", response_model=List[DiscoveredDataEntity])
-async def list_discovered_data_entities(data_source_id: Optional[str] = None):
-    return storage.get_discovered_data_entities(data_source_id=data_source_id)
+async def list_discovered_data_entities(
+    response: Response,
+    data_source_id: Optional[str] = None,
+    data_entity_name: Optional[str] = None,
+    status: Optional[str] = None,
+    source_type: Optional[str] = None,
+    user: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    field_name: Optional[str] = None,
+    field_value: Optional[str] = None,
+    page: Page = Depends(page_params)
+):
+    filters = {
+        "data_source_id": data_source_id,
+        "data_entity_name": data_entity_name,
+        "status": status,
+        "source_type": source_type,
+        "user": user,
+        "created_from": created_from.strftime("%Y-%m-%d %H:%M:%S") if created_from else None,
+        "created_to": created_to.strftime("%Y-%m-%d %H:%M:%S") if created_to else None,
+        "field_name": field_name,
+        "field_value": field_value
+    }
+    filters = {key: value for key, value in filters.items() if value is not None}
+    rows = await paginate(response, page, async_storage.get_discovered_data_entities,
+                          lambda: async_storage.count_discovered_data_entities(**filters), **filters)
+    return trusted_list(rows, response)
 
 @router.get("/{entity_id}", response_model=DiscoveredDataEntity)
 async def get_discovered_data_entity(entity_id: str):
-    entity = storage.get_discovered_data_entity_by_id(entity_id)
+    entity = await async_storage.get_discovered_data_entity_by_id(entity_id)
     if not entity:
         raise HTTPException(status_code=404, detail="Discovered Data Entity not found")
     return entity
 
-@router.delete("/{entity_id}")
+@router.delete("/{entity_id}", dependencies=[Depends(unit_of_work, scope="function")])
 async def delete_discovered_data_entity(entity_id: str):
-    if storage.delete_discovered_data_entity(entity_id):
+    if await async_storage.delete_discovered_data_entity(entity_id):
         return {"message": "Discovered Data Entity deleted"}
     raise HTTPException(status_code=404, detail="Discovered Data Entity not found")
 
 @router.get("/{entity_id}/fields", response_model=List[DiscoveredDataField])
 async def list_discovered_data_entity_fields(entity_id: str):
-    return storage.get_discovered_data_fields(entity_id)
+    return await async_storage.get_discovered_data_fields(entity_id)
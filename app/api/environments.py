@@ -1,28 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from app.services.storage import storage
+from app.database import unit_of_work
+from app.services.storage import async_storage
+from app.services.table_versions import conditional_get
 from app.schemas.environments import Environment, EnvironmentCreate, EnvironmentUpdate
 
 router = APIRouter(prefix="/environments", tags=["Environments"])
 
-@router.get("/", response_model=List[Environment])
+@router.get("/", response_model=List[Environment], dependencies=[Depends(conditional_get("environments"))])
 async def get_environments():
-    return storage.get_environments()
+    return await async_storage.get_environments()
 
-@router.post("/", response_model=str)
+@router.post("/", response_model=str, dependencies=[Depends(unit_of_work, scope="function")])
 async def add_environment(env: EnvironmentCreate):
-    return storage.add_environment(env.dict())
+    return await async_storage.add_environment(env.dict())
 
-@router.put("/{env_id}", response_model=bool)
+@router.put("/{env_id}", response_model=bool, dependencies=[Depends(unit_of_work, scope="function")])
 async def update_environment(env_id: str, updates: EnvironmentUpdate):
-    success = storage.update_environment(env_id, updates.dict(exclude_unset=True))
+    success = await async_storage.update_environment(env_id, updates.dict(exclude_unset=True))
     if not success:
         raise HTTPException(status_code=404, detail="Environment not found")
     return success
 
-@router.delete("/{env_id}", response_model=bool)
+@router.delete("/{env_id}", response_model=bool, dependencies=[Depends(unit_of_work, scope="function")])
 async def delete_environment(env_id: str):
-    success = storage.delete_environment(env_id)
+    success = await async_storage.delete_environment(env_id)
     if not success:
         raise HTTPException(status_code=404, detail="Environment not found")
     return success
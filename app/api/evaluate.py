@@ -1,15 +1,15 @@
 from fastapi import APIRouter
 from app.schemas.evaluate import DashboardMetrics, Report
-from app.services.storage import storage
+from app.services.storage import async_storage
 
 router = APIRouter(prefix="/evaluate", tags=["Evaluate"])
 
 @router.get("/dashboard", response_model=DashboardMetrics)
 async def get_dashboard():
     # Mock calculation logic
-    cis = storage.get_cis()
-    workloads = storage.get_workloads()
-    waves = storage.get_waves()
+    cis = await async_storage.get_cis()
+    workloads = await async_storage.get_workloads()
+    waves = await async_storage.get_waves()
     
     return DashboardMetrics(
         total_cis=len(cis),
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from app.services.exports import stream_export
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@router.get("/{name}")
+async def export_inventory(
+    name: Literal["cis", "workloads", "dependencies", "discovered-data"],
+    format: Literal["ndjson", "csv"] = "ndjson"
+):
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    return StreamingResponse(stream_export(name, format), media_type=MEDIA_TYPES[format], headers=headers)
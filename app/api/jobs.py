@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+from typing import List
+from app.schemas.jobs import IngestionJob
+from app.services.jobs import job_manager
+from app.services.cache import read_cache
+from app.services.workers import worker_pools
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.get("", response_model=List[IngestionJob])
+async def list_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@router.get("/workers")
+async def worker_pool_metrics():
+    return worker_pools.metrics()
+
+@router.get("/cache")
+async def read_cache_metrics():
+    return read_cache.metrics()
+
+@router.get("/{job_id}", response_model=IngestionJob)
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -1,196 +1,116 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Response, Depends
 from app.schemas.workload import Workload, WorkloadCreate, Dependency
 from app.schemas.mapping import S2TMapping, S2TMappingCreate, MoveDependencyGroup, MoveDependencyGroupCreate
-from app.services.storage import storage
-import pandas as pd
-import io
-import json
+from app.schemas.jobs import IngestionJobAccepted
+from app.database import unit_of_work
+from app.models import models
+from app.services.storage import async_storage
+from app.services import ingestion
+from app.services.jobs import job_manager
+from app.services.table_versions import conditional_get
+from app.services.workers import WorkerPoolFull, worker_pools
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.responses import trusted_list
 from typing import List
 
 router = APIRouter(prefix="/map", tags=["Map"])
 
-@router.post("/workloads", response_model=Workload)
+@router.post("/workloads", response_model=Workload, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_workload(workload: WorkloadCreate):
-    workload_id = storage.add_workload(workload.model_dump())
-    return storage.get_workload_by_id(workload_id)
+    workload_id = await async_storage.add_workload(workload.model_dump())
+    return await async_storage.get_workload_by_id(workload_id)
 
-@router.get("/workloads", response_model=list[Workload])
-async def list_workloads():
-    return storage.get_workloads()
+@router.get("/workloads", response_model=list[Workload], dependencies=[Depends(conditional_get("workloads", "workload_ci"))])
+async def list_workloads(response: Response, page: Page = Depends(page_params)):
+    rows = await paginate(response, page, async_storage.get_workloads,
+                          lambda: async_storage.count_rows(models.Workload))
+    return trusted_list(rows, response)
 
-@router.post("/dependencies")
+@router.post("/dependencies", dependencies=[Depends(unit_of_work, scope="function")])
 async def create_dependency(dependency: Dependency):
-    storage.add_dependency(dependency.model_dump())
+    await async_storage.add_dependency(dependency.model_dump())
     return {"message": "Dependency added"}
 
-@router.get("/dependencies", response_model=list[Dependency])
-async def list_dependencies():
-    return storage.get_dependencies()
+@router.get("/dependencies", response_model=list[Dependency], dependencies=[Depends(conditional_get("dependencies"))])
+async def list_dependencies(response: Response, page: Page = Depends(page_params)):
+    rows = await paginate(response, page, async_storage.get_dependencies,
+                          lambda: async_storage.count_rows(models.Dependency), key_type=int)
+    # The row id only serves the cursor
+    for row in rows:
+        del row["id"]
+    return trusted_list(rows, response)
 
 # S2T Mapping Endpoints
-@router.get("/s2t", response_model=List[S2TMapping])
-async def list_s2t_mappings():
-    return storage.get_s2t_mappings()
+@router.get("/s2t", response_model=List[S2TMapping], dependencies=[Depends(conditional_get("s2t_mappings"))])
+async def list_s2t_mappings(response: Response, page: Page = Depends(page_params)):
+    rows = await paginate(response, page, async_storage.get_s2t_mappings,
+                          lambda: async_storage.count_rows(models.S2TMapping))
+    return trusted_list(rows, response)
 
-@router.post("/s2t", response_model=str)
+@router.post("/s2t", response_model=str, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_s2t_mapping(mapping: S2TMappingCreate):
-    return storage.add_s2t_mapping(mapping.model_dump())
+    return await async_storage.add_s2t_mapping(mapping.model_dump())
 
-@router.get("/s2t/{workload_id}", response_model=S2TMapping)
+@router.get("/s2t/{workload_id}", response_model=S2TMapping, dependencies=[Depends(unit_of_work, scope="function")])
 async def get_s2t_mapping(workload_id: str):
-    mapping = storage.get_s2t_mapping_by_workload(workload_id)
+    mapping = await async_storage.get_s2t_mapping_by_workload(workload_id)
     if not mapping:
         # Create a default one if not exists
-        mapping_id = storage.add_s2t_mapping({"workload_id": workload_id})
-        mapping = storage.get_s2t_mapping_by_workload(workload_id)
+        mapping_id = await async_storage.add_s2t_mapping({"workload_id": workload_id})
+        mapping = await async_storage.get_s2t_mapping_by_workload(workload_id)
     return mapping
 
-@router.put("/s2t/{mapping_id}")
+@router.put("/s2t/{mapping_id}", dependencies=[Depends(unit_of_work, scope="function")])
 async def update_s2t_mapping(mapping_id: str, updates: dict):
-    if storage.update_s2t_mapping(mapping_id, updates):
+    if await async_storage.update_s2t_mapping(mapping_id, updates):
         return {"message": "Mapping updated"}
     raise HTTPException(status_code=404, detail="Mapping not found")
 
 # MDG Endpoints
 @router.get("/mdgs", response_model=List[MoveDependencyGroup])
 async def list_mdgs():
-    return storage.get_mdgs()
+    return await async_storage.get_mdgs()
 
-@router.post("/mdgs", response_model=str)
+@router.post("/mdgs", response_model=str, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_mdg(mdg: MoveDependencyGroupCreate):
-    return storage.add_mdg(mdg.model_dump())
+    return await async_storage.add_mdg(mdg.model_dump())
 
-@router.put("/mdgs/{mdg_id}")
+@router.put("/mdgs/{mdg_id}", dependencies=[Depends(unit_of_work, scope="function")])
 async def update_mdg(mdg_id: str, updates: dict):
-    if storage.update_mdg(mdg_id, updates):
+    if await async_storage.update_mdg(mdg_id, updates):
         return {"message": "MDG updated"}
     raise HTTPException(status_code=404, detail="MDG not found")
 
-@router.delete("/mdgs/{mdg_id}")
+@router.delete("/mdgs/{mdg_id}", dependencies=[Depends(unit_of_work, scope="function")])
 async def delete_mdg(mdg_id: str):
-    if storage.delete_mdg(mdg_id):
+    if await async_storage.delete_mdg(mdg_id):
         return {"message": "MDG deleted"}
     raise HTTPException(status_code=404, detail="MDG not found")
 
-@router.post("/ingest/workloads")
-async def ingest_workloads(file: UploadFile = File(...)):
-    contents = await file.read()
+@router.post("/ingest/workloads", responses={202: {"model": IngestionJobAccepted, "description": "Queued as a background job (background=true)"}})
+async def ingest_workloads(response: Response, file: UploadFile = File(...), background: bool = Form(False)):
+    spooled_path = await ingestion.spool_upload(file)
+    if background:
+        job = job_manager.submit("workload_ingest", ingestion.run_workload_ingest, spooled_path, file.filename, filename=file.filename)
+        response.status_code = 202
+        return IngestionJobAccepted(job_id=job.id, status=job.status).model_dump(exclude_none=True)
     try:
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        elif file.filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Invalid file format")
-        
-        # Group by (Parent Application Package Name, AWI Environment)
-        # Using columns from the provided AWI template
-        name_col = 'Parent Application Package Name'
-        env_col = 'AWI Environment'
-        hosting_col = 'AWI Current Hosting Model'
-        asset_col = 'Secondary Entity Anchor Value'
-        
-        # Some rows might have missing values, fill them
-        df[name_col] = df[name_col].ffill()
-        df[env_col] = df[env_col].ffill()
-        
-        grouped = df.groupby([name_col, env_col])
-        
-        ingested_count = 0
-        for (name, env), group in grouped:
-            # Check if workload already exists
-            workload = storage.get_workload_by_name_and_env(name, env)
-            
-            # Collect CI IDs
-            ci_ids = []
-            for _, row in group.iterrows():
-                asset_name = row.get(asset_col)
-                if pd.notna(asset_name):
-                    ci = storage.get_ci_by_name(str(asset_name))
-                    if ci:
-                        if ci["id"] not in ci_ids:
-                            ci_ids.append(ci["id"])
-                    else:
-                        # For prototype, if CI not found, we could create it or just ignore
-                        # Let's create a minimal CI so the relationship is visible
-                        new_ci_id = storage.add_ci({
-                            "name": str(asset_name),
-                            "type": "other",
-                            "description": "Auto-created during AWI ingestion",
-                            "properties": {}
-                        })
-                        ci_ids.append(new_ci_id)
-            
-            hosting_model = group[hosting_col].iloc[0] if hosting_col in group.columns and pd.notna(group[hosting_col].iloc[0]) else "On-Premise"
-            
-            if workload:
-                # Update existing workload
-                new_ci_ids = list(set(workload.get("ci_ids", []) + ci_ids))
-                storage.update_workload(workload["id"], {
-                    "ci_ids": new_ci_ids,
-                    "hosting_model": hosting_model
-                })
-            else:
-                # Create new workload
-                storage.add_workload({
-                    "name": name,
-                    "environment": env,
-                    "hosting_model": hosting_model,
-                    "ci_ids": ci_ids,
-                    "description": f"Ingested from {file.filename}",
-                    "relationships": []
-                })
-                ingested_count += 1
-                
-        return {"message": f"Successfully processed {len(grouped)} workloads ({ingested_count} new)"}
+        return await worker_pools.run_in_thread(ingestion.run_workload_ingest, spooled_path, file.filename)
+    except WorkerPoolFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/ingest/dependencies")
-async def ingest_dependencies(file: UploadFile = File(...)):
-    contents = await file.read()
+@router.post("/ingest/dependencies", responses={202: {"model": IngestionJobAccepted, "description": "Queued as a background job (background=true)"}})
+async def ingest_dependencies(response: Response, file: UploadFile = File(...), background: bool = Form(False)):
+    spooled_path = await ingestion.spool_upload(file)
+    if background:
+        job = job_manager.submit("dependency_ingest", ingestion.run_dependency_ingest, spooled_path, file.filename, filename=file.filename)
+        response.status_code = 202
+        return IngestionJobAccepted(job_id=job.id, status=job.status).model_dump(exclude_none=True)
     try:
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        elif file.filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Invalid file format")
-            
-        # Columns: 'Parent Application Package Name', 'Linked Parent Application Package Name', 'Dependency Link Environment', 'Dependency Level', 'Latency Sensitive'
-        src_col = 'Parent Application Package Name'
-        target_col = 'Linked Parent Application Package Name'
-        env_col = 'Dependency Link Environment'
-        level_col = 'Dependency Level'
-        latency_col = 'Latency Sensitive'
-        
-        ingested_count = 0
-        for _, row in df.iterrows():
-            src_name = row.get(src_col)
-            target_name = row.get(target_col)
-            env = row.get(env_col, "PROD")
-            
-            if pd.isna(src_name) or pd.isna(target_name):
-                continue
-                
-            src_wl = storage.get_workload_by_name_and_env(src_name, env)
-            target_wl = storage.get_workload_by_name_and_env(target_name, env)
-            
-            if src_wl and target_wl:
-                storage.add_dependency({
-                    "source_workload_id": src_wl["id"],
-                    "target_workload_id": target_wl["id"],
-                    "environment": env,
-                    "level": str(row.get(level_col, "Medium")),
-                    "latency_sensitive": bool(row.get(latency_col, False)),
-                    "type": "dependency"
-                })
-                ingested_count += 1
-            else:
-                # For prototype, if workloads don't exist, we might want to create them
-                # but usually AWIs should be ingested first.
-                pass
-                
-        return {"message": f"Successfully ingested {ingested_count} dependencies"}
+        return await worker_pools.run_in_thread(ingestion.run_dependency_ingest, spooled_path, file.filename)
+    except WorkerPoolFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
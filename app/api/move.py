@@ -1,22 +1,23 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from app.schemas.move import Runbook, RunbookCreate
-from app.services.storage import storage
-import pandas as pd
-import io
+from app.database import unit_of_work
+from app.services.storage import async_storage
+from app.services.workers import worker_pools
+from app.utils.workbook import read_records
 import json
 
 router = APIRouter(prefix="/move", tags=["Move"])
 
-@router.post("/runbooks", response_model=Runbook)
+@router.post("/runbooks", response_model=Runbook, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_runbook(runbook: RunbookCreate):
-    runbook_id = storage.add_runbook(runbook.model_dump())
-    return storage.get_runbook_by_id(runbook_id)
+    runbook_id = await async_storage.add_runbook(runbook.model_dump())
+    return await async_storage.get_runbook_by_id(runbook_id)
 
 @router.get("/runbooks", response_model=list[Runbook])
 async def list_runbooks():
-    return storage.get_runbooks()
+    return await async_storage.get_runbooks()
 
-@router.post("/generate/{workload_id}")
+@router.post("/generate/{workload_id}", dependencies=[Depends(unit_of_work, scope="function")])
 async def generate_runbook(workload_id: str):
     # Mock generation from template
     runbook_data = {
@@ -28,21 +29,18 @@ async def generate_runbook(workload_id: str):
             {"order": 3, "task": "Bring up target servers", "owner": "CloudEng", "status": "pending"}
         ]
     }
-    runbook_id = storage.add_runbook(runbook_data)
-    return storage.get_runbook_by_id(runbook_id)
+    runbook_id = await async_storage.add_runbook(runbook_data)
+    return await async_storage.get_runbook_by_id(runbook_id)
 
 @router.post("/ingest/runbooks")
 async def ingest_runbooks(file: UploadFile = File(...)):
-    contents = await file.read()
-    if file.filename.endswith('.csv'):
-        df = pd.read_csv(io.BytesIO(contents))
-    elif file.filename.endswith(('.xls', '.xlsx')):
-        df = pd.read_excel(io.BytesIO(contents))
-    else:
+    if not file.filename.endswith(('.csv', '.xls', '.xlsx')):
         raise HTTPException(status_code=400, detail="Invalid file format")
+    contents = await file.read()
+    rows = await worker_pools.run_in_process(read_records, contents, file.filename)
 
     ingested_count = 0
-    for _, row in df.iterrows():
+    for row in rows:
         try:
             steps = row.get("steps", "[]")
             if isinstance(steps, str):
@@ -53,7 +51,7 @@ async def ingest_runbooks(file: UploadFile = File(...)):
                 "workload_id": str(row.get("workload_id")),
                 "steps": steps
             }
-            storage.add_runbook(runbook_data)
+            await async_storage.add_runbook(runbook_data)
             ingested_count += 1
         except Exception:
             continue
@@ -1,28 +1,29 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from app.services.storage import storage
+from app.database import unit_of_work
+from app.services.storage import async_storage
 from app.schemas.move_principles import MovePrinciple, MovePrincipleCreate, MovePrincipleUpdate
 
 router = APIRouter(prefix="/move-principles", tags=["Move Principles"])
 
 @router.get("/", response_model=List[MovePrinciple])
 async def get_move_principles():
-    return storage.get_move_principles()
+    return await async_storage.get_move_principles()
 
-@router.post("/", response_model=str)
+@router.post("/", response_model=str, dependencies=[Depends(unit_of_work, scope="function")])
 async def add_move_principle(principle: MovePrincipleCreate):
-    return storage.add_move_principle(principle.dict())
+    return await async_storage.add_move_principle(principle.dict())
 
-@router.put("/{principle_id}", response_model=bool)
+@router.put("/{principle_id}", response_model=bool, dependencies=[Depends(unit_of_work, scope="function")])
 async def update_move_principle(principle_id: str, updates: MovePrincipleUpdate):
-    success = storage.update_move_principle(principle_id, updates.dict(exclude_unset=True))
+    success = await async_storage.update_move_principle(principle_id, updates.dict(exclude_unset=True))
     if not success:
         raise HTTPException(status_code=404, detail="Move Principle not found")
     return success
 
-@router.delete("/{principle_id}", response_model=bool)
+@router.delete("/{principle_id}", response_model=bool, dependencies=[Depends(unit_of_work, scope="function")])
 async def delete_move_principle(principle_id: str):
-    success = storage.delete_move_principle(principle_id)
+    success = await async_storage.delete_move_principle(principle_id)
     if not success:
         raise HTTPException(status_code=404, detail="Move Principle not found")
     return success
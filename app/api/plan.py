@@ -1,33 +1,31 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from app.schemas.plan import MigrationWave, MigrationWaveCreate
-from app.services.storage import storage
-import pandas as pd
-import io
+from app.database import unit_of_work
+from app.services.storage import async_storage
+from app.services.workers import worker_pools
+from app.utils.workbook import read_records
 import json
 
 router = APIRouter(prefix="/plan", tags=["Plan"])
 
-@router.post("/waves", response_model=MigrationWave)
+@router.post("/waves", response_model=MigrationWave, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_wave(wave: MigrationWaveCreate):
-    wave_id = storage.add_wave(wave.model_dump())
-    return storage.get_wave_by_id(wave_id)
+    wave_id = await async_storage.add_wave(wave.model_dump())
+    return await async_storage.get_wave_by_id(wave_id)
 
 @router.get("/waves", response_model=list[MigrationWave])
 async def list_waves():
-    return storage.get_waves()
+    return await async_storage.get_waves()
 
 @router.post("/ingest/waves")
 async def ingest_waves(file: UploadFile = File(...)):
-    contents = await file.read()
-    if file.filename.endswith('.csv'):
-        df = pd.read_csv(io.BytesIO(contents))
-    elif file.filename.endswith(('.xls', '.xlsx')):
-        df = pd.read_excel(io.BytesIO(contents))
-    else:
+    if not file.filename.endswith(('.csv', '.xls', '.xlsx')):
         raise HTTPException(status_code=400, detail="Invalid file format")
+    contents = await file.read()
+    rows = await worker_pools.run_in_process(read_records, contents, file.filename)
 
     ingested_count = 0
-    for _, row in df.iterrows():
+    for row in rows:
         try:
             workload_ids = row.get("workload_ids", "[]")
             if isinstance(workload_ids, str):
@@ -39,7 +37,7 @@ async def ingest_waves(file: UploadFile = File(...)):
                 "end_date": row.get("end_date"),
                 "workload_ids": workload_ids
             }
-            storage.add_wave(wave_data)
+            await async_storage.add_wave(wave_data)
             ingested_count += 1
         except Exception:
             continue
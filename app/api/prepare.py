@@ -1,10 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Response, Depends
 from typing import Optional
-from app.schemas.prepare import ConfigurationItem, ConfigurationItemCreate, CIType, NetworkScan, NetworkScanCreate
-from app.services.storage import storage
-from app.utils.recommender import get_field_recommendation
-import pandas as pd
-import io
+from app.schemas.prepare import (
+    ConfigurationItem, ConfigurationItemCreate, CIType, NetworkScan, NetworkScanCreate,
+    FieldRecommendation, FieldRecommendationRequest
+)
+from app.schemas.jobs import IngestionJobAccepted
+from app.database import unit_of_work
+from app.models import models
+from app.services.storage import async_storage
+from app.services import ingestion
+from app.services.jobs import job_manager
+from app.services.recommendations import recommend_fields_batch
+from app.services.table_versions import conditional_get
+from app.services.workers import WorkerPoolFull, worker_pools
+from app.utils.pagination import Page, page_params, paginate
+from app.utils.responses import trusted_list
 import json
 from datetime import datetime
 import ipaddress
@@ -12,19 +22,19 @@ import asyncio
 
 router = APIRouter(prefix="/prepare", tags=["Prepare"])
 
-@router.post("/items", response_model=ConfigurationItem)
+@router.post("/items", response_model=ConfigurationItem, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_ci(ci: ConfigurationItemCreate):
-    ci_id = storage.add_ci(ci.model_dump())
+    ci_id = await async_storage.add_ci(ci.model_dump())
     
     # Create Discovered Data record for manual ingestion
-    discovered_entity_id = storage.add_discovered_data_entity({
+    discovered_entity_id = await async_storage.add_discovered_data_entity({
         "source_type": "manual",
         "user": "admin", # Default user for now
         "data_entity_name": ci.type.value if hasattr(ci.type, 'value') else str(ci.type)
     })
     
     # Add name as a field
-    storage.add_discovered_data_field({
+    await async_storage.add_discovered_data_field({
         "discovered_data_entity_id": discovered_entity_id,
         "field_name": "name",
         "field_value": ci.name,
@@ -33,7 +43,7 @@ async def create_ci(ci: ConfigurationItemCreate):
     
     # Add description as a field
     if ci.description:
-        storage.add_discovered_data_field({
+        await async_storage.add_discovered_data_field({
             "discovered_data_entity_id": discovered_entity_id,
             "field_name": "description",
             "field_value": ci.description,
@@ -42,52 +52,71 @@ async def create_ci(ci: ConfigurationItemCreate):
         
     # Add properties as fields
     for key, value in ci.properties.items():
-        storage.add_discovered_data_field({
+        await async_storage.add_discovered_data_field({
             "discovered_data_entity_id": discovered_entity_id,
             "field_name": key,
             "field_value": str(value),
             "rating": "manual"
         })
         
-    return storage.get_ci_by_id(ci_id)
+    return await async_storage.get_ci_by_id(ci_id)
 
-@router.get("/items", response_model=list[ConfigurationItem])
-async def list_cis():
-    return storage.get_cis()
+@router.get("/items", response_model=list[ConfigurationItem], dependencies=[Depends(conditional_get("configuration_items"))])
+async def list_cis(response: Response, page: Page = Depends(page_params)):
+    rows = await paginate(response, page, async_storage.get_cis,
+                          lambda: async_storage.count_rows(models.ConfigurationItem))
+    return trusted_list(rows, response)
 
 @router.get("/data-sources")
 async def list_data_sources():
-    return storage.get_data_sources()
+    return await async_storage.get_data_sources()
 
 @router.get("/data-sources/{source_id}/discovered-data")
-async def get_data_source_discovered_data(source_id: str):
-    return storage.get_discovered_data_entities(data_source_id=source_id)
+async def get_data_source_discovered_data(source_id: str, response: Response):
+    return trusted_list(await async_storage.get_discovered_data_entities(data_source_id=source_id), response)
 
 @router.get("/datasets")
 async def list_datasets():
     # Keep for backward compatibility, but return generalized data sources
-    return storage.get_data_sources()
+    return await async_storage.get_data_sources()
 
-@router.get("/field-mappings")
-async def list_field_mappings():
-    return storage.get_field_mappings()
+@router.get("/field-mappings", dependencies=[Depends(conditional_get("field_mappings"))])
+async def list_field_mappings(response: Response, page: Page = Depends(page_params)):
+    rows = await paginate(response, page, async_storage.get_field_mappings,
+                          lambda: async_storage.count_rows(models.FieldMapping))
+    return trusted_list(rows, response)
 
-@router.post("/field-mappings/{mapping_id}")
+@router.post("/field-mappings/{mapping_id}", dependencies=[Depends(unit_of_work, scope="function")])
 async def update_field_mapping(mapping_id: str, updates: dict):
-    if storage.update_field_mapping(mapping_id, updates):
+    if await async_storage.update_field_mapping(mapping_id, updates):
         return {"message": "Mapping updated"}
     raise HTTPException(status_code=404, detail="Mapping not found")
 
-@router.post("/upload")
+@router.post("/recommendations", response_model=list[FieldRecommendation])
+async def recommend_fields(request: FieldRecommendationRequest):
+    # Scores a whole worksheet at once; CPU-bound, so keep it off the event loop
+    recommendations = await worker_pools.run_in_thread(recommend_fields_batch, request.columns, request.samples)
+    return [
+        {
+            "source_field": column,
+            "data_entity": entity,
+            "target_field": field,
+            "data_dictionary_field_id": field_id
+        } for column, (entity, field, field_id) in zip(request.columns, recommendations)
+    ]
+
+@router.post("/upload", responses={202: {"model": IngestionJobAccepted, "description": "Queued as a background job (background=true)"}})
 async def upload_dataset(
+    response: Response,
     name: str = Form(...),
     rating: str = Form(...),
     file: UploadFile = File(...),
     worksheet: Optional[str] = Form(None),
     header_row: Optional[int] = Form(None),
-    worksheets_json: Optional[str] = Form(None)
+    worksheets_json: Optional[str] = Form(None),
+    background: bool = Form(False)
 ):
-    contents = await file.read()
+    spooled_path = await ingestion.spool_upload(file)
     try:
         worksheets_to_process = []
         if worksheets_json:
@@ -97,15 +126,13 @@ async def upload_dataset(
         else:
             raise HTTPException(status_code=400, detail="No worksheet information provided")
 
-        total_records = 0
-        
         # Add data source to storage once for the file
-        ds_id = storage.add_data_source({
+        ds_id = await async_storage.add_data_source({
             "name": name,
             "source_type": "Excel" if file.filename.endswith(('.xls', '.xlsx')) else "CSV",
             "data_ingested": ", ".join([ws["name"] for ws in worksheets_to_process]),
             "last_sync": datetime.now().strftime("%b %d, %Y, %I:%M:%S %p"),
-            "records": 0, # Will update after processing
+            "records": 0, # Updated after every processed chunk
             "sync_count": 1,
             "status": "Processing",
             "process": True,
@@ -113,85 +140,42 @@ async def upload_dataset(
             "rating": rating
         })
 
-        for ws_info in worksheets_to_process:
-            ws_name = ws_info["name"]
-            h_row = int(ws_info["header_row"])
-            
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(io.BytesIO(contents), header=h_row-1)
-            elif file.filename.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(io.BytesIO(contents), sheet_name=ws_name, header=h_row-1)
-            else:
-                raise HTTPException(status_code=400, detail="Invalid file format")
-            
-            total_records += len(df)
-
-            # Get all data dictionary fields for recommendations
-            data_fields = storage.get_data_fields()
-            entities = storage.get_data_entities()
-
-            # Generate initial field mappings for this worksheet
-            for col in df.columns:
-                # Sample some unique values for recommendation engine
-                column_values = df[col].dropna().unique().tolist()[:50]
-                rec_entity, rec_field, rec_field_id = get_field_recommendation(str(col), column_values, data_fields, entities)
-
-                storage.add_field_mapping({
-                    "source_field": str(col),
-                    "data_source": name,
-                    "worksheet": ws_name,
-                    "data_entity": rec_entity,
-                    "target_field": rec_field,
-                    "data_dictionary_field_id": rec_field_id,
-                    "status": "Pending",
-                    "process": True
-                })
-
-            # Create Discovered Data Records for each row
-            # Limit to first 100 rows to avoid excessive data in prototype
-            for _, row in df.head(100).iterrows():
-                discovered_entity_id = storage.add_discovered_data_entity({
-                    "source_type": "file",
-                    "user": "admin",
-                    "data_entity_name": ws_name,
-                    "data_source_id": ds_id
-                })
-                for col in df.columns:
-                    storage.add_discovered_data_field({
-                        "discovered_data_entity_id": discovered_entity_id,
-                        "field_name": str(col),
-                        "field_value": str(row[col]),
-                        "rating": rating
-                    })
-        
-        # Update total records and status
-        storage.update_data_source(ds_id, {
-            "records": total_records,
-            "status": "Success"
-        })
+        if background:
+            job = job_manager.submit(
+                "dataset_upload", ingestion.run_dataset_upload,
+                spooled_path, file.filename, name, rating, worksheets_to_process, ds_id,
+                filename=file.filename, data_source_id=ds_id
+            )
+            spooled_path = None # Owned by the job from here on
+            response.status_code = 202
+            return IngestionJobAccepted(job_id=job.id, status=job.status, source_id=ds_id).model_dump(exclude_none=True)
 
-        return {"message": f"Successfully uploaded {name} with {total_records} records from {len(worksheets_to_process)} worksheets", "source_id": ds_id, "source_name": name}
+        return await worker_pools.run_in_thread(ingestion.run_dataset_upload, spooled_path, file.filename, name, rating, worksheets_to_process, ds_id)
     except Exception as e:
         if 'ds_id' in locals():
-            storage.update_data_source(ds_id, {"status": "Error", "message": str(e)})
+            await async_storage.update_data_source(ds_id, {"status": "Error", "message": str(e)})
+        if isinstance(e, WorkerPoolFull):
+            raise
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        ingestion.remove_spooled(spooled_path)
 
 @router.get("/scans", response_model=list[NetworkScan])
 async def list_scans():
-    return storage.get_network_scans()
+    return await async_storage.get_network_scans()
 
-@router.post("/scans", response_model=NetworkScan)
+@router.post("/scans", response_model=NetworkScan, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_scan(scan: NetworkScanCreate):
-    scan_id = storage.add_network_scan(scan.model_dump())
-    return storage.get_network_scan_by_id(scan_id)
+    scan_id = await async_storage.add_network_scan(scan.model_dump())
+    return await async_storage.get_network_scan_by_id(scan_id)
 
 @router.post("/scans/{scan_id}/run")
 async def run_scan(scan_id: str):
-    scan = storage.get_network_scan_by_id(scan_id)
+    scan = await async_storage.get_network_scan_by_id(scan_id)
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    storage.update_network_scan(scan_id, {
+    await async_storage.update_network_scan(scan_id, {
         "status": "Running",
         "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     })
@@ -228,7 +212,7 @@ async def run_scan(scan_id: str):
             if ipaddress.ip_address(item["ip"]) in network:
                 results.append(item)
     
-    storage.update_network_scan(scan_id, {
+    await async_storage.update_network_scan(scan_id, {
         "status": "Completed",
         "end_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "discovered_items": len(results),
@@ -236,7 +220,7 @@ async def run_scan(scan_id: str):
     })
     
     # Also create/update Data Source entry for this scan
-    ds_id = storage.add_data_source({
+    ds_id = await async_storage.add_data_source({
         "name": f"Scan: {scan['name']}",
         "source_type": "Network Scan",
         "data_ingested": f"Range: {scan['target_range']}",
@@ -251,85 +235,69 @@ async def run_scan(scan_id: str):
     
     # Also create Discovered Data Entities for the discovered items
     for item in results:
-        discovered_entity_id = storage.add_discovered_data_entity({
+        discovered_entity_id = await async_storage.add_discovered_data_entity({
             "source_type": "network_scan",
             "user": "system",
             "data_entity_name": item["type"],
             "data_source_id": ds_id
         })
-        storage.add_discovered_data_field({
+        await async_storage.add_discovered_data_field({
             "discovered_data_entity_id": discovered_entity_id,
             "field_name": "hostname",
             "field_value": item["hostname"],
             "rating": "high"
         })
-        storage.add_discovered_data_field({
+        await async_storage.add_discovered_data_field({
             "discovered_data_entity_id": discovered_entity_id,
             "field_name": "ip",
             "field_value": item["ip"],
             "rating": "high"
         })
-        storage.add_discovered_data_field({
+        await async_storage.add_discovered_data_field({
             "discovered_data_entity_id": discovered_entity_id,
             "field_name": "protocols_detected",
             "field_value": item["protocols"],
             "rating": "medium"
         })
 
-    return storage.get_network_scan_by_id(scan_id)
+    return await async_storage.get_network_scan_by_id(scan_id)
 
-@router.post("/ingest")
-async def ingest_cis(file: UploadFile = File(...)):
-    contents = await file.read()
+@router.post("/ingest", responses={202: {"model": IngestionJobAccepted, "description": "Queued as a background job (background=true)"}})
+async def ingest_cis(response: Response, file: UploadFile = File(...), background: bool = Form(False)):
     if file.filename.endswith('.csv'):
-        df = pd.read_csv(io.BytesIO(contents))
+        source_type = "CSV"
     elif file.filename.endswith(('.xls', '.xlsx')):
-        df = pd.read_excel(io.BytesIO(contents))
+        source_type = "Excel"
     else:
         raise HTTPException(status_code=400, detail="Invalid file format")
 
-    ingested_count = 0
-    for _, row in df.iterrows():
-        # Basic mapping logic - assuming column names match or are close
-        try:
-            ci_data = {
-                "name": str(row.get("name", "Unnamed")),
-                "type": row.get("type", CIType.OTHER),
-                "description": row.get("description", ""),
-                "properties": json.loads(row.get("properties", "{}")) if isinstance(row.get("properties"), str) else {}
-            }
-            storage.add_ci(ci_data)
-            
-            # Create Discovered Data record
-            discovered_entity_id = storage.add_discovered_data_entity({
-                "source_type": "file",
-                "user": "admin",
-                "data_entity_name": str(ci_data["type"])
-            })
-            for col in df.columns:
-                storage.add_discovered_data_field({
-                    "discovered_data_entity_id": discovered_entity_id,
-                    "field_name": str(col),
-                    "field_value": str(row[col]),
-                    "rating": "high"
-                })
-                
-            ingested_count += 1
-        except Exception:
-            continue
-            
+    spooled_path = await ingestion.spool_upload(file)
+
     # Also create a Data Source entry for this ingestion
-    storage.add_data_source({
+    ds_id = await async_storage.add_data_source({
         "name": f"Direct Ingest: {file.filename}",
-        "source_type": "Excel" if file.filename.endswith(('.xls', '.xlsx')) else "CSV",
+        "source_type": source_type,
         "data_ingested": "Direct CI Ingest",
         "last_sync": datetime.now().strftime("%b %d, %Y, %I:%M:%S %p"),
-        "records": ingested_count,
+        "records": 0,
         "sync_count": 1,
-        "status": "Success",
+        "status": "Processing",
         "process": True,
         "config": {"filename": file.filename},
         "rating": "high"
     })
-    
-    return {"message": f"Successfully ingested {ingested_count} items"}
+
+    if background:
+        job = job_manager.submit(
+            "ci_ingest", ingestion.run_ci_ingest, spooled_path, file.filename, ds_id,
+            filename=file.filename, data_source_id=ds_id
+        )
+        response.status_code = 202
+        return IngestionJobAccepted(job_id=job.id, status=job.status, source_id=ds_id).model_dump(exclude_none=True)
+
+    try:
+        return await worker_pools.run_in_thread(ingestion.run_ci_ingest, spooled_path, file.filename, ds_id)
+    except WorkerPoolFull:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.score_card import ScoreCardFactor, ScoreCardFactorCreate, ScoreCardOption, ScoreCardOptionCreate
-from app.services.storage import storage
+from app.database import unit_of_work
+from app.services.storage import async_storage
+from app.services.table_versions import conditional_get
 from typing import List
 
 router = APIRouter(prefix="/score-card", tags=["Score Card"])
 
-@router.get("/factors", response_model=List[ScoreCardFactor])
+@router.get("/factors", response_model=List[ScoreCardFactor], dependencies=[Depends(conditional_get("score_card_factors", "score_card_options"))])
 async def list_factors():
-    return storage.get_score_card_factors()
+    return await async_storage.get_score_card_factors()
 
-@router.post("/factors", response_model=str)
+@router.post("/factors", response_model=str, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_factor(factor: ScoreCardFactorCreate):
-    return storage.add_score_card_factor(factor.model_dump())
+    return await async_storage.add_score_card_factor(factor.model_dump())
 
-@router.post("/options", response_model=str)
+@router.post("/options", response_model=str, dependencies=[Depends(unit_of_work, scope="function")])
 async def create_option(option: ScoreCardOptionCreate):
-    return storage.add_score_card_option(option.model_dump())
+    return await async_storage.add_score_card_option(option.model_dump())
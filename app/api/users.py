@@ -1,23 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
-from app.database import get_db
+from app.database import get_async_db
 from app.models import models
 from app.schemas.users import User, UserCreate, Role, AccessRight, LoginRequest, LoginResponse, AccessRightBase
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == request.username).first()
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(models.User).filter(models.User.username == request.username))).scalars().first()
     if not user or user.password != request.password:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
     
-    role = db.query(models.Role).filter(models.Role.id == user.role_id).first()
-    access_rights = db.query(models.AccessRight).filter(models.AccessRight.role_id == user.role_id).all()
+    role = (await db.execute(select(models.Role).filter(models.Role.id == user.role_id))).scalars().first()
+    access_rights = (await db.execute(select(models.AccessRight).filter(models.AccessRight.role_id == user.role_id))).scalars().all()
     
     return {
         "id": user.id,
@@ -35,21 +37,22 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.get("/", response_model=List[User])
-async def list_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
+async def list_users(db: AsyncSession = Depends(get_async_db)):
+    # Roles are loaded up front: the async session cannot lazy-load them later
+    return (await db.execute(select(models.User).options(selectinload(models.User.role)))).scalars().all()
 
 @router.get("/roles", response_model=List[Role])
-async def list_roles(db: Session = Depends(get_db)):
-    return db.query(models.Role).all()
+async def list_roles(db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(models.Role))).scalars().all()
 
 @router.get("/access-rights/{role_id}", response_model=List[AccessRight])
-async def get_access_rights(role_id: int, db: Session = Depends(get_db)):
-    return db.query(models.AccessRight).filter(models.AccessRight.role_id == role_id).all()
+async def get_access_rights(role_id: int, db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(models.AccessRight).filter(models.AccessRight.role_id == role_id))).scalars().all()
 
 @router.post("/", response_model=User)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     db_user = models.User(**user.model_dump())
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user, ["role"])
     return db_user
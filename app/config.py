@@ -1,7 +1,7 @@
 import yaml
 import os
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Literal
 
 class AppConfig(BaseModel):
     title: str
@@ -13,14 +13,117 @@ class AppConfig(BaseModel):
     port: int
     reload: bool
 
+class SQLiteConfig(BaseModel):
+    # PRAGMAs run on every new SQLite connection; None keeps SQLite's default
+    journal_mode: Optional[Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]] = None
+    synchronous: Optional[Literal["OFF", "NORMAL", "FULL", "EXTRA"]] = None
+    # Bytes of the database file to memory-map
+    mmap_size: Optional[int] = None
+    # Pages if positive, KiB if negative
+    cache_size: Optional[int] = None
+    # Milliseconds to wait for a lock before failing with "database is locked"
+    busy_timeout: Optional[int] = None
+    temp_store: Optional[Literal["DEFAULT", "FILE", "MEMORY"]] = None
+
 class DatabaseConfig(BaseModel):
     url: str
     username: Optional[str] = ""
     password: Optional[str] = ""
+    sqlite: SQLiteConfig = SQLiteConfig()
+    # Connection pool for server databases (PostgreSQL, MySQL); SQLite ignores these
+    pool_size: int = 5
+    max_overflow: int = 10
+    # Seconds to wait for a free connection
+    pool_timeout: int = 30
+    # Seconds after which a connection is replaced, before the server drops it
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    # Milliseconds a statement may run before the server cancels it (PostgreSQL, MySQL)
+    statement_timeout: Optional[int] = None
+
+class IngestionConfig(BaseModel):
+    # Number of rows written per executemany batch during bulk ingestion
+    bulk_batch_size: int = 5000
+    # Rows per chunk when streaming CSV and .xlsx uploads from disk
+    csv_chunk_size: int = 10000
+    # "rows": one DiscoveredDataField row per cell; "columnar": one value list per
+    # row with the column names stored once per worksheet (file uploads only)
+    discovered_data_layout: Literal["rows", "columnar"] = "rows"
+
+class JobsConfig(BaseModel):
+    # Worker threads running background ingestion jobs
+    max_workers: int = 2
+    # Finished jobs kept in memory for status queries
+    retention: int = 200
+
+class RecommenderConfig(BaseModel):
+    # Entity and field names per header, ranked by shared character trigrams,
+    # that are scored exactly when recommending field mappings
+    shortlist_size: int = 25
+    # Distinct values sampled per column for the standard-value boost
+    sample_size: int = 50
+    # Worksheets with at least this many columns are scored across the process pool
+    process_pool_min_columns: int = 200
+
+class WorkersConfig(BaseModel):
+    # Threads for pandas parsing and inline ingestion requested by the API
+    max_threads: int = 4
+    # Processes for CPU-bound parsing and recommendation scoring (defaults to the CPU count)
+    max_processes: Optional[int] = None
+    # Queued plus running tasks per pool before requests get 503 Retry-After
+    max_pending: int = 32
+
+class PaginationConfig(BaseModel):
+    # Page size when a list endpoint gets a cursor without a limit
+    default_limit: int = 500
+    # Largest page a list endpoint returns; larger limits are clamped
+    max_limit: int = 5000
+
+class ResponsesConfig(BaseModel):
+    # Serialize large list responses built by the storage layer directly with
+    # orjson instead of validating each item against the response model
+    trust_storage_payloads: bool = True
+
+class ExportsConfig(BaseModel):
+    # Rows fetched per round trip and encoded per streamed chunk
+    yield_per: int = 1000
+
+class CacheConfig(BaseModel):
+    # Read-through cache of the reference data listings (environments, move
+    # principles, score card, data dictionary)
+    enabled: bool = True
+    # Seconds an entry is served before it is read again, whatever the versions say
+    ttl: float = 60.0
+    max_entries: int = 256
+    # Publish writes to cached tables in the table_versions table and poll it,
+    # so other workers drop their entries too
+    shared_versions: bool = True
+    # Seconds between polls of the shared versions
+    sync_interval: float = 1.0
+
+class CompressionConfig(BaseModel):
+    enabled: bool = True
+    # Offered in this order of preference; "br" needs the brotli package
+    encodings: List[str] = ["br", "gzip"]
+    # Bodies smaller than this many bytes are sent as they are
+    minimum_size: int = 1024
+    # Media types compressed; "text/*" matches every text type
+    content_types: List[str] = ["application/json", "application/x-ndjson", "text/csv", "text/html", "text/css", "text/javascript", "application/javascript"]
+    gzip_level: int = 1
+    brotli_quality: int = 1
 
 class Config(BaseModel):
     app: AppConfig
     database: DatabaseConfig
+    ingestion: IngestionConfig = IngestionConfig()
+    jobs: JobsConfig = JobsConfig()
+    recommender: RecommenderConfig = RecommenderConfig()
+    workers: WorkersConfig = WorkersConfig()
+    pagination: PaginationConfig = PaginationConfig()
+    responses: ResponsesConfig = ResponsesConfig()
+    exports: ExportsConfig = ExportsConfig()
+    cache: CacheConfig = CacheConfig()
+    compression: CompressionConfig = CompressionConfig()
 
 def load_config(config_path: str = "config.yaml") -> Config:
     # If the path is not absolute, try to find it relative to the project root
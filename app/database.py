@@ -1,20 +1,162 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.config import settings
+from sqlalchemy.orm import Session, sessionmaker
+from app.config import settings, DatabaseConfig, SQLiteConfig
+
+def sqlite_pragmas(sqlite: SQLiteConfig) -> List[str]:
+    return [f"PRAGMA {name}={value}" for name, value in sqlite.model_dump().items() if value is not None]
+
+def configure_sqlite(engine, sqlite: SQLiteConfig):
+    # Connection-level settings have to be applied to every pooled connection
+    pragmas = sqlite_pragmas(sqlite)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def database_url(database: DatabaseConfig) -> URL:
+    # Credentials from the config take precedence over any in the URL
+    url = make_url(database.url)
+    if database.username:
+        url = url.set(username=database.username)
+    if database.password:
+        url = url.set(password=database.password)
+    return url
+
+def engine_options(database: DatabaseConfig) -> Dict[str, Any]:
+    url = database_url(database)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        # Sessions are used from FastAPI's threadpool, not the creating thread
+        return {"url": url, "connect_args": {"check_same_thread": False}}
+
+    options: Dict[str, Any] = {
+        "url": url,
+        "pool_size": database.pool_size,
+        "max_overflow": database.max_overflow,
+        "pool_timeout": database.pool_timeout,
+        "pool_recycle": database.pool_recycle,
+        "pool_pre_ping": database.pool_pre_ping
+    }
+    if database.statement_timeout and backend == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={database.statement_timeout}"}
+    return options
+
+def create_db_engine(database: DatabaseConfig):
+    engine = create_engine(**engine_options(database))
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine, database.sqlite)
+    elif database.statement_timeout and engine.dialect.name == "mysql":
+        timeout = int(database.statement_timeout)
+
+        @event.listens_for(engine, "connect")
+        def set_statement_timeout(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION max_execution_time = {timeout}")
+            cursor.close()
+    return engine
+
+# asyncio drivers used by the async engine, per backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+def async_engine_options(database: DatabaseConfig) -> Dict[str, Any]:
+    options = engine_options(database)
+    url = options["url"]
+    backend = url.get_backend_name()
+    # psycopg 3 serves both engines; other drivers are swapped for their asyncio counterpart
+    if not (backend == "postgresql" and url.get_driver_name() == "psycopg"):
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    options["url"] = url
+    if url.get_driver_name() == "asyncpg" and database.statement_timeout:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(database.statement_timeout)}}
+    return options
+
+def create_async_db_engine(database: DatabaseConfig) -> AsyncEngine:
+    engine = create_async_engine(**async_engine_options(database))
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine.sync_engine, database.sqlite)
+    return engine
 
 SQLALCHEMY_DATABASE_URL = settings.database.url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# The sync engine serves ingestion jobs and other worker threads, the async
+# engine the request handlers
+engine = create_db_engine(settings.database)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_db_engine(settings.database)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
+# Session that storage calls join instead of opening their own
+_unit_of_work: ContextVar[Optional[Session]] = ContextVar("unit_of_work", default=None)
+# Async session of the unit of work the current request runs in, if any
+_async_unit_of_work: ContextVar[Optional[AsyncSession]] = ContextVar("async_unit_of_work", default=None)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def current_session() -> Optional[Session]:
+    return _unit_of_work.get()
+
+def current_async_session() -> Optional[AsyncSession]:
+    return _async_unit_of_work.get()
+
+def _call_in_session(session: Session, fn: Callable, args, kwargs):
+    token = _unit_of_work.set(session)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _unit_of_work.reset(token)
+
+async def run_in_session(fn: Callable, *args, **kwargs):
+    """
+    Runs a synchronous storage function on the async engine: its session is
+    the sync view of an AsyncSession, so queries await the driver instead of
+    blocking the event loop. Joins the request's unit of work if there is one,
+    otherwise commits on its own.
+    """
+    session = _async_unit_of_work.get()
+    if session is not None:
+        return await session.run_sync(_call_in_session, fn, args, kwargs)
+    async with AsyncSessionLocal() as session:
+        result = await session.run_sync(_call_in_session, fn, args, kwargs)
+        await session.commit()
+        return result
+
+async def unit_of_work():
+    """
+    Dependency that runs every storage call of a request in one session and
+    commits once when the endpoint returns, or rolls back if it raises.
+    Use with Depends(unit_of_work, scope="function") so the commit happens
+    before the response is sent.
+    """
+    # Async so the context variable is set in the request's own context
+    db = AsyncSessionLocal()
+    token = _async_unit_of_work.set(db)
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        _async_unit_of_work.reset(token)
+        await db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, JSON, Table, Date
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, JSON, Table, Date, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -6,8 +6,8 @@ from app.database import Base
 workload_ci = Table(
     "workload_ci",
     Base.metadata,
-    Column("workload_id", String, ForeignKey("workloads.id")),
-    Column("ci_id", String, ForeignKey("configuration_items.id")),
+    Column("workload_id", String, ForeignKey("workloads.id"), index=True),
+    Column("ci_id", String, ForeignKey("configuration_items.id"), index=True),
 )
 
 # Many-to-many relationship table for Wave and Workload
@@ -45,6 +45,9 @@ class ConfigurationItem(Base):
 
 class Workload(Base):
     __tablename__ = "workloads"
+    __table_args__ = (
+        Index("ix_workloads_name_environment", "name", "environment"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -62,8 +65,8 @@ class Dependency(Base):
     __tablename__ = "dependencies"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    source_workload_id = Column(String, ForeignKey("workloads.id"))
-    target_workload_id = Column(String, ForeignKey("workloads.id"))
+    source_workload_id = Column(String, ForeignKey("workloads.id"), index=True)
+    target_workload_id = Column(String, ForeignKey("workloads.id"), index=True)
     environment = Column(String)
     level = Column(String)
     latency_sensitive = Column(Boolean)
@@ -107,15 +110,37 @@ class DiscoveredDataEntity(Base):
     data_entity_name = Column(String)
     data_source_id = Column(String, ForeignKey("data_sources.id"), nullable=True)
     status = Column(String, default="Ingested") # Ingested, Standardised, Normalised, Aggregated, Published
+    # Columnar layout: values are stored in sheet column order instead of as DiscoveredDataField rows
+    sheet_id = Column(String, ForeignKey("discovered_data_sheets.id"), nullable=True)
+    field_values = Column(JSON, nullable=True)
 
     fields = relationship("DiscoveredDataField", back_populates="entity", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Serves data source filters and keeps their pages in id order
+        Index("ix_discovered_data_entities_source_id", "data_source_id", "id"),
+    )
+
+class DiscoveredDataSheet(Base):
+    __tablename__ = "discovered_data_sheets"
+
+    id = Column(String, primary_key=True, index=True)
+    created_time = Column(String)
+    data_source_id = Column(String, ForeignKey("data_sources.id"), nullable=True)
+    worksheet = Column(String)
+    columns = Column(JSON) # ordered source field names shared by every row of the sheet
+    rating = Column(String)
+
 class DiscoveredDataField(Base):
     __tablename__ = "discovered_data_fields"
+    __table_args__ = (
+        # Value first so searches by value alone can use it too
+        Index("ix_discovered_data_fields_value_name", "field_value", "field_name"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     created_time = Column(String)
-    discovered_data_entity_id = Column(String, ForeignKey("discovered_data_entities.id"))
+    discovered_data_entity_id = Column(String, ForeignKey("discovered_data_entities.id"), index=True)
     field_name = Column(String)
     field_value = Column(String)
     rating = Column(String)
@@ -148,6 +173,9 @@ class DataSource(Base):
 
 class FieldMapping(Base):
     __tablename__ = "field_mappings"
+    __table_args__ = (
+        Index("ix_field_mappings_data_source_worksheet", "data_source", "worksheet"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     source_field = Column(String)
@@ -158,6 +186,24 @@ class FieldMapping(Base):
     data_dictionary_field_id = Column(String, ForeignKey("data_fields.id"), nullable=True)
     status = Column(String)
     process = Column(Boolean)
+    values_fingerprint = Column(String, nullable=True) # digest of the sampled column values
+
+class RecommendationMemo(Base):
+    # Remembered recommendation for a source field with a given value sample.
+    # origin "resolved" comes from user-resolved field mappings, "recommended" from scoring.
+    __tablename__ = "recommendation_memos"
+    __table_args__ = (UniqueConstraint("source_field_key", "values_fingerprint"),)
+
+    id = Column(String, primary_key=True, index=True)
+    source_field_key = Column(String, index=True)
+    values_fingerprint = Column(String)
+    data_entity = Column(String, nullable=True)
+    target_field = Column(String, nullable=True)
+    data_dictionary_field_id = Column(String, nullable=True)
+    origin = Column(String)
+    updated_time = Column(String)
+    # Data dictionary version a "recommended" memo was scored against; older ones are ignored
+    dictionary_version = Column(Integer, nullable=True)
 
 class Wave(Base):
     __tablename__ = "waves"
@@ -221,7 +267,7 @@ class ScoreCardOption(Base):
 class S2TMapping(Base):
     __tablename__ = "s2t_mappings"
     id = Column(String, primary_key=True, index=True)
-    workload_id = Column(String, ForeignKey("workloads.id"))
+    workload_id = Column(String, ForeignKey("workloads.id"), index=True)
     move_principle_id = Column(String, ForeignKey("move_principles.id"))
     target_environment_id = Column(String, ForeignKey("environments.id"))
     target_location = Column(String)
@@ -265,3 +311,16 @@ class AccessRight(Base):
     execute = Column(Boolean, default=False)
     
     role = relationship("Role")
+
+class TableVersion(Base):
+    # Change counter per table, shared by all workers (see app.services.table_versions)
+    __tablename__ = "table_versions"
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SchemaVersion(Base):
+    # One row per migration applied by app.services.migrations
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+    description = Column(String)
+    applied_at = Column(String)
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Optional, Dict, Any
+
+class IngestionJob(BaseModel):
+    id: str
+    kind: str
+    status: str
+    filename: Optional[str] = None
+    data_source_id: Optional[str] = None
+    current_worksheet: Optional[str] = None
+    rows_processed: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[str] = []
+    result: Optional[Dict[str, Any]] = None
+    created_time: Optional[str] = None
+    started_time: Optional[str] = None
+    finished_time: Optional[str] = None
+
+class IngestionJobAccepted(BaseModel):
+    job_id: str
+    status: str
+    source_id: Optional[str] = None
@@ -58,3 +58,14 @@ class DataSourceCreate(DataSourceBase):
 class DataSource(DataSourceBase):
     id: str
     model_config = ConfigDict(from_attributes=True)
+
+class FieldRecommendationRequest(BaseModel):
+    columns: List[str]
+    # Sampled values per column, used for the standard-value boost
+    samples: Dict[str, List[Any]] = Field(default_factory=dict)
+
+class FieldRecommendation(BaseModel):
+    source_field: str
+    data_entity: Optional[str] = None
+    target_field: Optional[str] = None
+    data_dictionary_field_id: Optional[str] = None
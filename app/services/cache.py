@@ -0,0 +1,130 @@
+"""
+Read-through cache for reference data listings that change rarely but are
+read on most requests and inside upload loops. Entries are stamped with the
+versions of the tables they were read from (app.services.table_versions) and
+are dropped as soon as a committed write bumps one of them, when their TTL
+runs out, or when the cache is full (least recently used first). With
+cache.shared_versions, writes made by other workers reach this one within
+cache.sync_interval.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import functools
+import threading
+import time
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import current_async_session, current_session
+from app.services.table_versions import table_versions
+
+class ReadCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires at, table versions, value)
+        self._entries: "OrderedDict[tuple, Tuple[float, tuple, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, versions: tuple, count_miss: bool = True) -> Tuple[bool, Any]:
+        name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, entry_versions, value = entry
+                if entry_versions == versions and time.monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits[name] = self.hits.get(name, 0) + 1
+                    return True, value
+                del self._entries[key]
+                if entry_versions != versions:
+                    self.stale += 1
+                else:
+                    self.expired += 1
+            if count_miss:
+                self.misses[name] = self.misses.get(name, 0) + 1
+            return False, None
+
+    def put(self, key: tuple, versions: tuple, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "methods": {
+                    name: {
+                        "hits": self.hits.get(name, 0),
+                        "misses": self.misses.get(name, 0)
+                    } for name in sorted(set(self.hits) | set(self.misses))
+                }
+            }
+
+read_cache = ReadCache(settings.cache.ttl, settings.cache.max_entries)
+
+def _has_pending_writes(db: Optional[Session]) -> bool:
+    # A unit of work that already wrote may read its own uncommitted rows,
+    # which must neither be served to others nor hidden from it
+    if db is None:
+        return False
+    return bool(db.info.get("written_tables") or db.new or db.dirty or db.deleted)
+
+def cached(*tables: str) -> Callable:
+    """
+    Caches a storage read method that reads only `tables`. Callers get a new
+    list each time, but the rows in it are shared and must not be modified.
+    """
+    table_versions.share(*tables)
+
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            db = current_session()
+            if not settings.cache.enabled or _has_pending_writes(db):
+                return fn(self, *args, **kwargs)
+            table_versions.sync(db)
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            # Versions before the read: a write committed meanwhile makes the
+            # entry stale rather than hiding it
+            versions = table_versions.get(*tables)
+            hit, value = read_cache.get(key, versions)
+            if not hit:
+                value = fn(self, *args, **kwargs)
+                read_cache.put(key, versions, value)
+            return list(value)
+
+        def peek(*args, **kwargs) -> Tuple[bool, Any]:
+            # Hit without a session, for AsyncStorage; anything that needs
+            # the database (a unit of work, a due sync) goes the long way
+            if not settings.cache.enabled or current_async_session() is not None or table_versions.sync_due():
+                return False, None
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            hit, value = read_cache.get(key, table_versions.get(*tables), count_miss=False)
+            return hit, list(value) if hit else None
+
+        wrapper.peek = peek
+        return wrapper
+    return decorate
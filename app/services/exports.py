@@ -0,0 +1,175 @@
+"""
+Streaming exports of the inventory. Rows are read with yield_per through a
+server-side cursor on the async engine and encoded one partition at a time,
+so memory stays flat and the first chunk goes out as soon as the first
+partition is read.
+"""
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List
+import csv
+import io
+import orjson
+from sqlalchemy import select
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import models
+from app.services.storage import columnar_field_dicts
+
+async def _partitions(query) -> AsyncIterator[List[Any]]:
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.exports.yield_per))
+        async for partition in result.mappings().partitions():
+            yield partition
+
+async def _grouped(query, start: Callable, add: Callable) -> AsyncIterator[List[Dict[str, Any]]]:
+    # Joined rows arrive ordered by the parent id; fold consecutive rows of
+    # the same parent into one record
+    current = None
+    async for partition in _partitions(query):
+        records = []
+        for row in partition:
+            if current is None or current["id"] != row["id"]:
+                if current is not None:
+                    records.append(current)
+                current = start(row)
+            add(current, row)
+        yield records
+    if current is not None:
+        yield [current]
+
+async def _cis() -> AsyncIterator[List[Dict[str, Any]]]:
+    ci = models.ConfigurationItem
+    async for partition in _partitions(select(ci.id, ci.name, ci.type, ci.description, ci.properties).order_by(ci.id)):
+        yield [dict(row) for row in partition]
+
+async def _dependencies() -> AsyncIterator[List[Dict[str, Any]]]:
+    dep = models.Dependency
+    query = select(dep.source_workload_id, dep.target_workload_id, dep.environment, dep.level,
+                   dep.latency_sensitive, dep.type).order_by(dep.id)
+    async for partition in _partitions(query):
+        yield [dict(row) for row in partition]
+
+def _start_workload(row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "description": row["description"],
+        "environment": row["environment"],
+        "hosting_model": row["hosting_model"],
+        "ci_ids": [],
+        "relationships": row["internal_relationships"]
+    }
+
+def _add_workload_ci(workload: Dict[str, Any], row):
+    if row["ci_id"] is not None:
+        workload["ci_ids"].append(row["ci_id"])
+
+async def _workloads() -> AsyncIterator[List[Dict[str, Any]]]:
+    wl = models.Workload
+    query = select(
+        wl.id, wl.name, wl.description, wl.environment, wl.hosting_model, wl.internal_relationships,
+        models.workload_ci.c.ci_id
+    ).outerjoin(models.workload_ci, models.workload_ci.c.workload_id == wl.id).order_by(wl.id)
+    async for records in _grouped(query, _start_workload, _add_workload_ci):
+        yield records
+
+async def _discovered_data() -> AsyncIterator[List[Dict[str, Any]]]:
+    entity = models.DiscoveredDataEntity
+    field = models.DiscoveredDataField
+    # Columnar sheets are few (one per uploaded worksheet)
+    sheets = {}
+    async with AsyncSessionLocal() as session:
+        for sheet in (await session.execute(select(models.DiscoveredDataSheet))).scalars():
+            sheets[sheet.id] = (sheet.columns or [], sheet.rating)
+
+    def start(row) -> Dict[str, Any]:
+        fields = []
+        if row["sheet_id"] in sheets:
+            columns, rating = sheets[row["sheet_id"]]
+            fields = columnar_field_dicts(row["id"], row["created_time"], row["field_values"], columns, rating)
+        return {
+            "id": row["id"],
+            "created_time": row["created_time"],
+            "source_type": row["source_type"],
+            "user": row["user"],
+            "data_entity_name": row["data_entity_name"],
+            "data_source_id": row["data_source_id"],
+            "source_name": row["source_name"],
+            "status": row["status"],
+            "fields": fields
+        }
+
+    def add(record: Dict[str, Any], row):
+        if row["field_id"] is not None:
+            record["fields"].append({
+                "id": row["field_id"],
+                "created_time": row["field_created_time"],
+                "discovered_data_entity_id": record["id"],
+                "field_name": row["field_name"],
+                "field_value": row["field_value"],
+                "rating": row["rating"]
+            })
+
+    query = select(
+        entity.id, entity.created_time, entity.source_type, entity.user, entity.data_entity_name,
+        entity.data_source_id, entity.status, entity.sheet_id, entity.field_values,
+        models.DataSource.name.label("source_name"),
+        field.id.label("field_id"), field.created_time.label("field_created_time"),
+        field.field_name, field.field_value, field.rating
+    ).outerjoin(
+        models.DataSource, entity.data_source_id == models.DataSource.id
+    ).outerjoin(
+        field, field.discovered_data_entity_id == entity.id
+    ).order_by(entity.id)
+    async for records in _grouped(query, start, add):
+        yield records
+
+def _discovered_csv_rows(record: Dict[str, Any]) -> Iterable[List[Any]]:
+    # One row per field, entity columns repeated
+    entity = [record[c] for c in DISCOVERED_ENTITY_COLUMNS]
+    if not record["fields"]:
+        yield entity + [None, None, None]
+    for f in record["fields"]:
+        yield entity + [f["field_name"], f["field_value"], f["rating"]]
+
+DISCOVERED_ENTITY_COLUMNS = ["id", "created_time", "source_type", "user", "data_entity_name", "data_source_id", "source_name", "status"]
+
+# name -> (record partitions, CSV header, CSV rows of one record)
+EXPORTS: Dict[str, tuple] = {
+    "cis": (_cis, ["id", "name", "type", "description", "properties"], None),
+    "workloads": (_workloads, ["id", "name", "description", "environment", "hosting_model", "ci_ids", "relationships"], None),
+    "dependencies": (_dependencies, ["source_workload_id", "target_workload_id", "environment", "level", "latency_sensitive", "type"], None),
+    "discovered-data": (_discovered_data, DISCOVERED_ENTITY_COLUMNS + ["field_name", "field_value", "rating"], _discovered_csv_rows),
+}
+
+def _csv_cell(value: Any) -> Any:
+    # Lists and dicts (properties, ci_ids, relationships) as JSON text
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode()
+    return value
+
+async def stream_export(name: str, format: str) -> AsyncIterator[bytes]:
+    records_of, header, csv_rows = EXPORTS[name]
+    if format == "ndjson":
+        async for records in records_of():
+            if records:
+                yield b"".join(orjson.dumps(record) + b"\n" for record in records)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain() -> bytes:
+        chunk = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(header)
+    yield drain()
+    async for records in records_of():
+        for record in records:
+            rows = csv_rows(record) if csv_rows else [[record[c] for c in header]]
+            writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        chunk = drain()
+        if chunk:
+            yield chunk
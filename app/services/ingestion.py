@@ -0,0 +1,411 @@
+from typing import Dict, List, Any, Optional, Iterable, Callable
+from fastapi import UploadFile
+import pandas as pd
+import tempfile
+import json
+import time
+import os
+from app.config import settings
+from app.schemas.prepare import CIType
+from app.services.storage import storage
+from app.services.recommendations import recommend_fields_batch
+from app.utils.recommender import values_fingerprint
+from app.utils.workbook import WorkbookReader
+
+SPOOL_READ_SIZE = 1024 * 1024
+
+async def spool_upload(file: UploadFile) -> str:
+    # Copy the upload to a temporary file in fixed-size reads so the whole
+    # payload is never held in memory. The caller removes the file.
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="nubirix_upload_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(SPOOL_READ_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+def remove_spooled(path: Optional[str]):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def read_frame(path: str, filename: str) -> pd.DataFrame:
+    if filename.endswith('.csv'):
+        return pd.read_csv(path)
+    elif filename.endswith(('.xls', '.xlsx')):
+        return pd.read_excel(path)
+    raise ValueError("Invalid file format")
+
+def read_csv_chunks(path: str, header_row: int = 1) -> Iterable[pd.DataFrame]:
+    return pd.read_csv(path, header=header_row - 1, chunksize=settings.ingestion.csv_chunk_size)
+
+class ColumnSampler:
+    # Collects the first N distinct non-null values of every column across chunks,
+    # matching df[col].dropna().unique()[:N] on the full frame.
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit or settings.recommender.sample_size
+        self.columns: List[Any] = []
+        self._samples: Dict[Any, Dict[Any, None]] = {}
+
+    def add(self, df: pd.DataFrame):
+        for col in df.columns:
+            seen = self._samples.get(col)
+            if seen is None:
+                self.columns.append(col)
+                seen = self._samples[col] = {}
+            if len(seen) >= self.limit:
+                continue
+            for value in df[col].dropna().unique().tolist():
+                seen.setdefault(value, None)
+                if len(seen) >= self.limit:
+                    break
+
+    def samples(self, col: Any) -> List[Any]:
+        return list(self._samples.get(col, {}))
+
+def create_field_mappings(
+    sampler: ColumnSampler,
+    source_name: str,
+    worksheet: str
+) -> int:
+    # Generate initial field mappings for this worksheet
+    columns = [str(col) for col in sampler.columns]
+    samples = {str(col): sampler.samples(col) for col in sampler.columns}
+    recommendations = recommend_fields_batch(columns, samples)
+    for col, (rec_entity, rec_field, rec_field_id) in zip(columns, recommendations):
+        storage.add_field_mapping({
+            "source_field": col,
+            "data_source": source_name,
+            "worksheet": worksheet,
+            "data_entity": rec_entity,
+            "target_field": rec_field,
+            "data_dictionary_field_id": rec_field_id,
+            "status": "Pending",
+            "process": True,
+            "values_fingerprint": values_fingerprint(samples[col])
+        })
+    return len(columns)
+
+def ingest_worksheet_rows(
+    df: pd.DataFrame,
+    worksheet: str,
+    data_source_id: Optional[str],
+    rating: Optional[str],
+    source_type: str = "file",
+    user: str = "admin",
+    sheet_id: Optional[str] = None
+) -> int:
+    # Write every row of the frame as discovered data in one bulk transaction
+    return storage.bulk_add_discovered_data(
+        {
+            "source_type": source_type,
+            "user": user,
+            "data_entity_name": worksheet,
+            "data_source_id": data_source_id
+        },
+        [str(col) for col in df.columns],
+        df.itertuples(index=False, name=None),
+        rating=rating,
+        batch_size=settings.ingestion.bulk_batch_size,
+        sheet_id=sheet_id
+    )
+
+def ingest_worksheet(
+    chunks: Iterable[pd.DataFrame],
+    worksheet: str,
+    data_source_id: str,
+    source_name: str,
+    rating: Optional[str],
+    records_before: int = 0,
+    on_chunk: Optional[Callable[[int], None]] = None
+) -> int:
+    # Stream a worksheet chunk by chunk: sample values for recommendations, write
+    # the discovered data and keep DataSource.records current after every chunk.
+    sampler = ColumnSampler()
+    columnar = settings.ingestion.discovered_data_layout == "columnar"
+    sheet_id = None
+    rows = 0
+    for chunk in chunks:
+        if columnar and sheet_id is None:
+            sheet_columns = list(chunk.columns)
+            sheet_id = storage.add_discovered_data_sheet({
+                "data_source_id": data_source_id,
+                "worksheet": worksheet,
+                "columns": sheet_columns,
+                "rating": rating
+            })
+        elif columnar and len(chunk.columns) > len(sheet_columns):
+            # Later rows were wider; earlier value lists stay shorter
+            sheet_columns = list(chunk.columns)
+            storage.update_discovered_data_sheet_columns(sheet_id, sheet_columns)
+        sampler.add(chunk)
+        rows += ingest_worksheet_rows(chunk, worksheet, data_source_id, rating, sheet_id=sheet_id)
+        storage.update_data_source(data_source_id, {"records": records_before + rows})
+        if on_chunk:
+            on_chunk(rows)
+
+    create_field_mappings(sampler, source_name, worksheet)
+    return rows
+
+def ingest_ci_rows(df: pd.DataFrame, data_source_id: Optional[str] = None) -> int:
+    # Create a CI per row and record the raw row as discovered data; the CIs
+    # of the chunk are written in one batched insert
+    columns = [str(col) for col in df.columns]
+    cis: List[Dict[str, Any]] = []
+    discovered_rows: Dict[str, List[tuple]] = {}
+    for row in df.itertuples(index=False, name=None):
+        values = dict(zip(df.columns, row))
+        # Basic mapping logic - assuming column names match or are close
+        try:
+            ci_data = {
+                "name": str(values.get("name", "Unnamed")),
+                "type": values.get("type", CIType.OTHER),
+                "description": values.get("description", ""),
+                "properties": json.loads(values.get("properties", "{}")) if isinstance(values.get("properties"), str) else {}
+            }
+        except Exception:
+            continue
+        cis.append(ci_data)
+        discovered_rows.setdefault(str(ci_data["type"]), []).append(row)
+    storage.bulk_add_cis(cis, batch_size=settings.ingestion.bulk_batch_size)
+
+    ingested_count = 0
+    for entity_name, rows in discovered_rows.items():
+        ingested_count += storage.bulk_add_discovered_data(
+            {
+                "source_type": "file",
+                "user": "admin",
+                "data_entity_name": entity_name,
+                "data_source_id": data_source_id
+            },
+            columns,
+            rows,
+            rating="high",
+            batch_size=settings.ingestion.bulk_batch_size
+        )
+    return ingested_count
+
+def rows_per_second(rows: int, elapsed: float) -> float:
+    return round(rows / elapsed, 1) if elapsed > 0 else float(rows)
+
+# Pipelines below run either inline in the request or inside a background job.
+# They own the spooled file and remove it when done; `job` receives progress.
+
+def run_dataset_upload(
+    path: str,
+    filename: str,
+    source_name: str,
+    rating: Optional[str],
+    worksheets: List[Dict[str, Any]],
+    data_source_id: str,
+    job=None
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    total_records = 0
+    workbook = None
+    try:
+        if filename.endswith('.xlsx'):
+            # Parse the workbook once and stream every requested sheet from it
+            workbook = WorkbookReader(path)
+
+        for ws_info in worksheets:
+            ws_name = ws_info["name"]
+            h_row = int(ws_info["header_row"])
+            if job:
+                job.update(worksheet=ws_name)
+
+            if filename.endswith('.csv'):
+                # Stream CSV files in fixed-size chunks to keep memory bounded
+                chunks = read_csv_chunks(path, h_row)
+            elif workbook:
+                chunks = workbook.iter_chunks(ws_name, h_row, settings.ingestion.csv_chunk_size)
+            elif filename.endswith('.xls'):
+                chunks = [pd.read_excel(path, sheet_name=ws_name, header=h_row-1)]
+            else:
+                raise ValueError("Invalid file format")
+
+            before = total_records
+            on_chunk = (lambda rows: job.update(rows_processed=before + rows)) if job else None
+            total_records += ingest_worksheet(chunks, ws_name, data_source_id, source_name, rating, records_before=before, on_chunk=on_chunk)
+
+        # Update total records and status
+        storage.update_data_source(data_source_id, {
+            "records": total_records,
+            "status": "Success"
+        })
+    except Exception as e:
+        storage.update_data_source(data_source_id, {"status": "Error", "message": str(e)})
+        raise
+    finally:
+        if workbook:
+            workbook.close()
+        remove_spooled(path)
+
+    elapsed = time.perf_counter() - started
+    throughput = rows_per_second(total_records, elapsed)
+
+    return {
+        "message": f"Successfully uploaded {source_name} with {total_records} records from {len(worksheets)} worksheets",
+        "source_id": data_source_id,
+        "source_name": source_name,
+        "rows_ingested": total_records,
+        "duration_seconds": round(elapsed, 3),
+        "rows_per_second": throughput
+    }
+
+def run_ci_ingest(path: str, filename: str, data_source_id: str, job=None) -> Dict[str, Any]:
+    workbook = None
+    try:
+        if filename.endswith('.csv'):
+            chunks = read_csv_chunks(path)
+        elif filename.endswith('.xlsx'):
+            workbook = WorkbookReader(path)
+            chunks = workbook.iter_chunks(chunk_size=settings.ingestion.csv_chunk_size)
+        else:
+            chunks = [pd.read_excel(path)]
+
+        ingested_count = 0
+        rows_seen = 0
+        for chunk in chunks:
+            ingested = ingest_ci_rows(chunk, data_source_id)
+            ingested_count += ingested
+            rows_seen += len(chunk)
+            storage.update_data_source(data_source_id, {"records": ingested_count})
+            if job:
+                job.update(rows_processed=rows_seen)
+                if ingested < len(chunk):
+                    job.add_error(f"Skipped {len(chunk) - ingested} invalid rows before row {rows_seen + 1}")
+
+        storage.update_data_source(data_source_id, {"status": "Success"})
+    except Exception:
+        storage.update_data_source(data_source_id, {"status": "Error"})
+        raise
+    finally:
+        if workbook:
+            workbook.close()
+        remove_spooled(path)
+
+    return {"message": f"Successfully ingested {ingested_count} items"}
+
+def run_workload_ingest(path: str, filename: str, job=None) -> Dict[str, Any]:
+    try:
+        df = read_frame(path, filename)
+    finally:
+        remove_spooled(path)
+
+    # Group by (Parent Application Package Name, AWI Environment)
+    # Using columns from the provided AWI template
+    name_col = 'Parent Application Package Name'
+    env_col = 'AWI Environment'
+    hosting_col = 'AWI Current Hosting Model'
+    asset_col = 'Secondary Entity Anchor Value'
+    
+    # Some rows might have missing values, fill them
+    df[name_col] = df[name_col].ffill()
+    df[env_col] = df[env_col].ffill()
+    
+    grouped = df.groupby([name_col, env_col])
+    
+    ingested_count = 0
+    rows_seen = 0
+    for (name, env), group in grouped:
+        # Check if workload already exists
+        workload = storage.get_workload_by_name_and_env(name, env)
+        
+        # Collect CI IDs
+        ci_ids = []
+        for _, row in group.iterrows():
+            asset_name = row.get(asset_col)
+            if pd.notna(asset_name):
+                ci = storage.get_ci_by_name(str(asset_name))
+                if ci:
+                    if ci["id"] not in ci_ids:
+                        ci_ids.append(ci["id"])
+                else:
+                    # For prototype, if CI not found, we could create it or just ignore
+                    # Let's create a minimal CI so the relationship is visible
+                    new_ci_id = storage.add_ci({
+                        "name": str(asset_name),
+                        "type": "other",
+                        "description": "Auto-created during AWI ingestion",
+                        "properties": {}
+                    })
+                    ci_ids.append(new_ci_id)
+        
+        hosting_model = group[hosting_col].iloc[0] if hosting_col in group.columns and pd.notna(group[hosting_col].iloc[0]) else "On-Premise"
+        
+        if workload:
+            # Update existing workload
+            new_ci_ids = list(set(workload.get("ci_ids", []) + ci_ids))
+            storage.update_workload(workload["id"], {
+                "ci_ids": new_ci_ids,
+                "hosting_model": hosting_model
+            })
+        else:
+            # Create new workload
+            storage.add_workload({
+                "name": name,
+                "environment": env,
+                "hosting_model": hosting_model,
+                "ci_ids": ci_ids,
+                "description": f"Ingested from {filename}",
+                "relationships": []
+            })
+            ingested_count += 1
+
+        rows_seen += len(group)
+        if job:
+            job.update(rows_processed=rows_seen)
+            
+    return {"message": f"Successfully processed {len(grouped)} workloads ({ingested_count} new)"}
+
+def run_dependency_ingest(path: str, filename: str, job=None) -> Dict[str, Any]:
+    try:
+        df = read_frame(path, filename)
+    finally:
+        remove_spooled(path)
+        
+    # Columns: 'Parent Application Package Name', 'Linked Parent Application Package Name', 'Dependency Link Environment', 'Dependency Level', 'Latency Sensitive'
+    src_col = 'Parent Application Package Name'
+    target_col = 'Linked Parent Application Package Name'
+    env_col = 'Dependency Link Environment'
+    level_col = 'Dependency Level'
+    latency_col = 'Latency Sensitive'
+    
+    ingested_count = 0
+    for index, (_, row) in enumerate(df.iterrows(), start=1):
+        if job:
+            job.update(rows_processed=index)
+
+        src_name = row.get(src_col)
+        target_name = row.get(target_col)
+        env = row.get(env_col, "PROD")
+        
+        if pd.isna(src_name) or pd.isna(target_name):
+            continue
+            
+        src_wl = storage.get_workload_by_name_and_env(src_name, env)
+        target_wl = storage.get_workload_by_name_and_env(target_name, env)
+        
+        if src_wl and target_wl:
+            storage.add_dependency({
+                "source_workload_id": src_wl["id"],
+                "target_workload_id": target_wl["id"],
+                "environment": env,
+                "level": str(row.get(level_col, "Medium")),
+                "latency_sensitive": bool(row.get(latency_col, False)),
+                "type": "dependency"
+            })
+            ingested_count += 1
+        else:
+            # For prototype, if workloads don't exist, we might want to create them
+            # but usually AWIs should be ingested first.
+            pass
+            
+    return {"message": f"Successfully ingested {ingested_count} dependencies"}
@@ -0,0 +1,135 @@
+from typing import Dict, List, Any, Optional, Callable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import threading
+import time
+import uuid
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_JOB_ERRORS = 100
+
+class IngestionJob:
+    def __init__(self, kind: str, filename: Optional[str] = None, data_source_id: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.filename = filename
+        self.data_source_id = data_source_id
+        self.status = "Queued" # Queued, Running, Completed, Failed
+        self.current_worksheet: Optional[str] = None
+        self.rows_processed = 0
+        self.errors: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.started_time: Optional[str] = None
+        self.finished_time: Optional[str] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, rows_processed: Optional[int] = None, worksheet: Optional[str] = None):
+        with self._lock:
+            if rows_processed is not None:
+                self.rows_processed = rows_processed
+            if worksheet is not None:
+                self.current_worksheet = worksheet
+
+    def add_error(self, message: str):
+        with self._lock:
+            if len(self.errors) < MAX_JOB_ERRORS:
+                self.errors.append(message)
+
+    def start(self):
+        with self._lock:
+            self.status = "Running"
+            self._started = time.perf_counter()
+            self.started_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def finish(self, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._lock:
+            self.status = "Failed" if error else "Completed"
+            if error and len(self.errors) < MAX_JOB_ERRORS:
+                self.errors.append(error)
+            self.result = result
+            self._finished = time.perf_counter()
+            self.finished_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("Completed", "Failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = 0.0
+            if self._started is not None:
+                elapsed = (self._finished or time.perf_counter()) - self._started
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "filename": self.filename,
+                "data_source_id": self.data_source_id,
+                "current_worksheet": self.current_worksheet,
+                "rows_processed": self.rows_processed,
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0.0,
+                "errors": list(self.errors),
+                "result": self.result,
+                "created_time": self.created_time,
+                "started_time": self.started_time,
+                "finished_time": self.finished_time
+            }
+
+class JobManager:
+    # Runs ingestion pipelines on worker threads and keeps their progress in
+    # memory. Job ids are only known to the process that accepted the upload.
+    def __init__(self, max_workers: int = 2, retention: int = 200):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion-job")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._retention = retention
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[..., Dict[str, Any]],
+        *args,
+        filename: Optional[str] = None,
+        data_source_id: Optional[str] = None,
+        **kwargs
+    ) -> IngestionJob:
+        job = IngestionJob(kind, filename, data_source_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: IngestionJob, fn: Callable[..., Dict[str, Any]], args, kwargs):
+        job.start()
+        try:
+            job.finish(result=fn(*args, job=job, **kwargs))
+        except Exception as e:
+            logger.exception("Ingestion job %s (%s) failed", job.id, job.kind)
+            job.finish(error=str(e))
+
+    def _prune(self):
+        # Forget the oldest finished jobs once the retention limit is exceeded
+        excess = len(self._jobs) - self._retention
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, j in self._jobs.items() if j.done][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestionJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+job_manager = JobManager(settings.jobs.max_workers, settings.jobs.retention)
@@ -0,0 +1,147 @@
+"""
+Versioned schema migrations. Each step runs once, in order, in its own
+transaction, and is recorded in schema_version. Steps check the live schema
+before changing it, so a database that already has a step's changes (for
+example one just created by create_all) is only stamped. Workers starting
+together can race between that check and the DDL; the loser's "already
+exists" error is retried against the changed schema.
+"""
+from typing import Callable, List, Tuple
+from datetime import datetime
+import logging
+from sqlalchemy import Column, Engine, func, inspect, insert, literal, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from app.database import Base
+from app.models import models
+
+logger = logging.getLogger(__name__)
+
+def _add_column(conn: Connection, column: Column):
+    # ALTER TABLE ... ADD COLUMN rendered from the model for the connection's dialect
+    preparer = conn.dialect.identifier_preparer
+    ddl = f"ALTER TABLE {preparer.format_table(column.table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+    if column.default is not None and column.default.is_scalar:
+        default = literal(column.default.arg).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {default}"
+    for fk in column.foreign_keys:
+        ddl += f" REFERENCES {preparer.quote(fk.column.table.name)}({preparer.quote(fk.column.name)})"
+    conn.execute(text(ddl))
+
+def _add_missing_columns(conn: Connection, *columns: Column):
+    inspector = inspect(conn)
+    for column in columns:
+        existing = [col['name'] for col in inspector.get_columns(column.table.name)]
+        if column.name not in existing:
+            _add_column(conn, column)
+
+def _create_missing_indexes(conn: Connection, *names: str):
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    inspector = inspect(conn)
+    for name in names:
+        index = indexes[name]
+        if name not in {ix['name'] for ix in inspector.get_indexes(index.table.name)}:
+            index.create(conn, checkfirst=True)
+
+def _discovered_data_columns(conn: Connection):
+    _add_missing_columns(
+        conn,
+        models.DiscoveredDataEntity.__table__.c.status,
+        # Columnar layout
+        models.DiscoveredDataEntity.__table__.c.sheet_id,
+        models.DiscoveredDataEntity.__table__.c.field_values,
+        models.FieldMapping.__table__.c.values_fingerprint
+    )
+
+def _discovered_data_indexes(conn: Connection):
+    _create_missing_indexes(
+        conn,
+        "ix_discovered_data_entities_source_id",
+        "ix_discovered_data_fields_discovered_data_entity_id",
+        "ix_discovered_data_fields_value_name"
+    )
+
+def _lookup_indexes(conn: Connection):
+    # Columns queried per row by ingestion and by the relationship loaders
+    _create_missing_indexes(
+        conn,
+        "ix_workload_ci_workload_id",
+        "ix_workload_ci_ci_id",
+        "ix_dependencies_source_workload_id",
+        "ix_dependencies_target_workload_id",
+        "ix_s2t_mappings_workload_id",
+        "ix_field_mappings_data_source_worksheet",
+        "ix_workloads_name_environment"
+    )
+
+def _table_version_rows(conn: Connection):
+    # One counter per table; only missing rows, so the step can run again
+    existing = set(conn.execute(select(models.TableVersion.table_name)).scalars())
+    rows = [{"table_name": name, "version": 0} for name in Base.metadata.tables if name not in existing]
+    if rows:
+        conn.execute(insert(models.TableVersion), rows)
+
+def _memo_dictionary_version(conn: Connection):
+    _add_missing_columns(conn, models.RecommendationMemo.__table__.c.dictionary_version)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Discovered data status, columnar layout and mapping fingerprint columns", _discovered_data_columns),
+    (2, "Discovered data filter indexes", _discovered_data_indexes),
+    (3, "Foreign key and lookup indexes", _lookup_indexes),
+    (4, "Shared table version counters", _table_version_rows),
+    (5, "Recommendation memo dictionary version", _memo_dictionary_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Attempts per step before a conflicting error is raised
+STEP_ATTEMPTS = 5
+
+def schema_version(engine: Engine) -> int:
+    # One query, no introspection; a database without the table is version 0
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(models.SchemaVersion.version))).scalar() or 0
+    except DBAPIError:
+        return 0
+
+def _already_applied(error: DBAPIError) -> bool:
+    # Duplicate tables, columns, indexes and rows created by another worker
+    message = str(error.orig).lower()
+    return "already exists" in message or "duplicate" in message or "unique constraint" in message
+
+def _retrying(engine: Engine, apply: Callable[[Connection], None]):
+    for attempt in range(STEP_ATTEMPTS):
+        try:
+            with engine.begin() as conn:
+                apply(conn)
+            return
+        except DBAPIError as error:
+            if not _already_applied(error) or attempt == STEP_ATTEMPTS - 1:
+                raise
+
+def _apply_step(step: int, description: str, apply: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def run(conn: Connection):
+        if conn.execute(select(models.SchemaVersion.version).where(models.SchemaVersion.version == step)).first():
+            # Another worker applied this step first
+            return
+        apply(conn)
+        conn.execute(insert(models.SchemaVersion).values(
+            version=step,
+            description=description,
+            applied_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ))
+    return run
+
+def migrate(engine: Engine) -> int:
+    version = schema_version(engine)
+    if version >= LATEST_VERSION:
+        return version
+    _retrying(engine, lambda conn: Base.metadata.create_all(bind=conn))
+    for step, description, apply in MIGRATIONS:
+        if step <= version:
+            continue
+        logger.info("Migrating database schema to version %s: %s", step, description)
+        _retrying(engine, _apply_step(step, description, apply))
+        version = step
+    return version
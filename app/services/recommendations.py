@@ -0,0 +1,60 @@
+from typing import Dict, List, Any, Optional, Tuple
+from app.config import settings
+from app.services.storage import storage
+from app.services.workers import WorkerPoolFull, worker_pools
+from app.utils.recommender import RecommenderIndex, memo_key, values_fingerprint
+
+def recommend_fields_batch(
+    columns: List[str],
+    samples: Optional[Dict[str, List[Any]]] = None,
+    index: Optional[RecommenderIndex] = None
+) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    # (entity, field_name, field_id) for every column of a worksheet, in order.
+    # Without an explicit index, columns seen before with the same sampled
+    # values are answered from the recommendation memo (user-resolved mappings
+    # first) and only the rest are scored against the data dictionary.
+    samples = samples or {}
+    if index is not None:
+        return _score_columns(index, columns, samples)
+
+    keys = [(memo_key(c), values_fingerprint(samples.get(c))) if c else None for c in columns]
+    memos = storage.get_recommendation_memos(key for key, _ in filter(None, keys))
+    results = [memos.get(key) if key else (None, None, None) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        index = storage.get_recommender_index()
+        scored = _score_columns(index, [columns[i] for i in missing], samples)
+        remembered = {}
+        for i, result in zip(missing, scored):
+            results[i] = result
+            remembered[keys[i]] = result
+        storage.save_recommendation_memos(remembered, index.dictionary_version)
+    return results
+
+def _score_columns(
+    index: RecommenderIndex,
+    columns: List[str],
+    samples: Dict[str, List[Any]]
+) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    # Very wide worksheets are split across the worker processes
+    pool = worker_pools.processes
+    parts = pool.max_workers
+    if len(columns) < settings.recommender.process_pool_min_columns or parts < 2:
+        return index.recommend_batch(columns, samples)
+
+    size = -(-len(columns) // parts)
+    chunks = [columns[i:i + size] for i in range(0, len(columns), size)]
+    futures = []
+    try:
+        for chunk in chunks:
+            futures.append(pool.submit(index.recommend_batch, chunk, {c: samples[c] for c in chunk if c in samples}))
+    except WorkerPoolFull:
+        # Busy pool: score the remaining chunks on this thread
+        pass
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    for chunk in chunks[len(futures):]:
+        results.extend(index.recommend_batch(chunk, samples))
+    return results
@@ -1,14 +1,59 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable
+import threading
+from contextlib import contextmanager
 import uuid
-from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine, Base
+from sqlalchemy import and_, event, func, insert, literal_column, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, subqueryload
+from app.config import settings
+from app.database import SessionLocal, engine, Base, current_session, run_in_session
 from app.models import models
+from app.services import migrations
+# Importing it registers the session listeners that version tables on commit
+from app.services.table_versions import table_versions
+from app.services.cache import cached
+from app.utils.recommender import RecommenderIndex, memo_key, values_fingerprint, normalize_standard_value
 from datetime import datetime
 
+# Tables the recommender index is compiled from. Shared, so edits made by
+# other workers reach the index through the table_versions poll.
+DICTIONARY_TABLES = ("data_fields", "standard_values", "data_entities", "data_entity_fields")
+table_versions.share(*DICTIONARY_TABLES)
+
+def shared_dictionary_version():
+    # Sum of the shared dictionary table counters; only ever grows, in every worker
+    return select(func.coalesce(func.sum(models.TableVersion.version), 0)).where(
+        models.TableVersion.table_name.in_(DICTIONARY_TABLES)
+    ).scalar_subquery()
+
+def columnar_field_dicts(entity_id: str, created_time: Optional[str], field_values: Optional[List[Any]],
+                         columns: Optional[List[str]], rating: Optional[str]) -> List[Dict[str, Any]]:
+    # Columnar layout: field records synthesized from the sheet header and row values
+    return [
+        {
+            "id": f"{entity_id}:{i}",
+            "created_time": created_time,
+            "discovered_data_entity_id": entity_id,
+            "field_name": name,
+            "field_value": value,
+            "rating": rating
+        }
+        for i, (name, value) in enumerate(zip(columns or [], field_values or []))
+    ]
+
 class DatabaseStorage:
     def __init__(self):
-        Base.metadata.create_all(bind=engine)
-        self._migrate_db()
+        # Compiled recommender index, rebuilt lazily after data dictionary writes
+        # and when the table versions it was built from change
+        self._recommender_index: Optional[RecommenderIndex] = None
+        self._recommender_index_versions: tuple = ()
+        self._dictionary_version = 0
+        self._recommender_lock = threading.Lock()
+        # Normalized standard value -> data field ids, loaded on first use and
+        # kept current by add_standard_value
+        self._standard_value_index: Optional[Dict[str, frozenset]] = None
+        self._standard_value_index_versions: tuple = ()
+        migrations.migrate(engine)
         # Seed only if empty (using DataField as the master indicator)
         with SessionLocal() as db:
             if db.query(models.DataField).count() == 0:
@@ -26,6 +71,25 @@ class DatabaseStorage:
             
             # Always ensure super_admin exists
             self._seed_users(db)
+            self._seed_recommendation_memos(db)
+
+    @contextmanager
+    def _session(self):
+        # Inside a unit of work (see app.database.unit_of_work) every storage
+        # call shares the request's session
+        db = current_session()
+        if db is not None:
+            yield db
+        else:
+            with SessionLocal() as db:
+                yield db
+
+    def _commit(self, db: Session):
+        # The unit of work commits once at the end; until then just flush
+        if db is current_session():
+            db.flush()
+        else:
+            db.commit()
 
     def _seed_users(self, db: Session):
         try:
@@ -80,25 +144,12 @@ class DatabaseStorage:
                     ar.delete = True
                     ar.execute = True
             
-            db.commit()
+            self._commit(db)
             print("Seeding: User management seed successful.")
         except Exception as e:
             db.rollback()
             print(f"Seeding Error (users): {e}")
 
-    def _migrate_db(self):
-        from sqlalchemy import inspect, text
-        inspector = inspect(engine)
-        
-        # Add status column to discovered_data_entities if it doesn't exist
-        tables = inspector.get_table_names()
-        if 'discovered_data_entities' in tables:
-            columns = [col['name'] for col in inspector.get_columns('discovered_data_entities')]
-            if 'status' not in columns:
-                with engine.connect() as conn:
-                    conn.execute(text("ALTER TABLE discovered_data_entities ADD COLUMN status VARCHAR DEFAULT 'Ingested'"))
-                    conn.commit()
-
     def _fix_existing_ci_types(self, db: Session):
         # Fix legacy CI types that might not match the new lowercase enum
         from app.schemas.prepare import CIType
@@ -115,7 +166,7 @@ class DatabaseStorage:
                     ci.type = "other"
                     updated = True
         if updated:
-            db.commit()
+            self._commit(db)
 
     def _seed_cis_workloads_dependencies(self, db: Session):
         # 1. Seed CIs
@@ -418,28 +469,62 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_ci)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_ci)
-                db.commit()
+                self._commit(db)
         return ci_id
 
-    def get_cis(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            cis = db.query(models.ConfigurationItem).all()
-            return [
-                {
-                    "id": ci.id,
-                    "name": ci.name,
-                    "type": ci.type,
-                    "description": ci.description,
-                    "properties": ci.properties
-                } for ci in cis
-            ]
+    def bulk_add_cis(self, cis: List[Dict[str, Any]], batch_size: int = 5000) -> List[str]:
+        # Written with executemany batches inside a single transaction
+        rows = [
+            {
+                "id": ci.get("id") or str(uuid.uuid4()),
+                "name": ci["name"],
+                "type": ci["type"],
+                "description": ci.get("description"),
+                "properties": ci.get("properties", {})
+            }
+            for ci in cis
+        ]
+        if not rows:
+            return []
+        with self._session() as db:
+            for start in range(0, len(rows), batch_size):
+                db.execute(insert(models.ConfigurationItem.__table__), rows[start:start + batch_size])
+            self._commit(db)
+        return [row["id"] for row in rows]
+
+    def _keyset(self, query, key, limit: Optional[int], after: Any):
+        # Keyset page ordered by an indexed key; unpaged listings keep their
+        # natural order
+        if limit is None and after is None:
+            return query
+        query = query.order_by(key)
+        if after is not None:
+            query = query.filter(key > after)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def _mappings(self, db: Session, query) -> List[Dict[str, Any]]:
+        # Column projections skip ORM object hydration and the identity map;
+        # the labels are the dict keys
+        return [dict(row) for row in db.execute(query).mappings()]
+
+    def count_rows(self, model, **filters) -> int:
+        with self._session() as db:
+            return db.query(func.count()).select_from(model).filter_by(**filters).scalar()
+
+    def get_cis(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        ci = models.ConfigurationItem
+        query = select(ci.id, ci.name, ci.type, ci.description, ci.properties)
+        with self._session() as db:
+            return self._mappings(db, self._keyset(query, ci.id, limit, after))
 
     def get_ci_by_id(self, ci_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             ci = db.query(models.ConfigurationItem).filter(models.ConfigurationItem.id == ci_id).first()
             if ci:
                 return {
@@ -452,7 +537,7 @@ class DatabaseStorage:
             return None
 
     def get_ci_by_name(self, name: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             ci = db.query(models.ConfigurationItem).filter(models.ConfigurationItem.name == name).first()
             if ci:
                 return {
@@ -481,9 +566,9 @@ class DatabaseStorage:
                 internal_relationships=workload_data.get("relationships", [])
             )
             db.add(db_workload)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 ci_ids = workload_data.get("ci_ids", [])
                 db_cis = db.query(models.ConfigurationItem).filter(models.ConfigurationItem.id.in_(ci_ids)).all()
                 
@@ -497,12 +582,13 @@ class DatabaseStorage:
                     internal_relationships=workload_data.get("relationships", [])
                 )
                 db.add(db_workload)
-                db.commit()
+                self._commit(db)
         return workload_id
 
-    def get_workloads(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            workloads = db.query(models.Workload).all()
+    def get_workloads(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._session() as db:
+            query = db.query(models.Workload).options(selectinload(models.Workload.cis))
+            workloads = self._keyset(query, models.Workload.id, limit, after).all()
             return [
                 {
                     "id": wl.id,
@@ -516,7 +602,7 @@ class DatabaseStorage:
             ]
     
     def get_workload_by_id(self, workload_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             wl = db.query(models.Workload).filter(models.Workload.id == workload_id).first()
             if wl:
                 return {
@@ -531,7 +617,7 @@ class DatabaseStorage:
             return None
 
     def update_workload(self, workload_id: str, updates: Dict[str, Any]):
-        with SessionLocal() as db:
+        with self._session() as db:
             db_workload = db.query(models.Workload).filter(models.Workload.id == workload_id).first()
             if db_workload:
                 if "name" in updates: db_workload.name = updates["name"]
@@ -543,12 +629,12 @@ class DatabaseStorage:
                     ci_ids = updates["ci_ids"]
                     db_cis = db.query(models.ConfigurationItem).filter(models.ConfigurationItem.id.in_(ci_ids)).all()
                     db_workload.cis = db_cis
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     def get_workload_by_name_and_env(self, name: str, env: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             wl = db.query(models.Workload).filter(models.Workload.name == name, models.Workload.environment == env).first()
             if wl:
                 return {
@@ -573,29 +659,21 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_dep)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_dep)
-                db.commit()
+                self._commit(db)
 
-    def get_dependencies(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            deps = db.query(models.Dependency).all()
-            return [
-                {
-                    "source_workload_id": d.source_workload_id,
-                    "target_workload_id": d.target_workload_id,
-                    "environment": d.environment,
-                    "level": d.level,
-                    "latency_sensitive": d.latency_sensitive,
-                    "type": d.type
-                } for d in deps
-            ]
+    def get_dependencies(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[Dict[str, Any]]:
+        dep = models.Dependency
+        query = select(dep.id, dep.source_workload_id, dep.target_workload_id, dep.environment, dep.level, dep.latency_sensitive, dep.type)
+        with self._session() as db:
+            return self._mappings(db, self._keyset(query, dep.id, limit, after))
 
     def add_wave(self, wave_data: Dict[str, Any]) -> str:
         wave_id = wave_data.get("id") or str(uuid.uuid4())
-        with SessionLocal() as db:
+        with self._session() as db:
             workload_ids = wave_data.get("workload_ids", [])
             db_workloads = db.query(models.Workload).filter(models.Workload.id.in_(workload_ids)).all()
             
@@ -611,12 +689,15 @@ class DatabaseStorage:
                 mdgs=db_mdgs
             )
             db.add(db_wave)
-            db.commit()
+            self._commit(db)
         return wave_id
 
     def get_waves(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            waves = db.query(models.Wave).all()
+        with self._session() as db:
+            waves = db.query(models.Wave).options(
+                selectinload(models.Wave.workloads),
+                selectinload(models.Wave.mdgs)
+            ).all()
             return [
                 {
                     "id": w.id,
@@ -629,7 +710,7 @@ class DatabaseStorage:
             ]
 
     def get_wave_by_id(self, wave_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             w = db.query(models.Wave).filter(models.Wave.id == wave_id).first()
             if w:
                 return {
@@ -644,7 +725,7 @@ class DatabaseStorage:
 
     def add_runbook(self, runbook_data: Dict[str, Any]) -> str:
         runbook_id = runbook_data.get("id") or str(uuid.uuid4())
-        with SessionLocal() as db:
+        with self._session() as db:
             db_runbook = models.Runbook(
                 id=runbook_id,
                 name=runbook_data["name"],
@@ -652,11 +733,11 @@ class DatabaseStorage:
                 steps=runbook_data.get("steps", [])
             )
             db.add(db_runbook)
-            db.commit()
+            self._commit(db)
         return runbook_id
 
     def get_runbooks(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             runbooks = db.query(models.Runbook).all()
             return [
                 {
@@ -668,7 +749,7 @@ class DatabaseStorage:
             ]
 
     def get_runbook_by_id(self, runbook_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             r = db.query(models.Runbook).filter(models.Runbook.id == runbook_id).first()
             if r:
                 return {
@@ -688,16 +769,18 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_field)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_field)
-                db.commit()
+                self._commit(db)
+        self._invalidate_recommender_index()
         return field_id
 
+    @cached("data_fields", "standard_values")
     def get_data_fields(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            fields = db.query(models.DataField).all()
+        with self._session() as db:
+            fields = db.query(models.DataField).options(selectinload(models.DataField.standard_values)).all()
             return [
                 {
                     "id": f.id,
@@ -711,7 +794,7 @@ class DatabaseStorage:
             ]
 
     def get_data_field_by_id(self, field_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             f = db.query(models.DataField).filter(models.DataField.id == field_id).first()
             if f:
                 return {
@@ -734,15 +817,16 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_sv)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_sv)
-                db.commit()
+                self._commit(db)
+        self._invalidate_recommender_index(standard_value=(sv_data["value"], sv_data["field_id"]))
         return sv_id
 
     def get_standard_values(self, field_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             query = db.query(models.StandardValue)
             if field_id:
                 query = query.filter(models.StandardValue.field_id == field_id)
@@ -750,12 +834,86 @@ class DatabaseStorage:
             return [{"id": sv.id, "field_id": sv.field_id, "value": sv.value} for sv in svs]
 
     def get_standard_value_by_id(self, sv_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             sv = db.query(models.StandardValue).filter(models.StandardValue.id == sv_id).first()
             if sv:
                 return {"id": sv.id, "field_id": sv.field_id, "value": sv.value}
             return None
 
+    def _dictionary_table_versions(self) -> tuple:
+        # Local versions of the dictionary tables, after picking up other workers' edits
+        table_versions.sync(current_session())
+        return table_versions.get(*DICTIONARY_TABLES)
+
+    def get_standard_value_index(self) -> Dict[str, frozenset]:
+        # Snapshot of the normalized standard value -> data field ids index
+        versions = self._dictionary_table_versions()
+        with self._recommender_lock:
+            if self._standard_value_index is not None and self._standard_value_index_versions == versions:
+                return dict(self._standard_value_index)
+            version = self._dictionary_version
+        index: Dict[str, set] = {}
+        with SessionLocal() as db:
+            for field_id, value in db.query(models.StandardValue.field_id, models.StandardValue.value):
+                index.setdefault(normalize_standard_value(value), set()).add(field_id)
+        loaded = {value: frozenset(ids) for value, ids in index.items()}
+        with self._recommender_lock:
+            # A standard value added while loading may be missing from this load
+            if version == self._dictionary_version:
+                self._standard_value_index = loaded
+                self._standard_value_index_versions = versions
+            return loaded
+
+    def get_recommender_index(self) -> RecommenderIndex:
+        # Compiled once from data fields, standard values and data entities and
+        # reused until one of them changes, here or in another worker
+        versions = self._dictionary_table_versions()
+        with self._recommender_lock:
+            if self._recommender_index is not None and self._recommender_index_versions == versions:
+                return self._recommender_index
+            version = self._dictionary_version
+        # Read before the dictionary, so an edit made meanwhile outdates the index's recommendations
+        with SessionLocal() as db:
+            dictionary_version = db.execute(select(shared_dictionary_version())).scalar()
+        index = RecommenderIndex(
+            self.get_data_fields(),
+            self.get_data_entities(),
+            shortlist_size=settings.recommender.shortlist_size,
+            standard_value_index=self.get_standard_value_index(),
+            dictionary_version=dictionary_version
+        )
+        with self._recommender_lock:
+            # Don't cache an index that raced with a dictionary write
+            if version == self._dictionary_version:
+                self._recommender_index = index
+                self._recommender_index_versions = versions
+        return index
+
+    def _invalidate_recommender_index(self, standard_value: Optional[tuple] = None):
+        with self._recommender_lock:
+            if standard_value and self._standard_value_index is not None:
+                value, field_id = standard_value
+                key = normalize_standard_value(value)
+                # Replace rather than mutate: readers may hold the old set
+                self._standard_value_index[key] = self._standard_value_index.get(key, frozenset()) | {field_id}
+            self._dictionary_version += 1
+            self._recommender_index = None
+        # Scored recommendations depend on the dictionary; resolved ones do not
+        with self._session() as db:
+            db.query(models.RecommendationMemo).filter(models.RecommendationMemo.origin == "recommended").delete()
+            self._commit(db)
+            if db is current_session():
+                # An index built before the unit of work ends may have seen
+                # uncommitted rows, or missed them
+                event.listen(db, "after_commit", self._drop_recommender_cache, once=True)
+                event.listen(db, "after_rollback", self._drop_recommender_cache, once=True)
+
+    def _drop_recommender_cache(self, session: Session):
+        with self._recommender_lock:
+            self._dictionary_version += 1
+            self._recommender_index = None
+            self._standard_value_index = None
+
     def add_data_source(self, ds_data: Dict[str, Any], db: Optional[Session] = None) -> str:
         ds_id = ds_data.get("id") or str(uuid.uuid4())
         db_ds = models.DataSource(
@@ -773,15 +931,15 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_ds)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_ds)
-                db.commit()
+                self._commit(db)
         return ds_id
 
     def get_data_sources(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             data_sources = db.query(models.DataSource).all()
             return [
                 {
@@ -803,13 +961,13 @@ class DatabaseStorage:
             ]
 
     def update_data_source(self, ds_id: str, updates: Dict[str, Any]):
-        with SessionLocal() as db:
+        with self._session() as db:
             db_ds = db.query(models.DataSource).filter(models.DataSource.id == ds_id).first()
             if db_ds:
                 for key, value in updates.items():
                     if hasattr(db_ds, key):
                         setattr(db_ds, key, value)
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
@@ -824,45 +982,194 @@ class DatabaseStorage:
             target_field=mapping_data.get("target_field"),
             data_dictionary_field_id=mapping_data.get("data_dictionary_field_id"),
             status=mapping_data.get("status", "Pending"),
-            process=mapping_data.get("process", True)
+            process=mapping_data.get("process", True),
+            values_fingerprint=mapping_data.get("values_fingerprint")
         )
         if db:
             db.add(db_mapping)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_mapping)
-                db.commit()
+                self._commit(db)
         return mapping_id
 
-    def get_field_mappings(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            mappings = db.query(models.FieldMapping).all()
-            return [
-                {
-                    "id": m.id,
-                    "source_field": m.source_field,
-                    "data_source": m.data_source,
-                    "worksheet": m.worksheet,
-                    "data_entity": m.data_entity,
-                    "target_field": m.target_field,
-                    "data_dictionary_field_id": m.data_dictionary_field_id,
-                    "status": m.status,
-                    "process": m.process
-                } for m in mappings
-            ]
+    def get_field_mappings(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        m = models.FieldMapping
+        query = select(m.id, m.source_field, m.data_source, m.worksheet, m.data_entity, m.target_field,
+                       m.data_dictionary_field_id, m.status, m.process)
+        with self._session() as db:
+            return self._mappings(db, self._keyset(query, m.id, limit, after))
 
     def update_field_mapping(self, mapping_id: str, updates: Dict[str, Any]):
-        with SessionLocal() as db:
+        with self._session() as db:
             db_mapping = db.query(models.FieldMapping).filter(models.FieldMapping.id == mapping_id).first()
             if db_mapping:
+                was_resolved = db_mapping.status == "Resolved"
                 for key, value in updates.items():
                     if hasattr(db_mapping, key):
                         setattr(db_mapping, key, value)
-                db.commit()
+                # Resolved mappings are remembered for later uploads of the same column
+                if db_mapping.status == "Resolved":
+                    self._remember_resolved_mapping(db, db_mapping)
+                elif was_resolved:
+                    self._forget_resolved_mapping(db, db_mapping)
+                self._commit(db)
                 return True
             return False
 
+    def _mapping_fingerprint(self, db: Session, mapping: models.FieldMapping) -> Optional[str]:
+        # Mappings created before fingerprints were recorded are fingerprinted
+        # from the discovered data of one upload of their data source
+        if mapping.values_fingerprint:
+            return mapping.values_fingerprint
+        sources = db.query(models.DataSource.id).filter(models.DataSource.name == mapping.data_source).all()
+        for (source_id,) in sources:
+            values = self._column_sample(db, source_id, mapping.worksheet, mapping.source_field)
+            if values:
+                return values_fingerprint(values)
+        return None
+
+    def _column_sample(self, db: Session, source_id: str, worksheet: str, column: str) -> List[str]:
+        # First sample_size distinct values of a stored column in upload order,
+        # the same sample ColumnSampler takes while the file is ingested
+        entity = models.DiscoveredDataEntity
+        field = models.DiscoveredDataField
+        # SQLite returns rows in insert order only when asked to
+        in_upload_order = db.get_bind().dialect.name == "sqlite"
+        sheet = db.query(models.DiscoveredDataSheet).filter(
+            models.DiscoveredDataSheet.data_source_id == source_id,
+            models.DiscoveredDataSheet.worksheet == worksheet
+        ).first()
+        if sheet and column in (sheet.columns or []):
+            i = sheet.columns.index(column)
+            query = db.query(entity.field_values).filter(entity.sheet_id == sheet.id)
+            if in_upload_order:
+                query = query.order_by(literal_column(f"{entity.__tablename__}.rowid"))
+            values = (row[i] if row and i < len(row) else None for (row,) in query.yield_per(1000))
+        else:
+            query = db.query(field.field_value).join(entity, field.discovered_data_entity_id == entity.id).filter(
+                entity.data_source_id == source_id,
+                entity.data_entity_name == worksheet,
+                field.field_name == column
+            )
+            if in_upload_order:
+                query = query.order_by(literal_column(f"{field.__tablename__}.rowid"))
+            values = (value for (value,) in query.yield_per(1000))
+        sample: Dict[str, None] = {}
+        limit = settings.recommender.sample_size
+        for value in values:
+            # Missing cells are stored as "nan" and skipped by the sampler
+            if value is None or value == "nan":
+                continue
+            sample.setdefault(value, None)
+            if len(sample) >= limit:
+                break
+        return list(sample)
+
+    def _remember_resolved_mapping(self, db: Session, mapping: models.FieldMapping):
+        fingerprint = self._mapping_fingerprint(db, mapping)
+        if fingerprint is None:
+            return
+        key = memo_key(mapping.source_field)
+        memo = db.query(models.RecommendationMemo).filter(
+            models.RecommendationMemo.source_field_key == key,
+            models.RecommendationMemo.values_fingerprint == fingerprint
+        ).first()
+        if not memo:
+            memo = models.RecommendationMemo(id=str(uuid.uuid4()), source_field_key=key, values_fingerprint=fingerprint)
+            db.add(memo)
+        memo.data_entity = mapping.data_entity
+        memo.target_field = mapping.target_field
+        memo.data_dictionary_field_id = mapping.data_dictionary_field_id
+        memo.origin = "resolved"
+        memo.updated_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _forget_resolved_mapping(self, db: Session, mapping: models.FieldMapping):
+        fingerprint = self._mapping_fingerprint(db, mapping)
+        if fingerprint is None:
+            return
+        db.query(models.RecommendationMemo).filter(
+            models.RecommendationMemo.source_field_key == memo_key(mapping.source_field),
+            models.RecommendationMemo.values_fingerprint == fingerprint,
+            models.RecommendationMemo.origin == "resolved"
+        ).delete()
+
+    def _seed_recommendation_memos(self, db: Session):
+        # Start the memo from the mappings users already resolved
+        if db.query(models.RecommendationMemo).count() > 0:
+            return
+        for mapping in db.query(models.FieldMapping).filter(models.FieldMapping.status == "Resolved").all():
+            self._remember_resolved_mapping(db, mapping)
+            db.flush()
+        self._commit(db)
+
+    def get_recommendation_memos(self, keys: Iterable[str]) -> Dict[tuple, tuple]:
+        # (source_field_key, values_fingerprint) -> (entity, field_name, field_id)
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        memo = models.RecommendationMemo
+        with self._session() as db:
+            memos = db.query(memo).filter(
+                memo.source_field_key.in_(keys),
+                # Scored recommendations only hold for the dictionary they were scored against
+                or_(memo.origin != "recommended", memo.dictionary_version >= shared_dictionary_version())
+            ).all()
+            return {
+                (m.source_field_key, m.values_fingerprint): (m.data_entity, m.target_field, m.data_dictionary_field_id)
+                for m in memos
+            }
+
+    def save_recommendation_memos(self, recommendations: Dict[tuple, tuple], dictionary_version: int):
+        # Remember scored recommendations with the dictionary version of the index
+        # that scored them. User-resolved memos and newer scored ones are kept;
+        # memos scored against an older dictionary are replaced.
+        if not recommendations:
+            return
+        memo = models.RecommendationMemo
+        with SessionLocal() as db:
+            existing = set()
+            outdated = []
+            for memo_id, key, fingerprint, origin, version in db.query(
+                memo.id, memo.source_field_key, memo.values_fingerprint, memo.origin, memo.dictionary_version
+            ).filter(memo.source_field_key.in_({key for key, _ in recommendations})):
+                existing.add((key, fingerprint))
+                if origin == "recommended" and (version is None or version < dictionary_version) and (key, fingerprint) in recommendations:
+                    outdated.append((memo_id, recommendations[(key, fingerprint)]))
+            updated_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            rows = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "source_field_key": key,
+                    "values_fingerprint": fingerprint,
+                    "data_entity": entity,
+                    "target_field": field,
+                    "data_dictionary_field_id": field_id,
+                    "origin": "recommended",
+                    "updated_time": updated_time,
+                    "dictionary_version": dictionary_version
+                }
+                for (key, fingerprint), (entity, field, field_id) in recommendations.items()
+                if (key, fingerprint) not in existing
+            ]
+            for memo_id, (entity, field, field_id) in outdated:
+                db.query(memo).filter(memo.id == memo_id, memo.origin == "recommended").update({
+                    "data_entity": entity,
+                    "target_field": field,
+                    "data_dictionary_field_id": field_id,
+                    "updated_time": updated_time,
+                    "dictionary_version": dictionary_version
+                })
+            if rows or outdated:
+                try:
+                    if rows:
+                        db.execute(insert(models.RecommendationMemo.__table__), rows)
+                    db.commit()
+                except IntegrityError:
+                    # Another upload remembered the same column first
+                    db.rollback()
+
     def add_data_entity(self, entity_data: Dict[str, Any], db: Optional[Session] = None) -> str:
         entity_id = entity_data.get("id") or str(uuid.uuid4())
         db_entity = models.DataEntity(
@@ -872,16 +1179,18 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_entity)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_entity)
-                db.commit()
+                self._commit(db)
+        self._invalidate_recommender_index()
         return entity_id
 
+    @cached("data_entities", "data_entity_fields")
     def get_data_entities(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            entities = db.query(models.DataEntity).all()
+        with self._session() as db:
+            entities = db.query(models.DataEntity).options(selectinload(models.DataEntity.fields)).all()
             return [
                 {
                     "id": e.id,
@@ -895,7 +1204,7 @@ class DatabaseStorage:
             ]
 
     def get_data_entity_by_id(self, entity_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             e = db.query(models.DataEntity).filter(models.DataEntity.id == entity_id).first()
             if e:
                 return {
@@ -917,26 +1226,29 @@ class DatabaseStorage:
             for key, value in updates.items():
                 if hasattr(db_entity, key):
                     setattr(db_entity, key, value)
-            db.commit()
+            self._commit(db)
+            self._invalidate_recommender_index()
             return True
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db_entity = db.query(models.DataEntity).filter(models.DataEntity.id == entity_id).first()
                 if not db_entity:
                     return False
                 for key, value in updates.items():
                     if hasattr(db_entity, key):
                         setattr(db_entity, key, value)
-                db.commit()
+                self._commit(db)
+                self._invalidate_recommender_index()
                 return True
 
     def delete_data_entity(self, entity_id: str) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_entity = db.query(models.DataEntity).filter(models.DataEntity.id == entity_id).first()
             if not db_entity:
                 return False
             db.delete(db_entity)
-            db.commit()
+            self._commit(db)
+            self._invalidate_recommender_index()
             return True
 
     def add_data_entity_field(self, field_data: Dict[str, Any], db: Optional[Session] = None) -> str:
@@ -949,15 +1261,16 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_field)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_field)
-                db.commit()
+                self._commit(db)
+        self._invalidate_recommender_index()
         return field_id
 
     def get_data_entity_fields(self, entity_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             query = db.query(models.DataEntityField)
             if entity_id:
                 query = query.filter(models.DataEntityField.entity_id == entity_id)
@@ -972,7 +1285,7 @@ class DatabaseStorage:
             ]
 
     def get_data_entity_field_by_id(self, field_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             f = db.query(models.DataEntityField).filter(models.DataEntityField.id == field_id).first()
             if f:
                 return {
@@ -984,33 +1297,35 @@ class DatabaseStorage:
             return None
 
     def update_data_entity_field(self, field_id: str, updates: Dict[str, Any]) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_field = db.query(models.DataEntityField).filter(models.DataEntityField.id == field_id).first()
             if not db_field:
                 return False
             for key, value in updates.items():
                 if hasattr(db_field, key):
                     setattr(db_field, key, value)
-            db.commit()
+            self._commit(db)
+            self._invalidate_recommender_index()
             return True
 
     def delete_data_entity_field(self, field_id: str) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_field = db.query(models.DataEntityField).filter(models.DataEntityField.id == field_id).first()
             if not db_field:
                 return False
             db.delete(db_field)
-            db.commit()
+            self._commit(db)
+            self._invalidate_recommender_index()
             return True
 
     def override_data_entities(self, entities_data: List[Dict[str, Any]], fields_data: List[Dict[str, Any]]):
-        with SessionLocal() as db:
+        with self._session() as db:
             # 1. Clear existing - nullify key_field_id first to avoid FK constraints
             db.query(models.DataEntity).update({models.DataEntity.key_field_id: None})
             db.flush()
             db.query(models.DataEntityField).delete()
             db.query(models.DataEntity).delete()
-            db.commit()
+            self._commit(db)
 
             # 2. Map Entity Name -> ID
             entity_name_to_id = {}
@@ -1057,7 +1372,8 @@ class DatabaseStorage:
                         eid = entity_name_to_id[name]
                         db.query(models.DataEntity).filter(models.DataEntity.id == eid).update({"key_field_id": fid})
             
-            db.commit()
+            self._commit(db)
+            self._invalidate_recommender_index()
 
     def add_discovered_data_entity(self, entity_data: Dict[str, Any], db: Optional[Session] = None) -> str:
         entity_id = entity_data.get("id") or str(uuid.uuid4())
@@ -1073,15 +1389,97 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_entity)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_entity)
-                db.commit()
+                self._commit(db)
         return entity_id
 
-    def get_discovered_data_entities(self, data_source_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+    def _discovered_field_dicts(self, e: models.DiscoveredDataEntity, sheets: Dict[str, models.DiscoveredDataSheet]) -> List[Dict[str, Any]]:
+        if e.sheet_id:
+            sheet = sheets.get(e.sheet_id)
+            if not sheet:
+                return []
+            return columnar_field_dicts(e.id, e.created_time, e.field_values, sheet.columns, sheet.rating)
+        return [
+            {
+                "id": f.id, 
+                "created_time": f.created_time,
+                "discovered_data_entity_id": f.discovered_data_entity_id,
+                "field_name": f.field_name,
+                "field_value": f.field_value,
+                "rating": f.rating
+            }
+            for f in e.fields
+        ]
+
+    def _discovered_entity_dict(self, e: models.DiscoveredDataEntity, source_name: Optional[str], sheets: Dict[str, models.DiscoveredDataSheet]) -> Dict[str, Any]:
+        return {
+            "id": e.id,
+            "created_time": e.created_time,
+            "source_type": e.source_type,
+            "user": e.user,
+            "data_entity_name": e.data_entity_name,
+            "data_source_id": e.data_source_id,
+            "source_name": source_name,
+            "status": e.status,
+            "fields": self._discovered_field_dicts(e, sheets)
+        }
+
+    def _load_discovered_sheets(self, db: Session, entities: Iterable[models.DiscoveredDataEntity]) -> Dict[str, models.DiscoveredDataSheet]:
+        sheet_ids = {e.sheet_id for e in entities if e.sheet_id}
+        if not sheet_ids:
+            return {}
+        sheets = db.query(models.DiscoveredDataSheet).filter(models.DiscoveredDataSheet.id.in_(sheet_ids)).all()
+        return {sheet.id: sheet for sheet in sheets}
+
+    def _filter_discovered_entities(self, db: Session, query, data_source_id: Optional[str] = None, data_entity_name: Optional[str] = None,
+                                    status: Optional[str] = None, source_type: Optional[str] = None, user: Optional[str] = None,
+                                    created_from: Optional[str] = None, created_to: Optional[str] = None,
+                                    field_name: Optional[str] = None, field_value: Optional[str] = None):
+        entity = models.DiscoveredDataEntity
+        for column, value in [(entity.data_source_id, data_source_id), (entity.data_entity_name, data_entity_name),
+                              (entity.status, status), (entity.source_type, source_type), (entity.user, user)]:
+            if value:
+                query = query.filter(column == value)
+        # created_time is stored as "%Y-%m-%d %H:%M:%S", which sorts as text
+        if created_from:
+            query = query.filter(entity.created_time >= created_from)
+        if created_to:
+            query = query.filter(entity.created_time <= created_to)
+        if field_name or field_value:
+            query = query.filter(self._discovered_field_match(db, field_name, field_value))
+        return query
+
+    def _discovered_field_match(self, db: Session, field_name: Optional[str], field_value: Optional[str]):
+        # Entities with a matching DiscoveredDataField row, looked up through
+        # the (field_value, field_name) index...
+        field = models.DiscoveredDataField
+        conditions = []
+        if field_name:
+            conditions.append(field.field_name == field_name)
+        if field_value:
+            conditions.append(field.field_value == field_value)
+        matches = [models.DiscoveredDataEntity.id.in_(select(field.discovered_data_entity_id).where(*conditions))]
+        # ...or, in the columnar layout, the value at the column's position
+        for sheet_id, columns in db.query(models.DiscoveredDataSheet.id, models.DiscoveredDataSheet.columns):
+            positions = [i for i, name in enumerate(columns or []) if not field_name or name == field_name]
+            if not positions:
+                continue
+            in_sheet = models.DiscoveredDataEntity.sheet_id == sheet_id
+            if field_value:
+                in_sheet = and_(in_sheet, or_(*(models.DiscoveredDataEntity.field_values[i].as_string() == field_value for i in positions)))
+            matches.append(in_sheet)
+        return or_(*matches)
+
+    def count_discovered_data_entities(self, **filters) -> int:
+        with self._session() as db:
+            query = db.query(func.count(models.DiscoveredDataEntity.id))
+            return self._filter_discovered_entities(db, query, **filters).scalar()
+
+    def get_discovered_data_entities(self, limit: Optional[int] = None, after: Optional[str] = None, **filters) -> List[Dict[str, Any]]:
+        with self._session() as db:
             query = db.query(
                 models.DiscoveredDataEntity,
                 models.DataSource.name.label("source_name")
@@ -1089,37 +1487,17 @@ class DatabaseStorage:
                 models.DataSource,
                 models.DiscoveredDataEntity.data_source_id == models.DataSource.id
             )
+            query = self._filter_discovered_entities(db, query, **filters)
             
-            if data_source_id:
-                query = query.filter(models.DiscoveredDataEntity.data_source_id == data_source_id)
-            
-            results = query.all()
-            return [
-                {
-                    "id": e.id,
-                    "created_time": e.created_time,
-                    "source_type": e.source_type,
-                    "user": e.user,
-                    "data_entity_name": e.data_entity_name,
-                    "data_source_id": e.data_source_id,
-                    "source_name": source_name,
-                    "status": e.status,
-                    "fields": [
-                        {
-                            "id": f.id, 
-                            "created_time": f.created_time,
-                            "discovered_data_entity_id": f.discovered_data_entity_id,
-                            "field_name": f.field_name,
-                            "field_value": f.field_value,
-                            "rating": f.rating
-                        }
-                        for f in e.fields
-                    ]
-                } for e, source_name in results
-            ]
+            # Fields come from one query over the filtered entities; selectinload
+            # would issue one IN query per 500 entities
+            query = self._keyset(query, models.DiscoveredDataEntity.id, limit, after)
+            results = query.options(subqueryload(models.DiscoveredDataEntity.fields)).all()
+            sheets = self._load_discovered_sheets(db, (e for e, _ in results))
+            return [self._discovered_entity_dict(e, source_name, sheets) for e, source_name in results]
 
     def get_discovered_data_entity_by_id(self, entity_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             result = db.query(
                 models.DiscoveredDataEntity,
                 models.DataSource.name.label("source_name")
@@ -1130,36 +1508,16 @@ class DatabaseStorage:
             
             if result:
                 e, source_name = result
-                return {
-                    "id": e.id,
-                    "created_time": e.created_time,
-                    "source_type": e.source_type,
-                    "user": e.user,
-                    "data_entity_name": e.data_entity_name,
-                    "data_source_id": e.data_source_id,
-                    "source_name": source_name,
-                    "status": e.status,
-                    "fields": [
-                        {
-                            "id": f.id, 
-                            "created_time": f.created_time,
-                            "discovered_data_entity_id": f.discovered_data_entity_id,
-                            "field_name": f.field_name,
-                            "field_value": f.field_value,
-                            "rating": f.rating
-                        }
-                        for f in e.fields
-                    ]
-                }
+                return self._discovered_entity_dict(e, source_name, self._load_discovered_sheets(db, [e]))
             return None
 
     def delete_discovered_data_entity(self, entity_id: str) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_entity = db.query(models.DiscoveredDataEntity).filter(models.DiscoveredDataEntity.id == entity_id).first()
             if not db_entity:
                 return False
             db.delete(db_entity)
-            db.commit()
+            self._commit(db)
             return True
 
     def add_discovered_data_field(self, field_data: Dict[str, Any], db: Optional[Session] = None) -> str:
@@ -1175,15 +1533,115 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_field)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_field)
-                db.commit()
+                self._commit(db)
         return field_id
 
+    def add_discovered_data_sheet(self, sheet_data: Dict[str, Any], db: Optional[Session] = None) -> str:
+        sheet_id = sheet_data.get("id") or str(uuid.uuid4())
+        db_sheet = models.DiscoveredDataSheet(
+            id=sheet_id,
+            created_time=sheet_data.get("created_time") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            data_source_id=sheet_data.get("data_source_id"),
+            worksheet=sheet_data["worksheet"],
+            columns=[str(c) for c in sheet_data["columns"]],
+            rating=sheet_data.get("rating")
+        )
+        if db:
+            db.add(db_sheet)
+            self._commit(db)
+        else:
+            with self._session() as db:
+                db.add(db_sheet)
+                self._commit(db)
+        return sheet_id
+
+    def update_discovered_data_sheet_columns(self, sheet_id: str, columns: List[str]) -> bool:
+        with self._session() as db:
+            sheet = db.query(models.DiscoveredDataSheet).filter(models.DiscoveredDataSheet.id == sheet_id).first()
+            if sheet:
+                sheet.columns = [str(c) for c in columns]
+                self._commit(db)
+                return True
+            return False
+
+    def bulk_add_discovered_data(
+        self,
+        entity_data: Dict[str, Any],
+        columns: List[str],
+        rows: Iterable[Iterable[Any]],
+        rating: Optional[str] = None,
+        batch_size: int = 5000,
+        sheet_id: Optional[str] = None,
+        db: Optional[Session] = None
+    ) -> int:
+        # One DiscoveredDataEntity per row and one DiscoveredDataField per cell,
+        # written with executemany batches inside a single transaction.
+        # With a sheet_id the row values are stored on the entity instead (columnar layout).
+        if db is None:
+            with self._session() as db:
+                return self.bulk_add_discovered_data(entity_data, columns, rows, rating, batch_size, sheet_id, db)
+
+        created_time = entity_data.get("created_time") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entity_batch = []
+        field_batch = []
+        count = 0
+
+        def flush():
+            if entity_batch:
+                db.execute(insert(models.DiscoveredDataEntity.__table__), entity_batch)
+                entity_batch.clear()
+            if field_batch:
+                db.execute(insert(models.DiscoveredDataField.__table__), field_batch)
+                field_batch.clear()
+
+        try:
+            for row in rows:
+                entity_id = str(uuid.uuid4())
+                entity_batch.append({
+                    "id": entity_id,
+                    "created_time": created_time,
+                    "source_type": entity_data["source_type"],
+                    "user": entity_data["user"],
+                    "data_entity_name": entity_data["data_entity_name"],
+                    "data_source_id": entity_data.get("data_source_id"),
+                    "status": entity_data.get("status", "Ingested"),
+                    "sheet_id": sheet_id,
+                    "field_values": [str(value) for value in row] if sheet_id else None
+                })
+                count += 1
+                if sheet_id:
+                    if len(entity_batch) >= batch_size:
+                        flush()
+                    continue
+                for col, value in zip(columns, row):
+                    field_batch.append({
+                        "id": str(uuid.uuid4()),
+                        "created_time": created_time,
+                        "discovered_data_entity_id": entity_id,
+                        "field_name": col,
+                        "field_value": str(value),
+                        "rating": rating
+                    })
+                if len(field_batch) >= batch_size or len(entity_batch) >= batch_size:
+                    flush()
+            flush()
+            self._commit(db)
+        except Exception:
+            # A unit of work rolls back the whole request when the error reaches it
+            if db is not current_session():
+                db.rollback()
+            raise
+        return count
+
     def get_discovered_data_fields(self, entity_id: str) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
+            e = db.query(models.DiscoveredDataEntity).filter(models.DiscoveredDataEntity.id == entity_id).first()
+            if e and e.sheet_id:
+                return self._discovered_field_dicts(e, self._load_discovered_sheets(db, [e]))
             fields = db.query(models.DiscoveredDataField).filter(models.DiscoveredDataField.discovered_data_entity_id == entity_id).all()
             return [
                 {
@@ -1210,15 +1668,15 @@ class DatabaseStorage:
         )
         if db:
             db.add(db_scan)
-            db.commit()
+            self._commit(db)
         else:
-            with SessionLocal() as db:
+            with self._session() as db:
                 db.add(db_scan)
-                db.commit()
+                self._commit(db)
         return scan_id
 
     def get_network_scans(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             scans = db.query(models.NetworkScan).all()
             return [
                 {
@@ -1234,7 +1692,7 @@ class DatabaseStorage:
             ]
 
     def get_network_scan_by_id(self, scan_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             s = db.query(models.NetworkScan).filter(models.NetworkScan.id == scan_id).first()
             if s:
                 return {
@@ -1250,14 +1708,14 @@ class DatabaseStorage:
             return None
 
     def update_network_scan(self, scan_id: str, updates: Dict[str, Any]) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_scan = db.query(models.NetworkScan).filter(models.NetworkScan.id == scan_id).first()
             if not db_scan:
                 return False
             for key, value in updates.items():
                 if hasattr(db_scan, key):
                     setattr(db_scan, key, value)
-            db.commit()
+            self._commit(db)
             return True
 
     def _seed_environments(self, db: Session):
@@ -1287,7 +1745,7 @@ class DatabaseStorage:
     # Environment CRUD
     def add_environment(self, env_data: Dict[str, Any], db: Optional[Session] = None):
         if db is None:
-            with SessionLocal() as db:
+            with self._session() as db:
                 return self._add_environment_impl(env_data, db)
         return self._add_environment_impl(env_data, db)
 
@@ -1299,39 +1757,40 @@ class DatabaseStorage:
             description=env_data.get("description", "")
         )
         db.add(db_env)
-        db.commit()
+        self._commit(db)
         return env_id
 
+    @cached("environments")
     def get_environments(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             envs = db.query(models.Environment).all()
             return [{"id": e.id, "name": e.name, "description": e.description} for e in envs]
 
     def update_environment(self, env_id: str, updates: Dict[str, Any]) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_env = db.query(models.Environment).filter(models.Environment.id == env_id).first()
             if db_env:
                 if "name" in updates:
                     db_env.name = updates["name"]
                 if "description" in updates:
                     db_env.description = updates["description"]
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     def delete_environment(self, env_id: str) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_env = db.query(models.Environment).filter(models.Environment.id == env_id).first()
             if db_env:
                 db.delete(db_env)
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     # Move Principle CRUD
     def add_move_principle(self, principle_data: Dict[str, Any], db: Optional[Session] = None):
         if db is None:
-            with SessionLocal() as db:
+            with self._session() as db:
                 return self._add_move_principle_impl(principle_data, db)
         return self._add_move_principle_impl(principle_data, db)
 
@@ -1343,32 +1802,33 @@ class DatabaseStorage:
             description=principle_data.get("description", "")
         )
         db.add(db_principle)
-        db.commit()
+        self._commit(db)
         return principle_id
 
+    @cached("move_principles")
     def get_move_principles(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             principles = db.query(models.MovePrinciple).all()
             return [{"id": p.id, "name": p.name, "description": p.description} for p in principles]
 
     def update_move_principle(self, principle_id: str, updates: Dict[str, Any]) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_principle = db.query(models.MovePrinciple).filter(models.MovePrinciple.id == principle_id).first()
             if db_principle:
                 if "name" in updates:
                     db_principle.name = updates["name"]
                 if "description" in updates:
                     db_principle.description = updates["description"]
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     def delete_move_principle(self, principle_id: str) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_principle = db.query(models.MovePrinciple).filter(models.MovePrinciple.id == principle_id).first()
             if db_principle:
                 db.delete(db_principle)
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
@@ -1420,7 +1880,7 @@ class DatabaseStorage:
     # Score Card CRUD
     def add_score_card_factor(self, factor_data: Dict[str, Any], db: Optional[Session] = None):
         if db is None:
-            with SessionLocal() as db:
+            with self._session() as db:
                 return self._add_score_card_factor_impl(factor_data, db)
         return self._add_score_card_factor_impl(factor_data, db)
 
@@ -1433,12 +1893,13 @@ class DatabaseStorage:
             description=factor_data.get("description", "")
         )
         db.add(db_factor)
-        db.commit()
+        self._commit(db)
         return factor_id
 
+    @cached("score_card_factors", "score_card_options")
     def get_score_card_factors(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            factors = db.query(models.ScoreCardFactor).all()
+        with self._session() as db:
+            factors = db.query(models.ScoreCardFactor).options(selectinload(models.ScoreCardFactor.options)).all()
             result = []
             for f in factors:
                 result.append({
@@ -1452,7 +1913,7 @@ class DatabaseStorage:
 
     def add_score_card_option(self, option_data: Dict[str, Any], db: Optional[Session] = None):
         if db is None:
-            with SessionLocal() as db:
+            with self._session() as db:
                 return self._add_score_card_option_impl(option_data, db)
         return self._add_score_card_option_impl(option_data, db)
 
@@ -1465,12 +1926,12 @@ class DatabaseStorage:
             score=option_data["score"]
         )
         db.add(db_option)
-        db.commit()
+        self._commit(db)
         return option_id
 
     # S2T Mapping CRUD
     def add_s2t_mapping(self, mapping_data: Dict[str, Any]):
-        with SessionLocal() as db:
+        with self._session() as db:
             mapping_id = mapping_data.get("id", str(uuid.uuid4()))
             db_mapping = models.S2TMapping(
                 id=mapping_id,
@@ -1483,27 +1944,18 @@ class DatabaseStorage:
                 status=mapping_data.get("status", "Draft")
             )
             db.add(db_mapping)
-            db.commit()
+            self._commit(db)
             return mapping_id
 
-    def get_s2t_mappings(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            mappings = db.query(models.S2TMapping).all()
-            return [
-                {
-                    "id": m.id,
-                    "workload_id": m.workload_id,
-                    "move_principle_id": m.move_principle_id,
-                    "target_environment_id": m.target_environment_id,
-                    "target_location": m.target_location,
-                    "score_card_results": m.score_card_results,
-                    "total_score": m.total_score,
-                    "status": m.status
-                } for m in mappings
-            ]
+    def get_s2t_mappings(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        m = models.S2TMapping
+        query = select(m.id, m.workload_id, m.move_principle_id, m.target_environment_id, m.target_location,
+                       m.score_card_results, m.total_score, m.status)
+        with self._session() as db:
+            return self._mappings(db, self._keyset(query, m.id, limit, after))
             
     def get_s2t_mapping_by_workload(self, workload_id: str) -> Optional[Dict[str, Any]]:
-        with SessionLocal() as db:
+        with self._session() as db:
             m = db.query(models.S2TMapping).filter(models.S2TMapping.workload_id == workload_id).first()
             if m:
                 return {
@@ -1519,19 +1971,19 @@ class DatabaseStorage:
             return None
 
     def update_s2t_mapping(self, mapping_id: str, updates: Dict[str, Any]) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_mapping = db.query(models.S2TMapping).filter(models.S2TMapping.id == mapping_id).first()
             if db_mapping:
                 for key, value in updates.items():
                     if hasattr(db_mapping, key):
                         setattr(db_mapping, key, value)
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     # MDG CRUD
     def add_mdg(self, mdg_data: Dict[str, Any]):
-        with SessionLocal() as db:
+        with self._session() as db:
             mdg_id = mdg_data.get("id", str(uuid.uuid4()))
             db_mdg = models.MoveDependencyGroup(
                 id=mdg_id,
@@ -1547,12 +1999,12 @@ class DatabaseStorage:
                 db_mdg.workloads = workloads
                 
             db.add(db_mdg)
-            db.commit()
+            self._commit(db)
             return mdg_id
 
     def get_mdgs(self) -> List[Dict[str, Any]]:
-        with SessionLocal() as db:
-            mdgs = db.query(models.MoveDependencyGroup).all()
+        with self._session() as db:
+            mdgs = db.query(models.MoveDependencyGroup).options(selectinload(models.MoveDependencyGroup.workloads)).all()
             return [
                 {
                     "id": m.id,
@@ -1566,7 +2018,7 @@ class DatabaseStorage:
             ]
 
     def update_mdg(self, mdg_id: str, updates: Dict[str, Any]) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_mdg = db.query(models.MoveDependencyGroup).filter(models.MoveDependencyGroup.id == mdg_id).first()
             if db_mdg:
                 if "workload_ids" in updates:
@@ -1577,66 +2029,73 @@ class DatabaseStorage:
                 for key, value in updates.items():
                     if hasattr(db_mdg, key):
                         setattr(db_mdg, key, value)
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     def delete_mdg(self, mdg_id: str) -> bool:
-        with SessionLocal() as db:
+        with self._session() as db:
             db_mdg = db.query(models.MoveDependencyGroup).filter(models.MoveDependencyGroup.id == mdg_id).first()
             if db_mdg:
                 db.delete(db_mdg)
-                db.commit()
+                self._commit(db)
                 return True
             return False
 
     def reset_project(self):
-        with SessionLocal() as db:
+        with self._session() as db:
             try:
                 # 1. Delete data from tables that should be cleared
-                # Order matters for foreign keys if they are enabled.
-                from sqlalchemy import text
-                
-                # Many-to-many association tables
-                db.execute(text("DELETE FROM workload_ci"))
-                db.execute(text("DELETE FROM wave_workload"))
-                db.execute(text("DELETE FROM wave_mdg"))
-                db.execute(text("DELETE FROM mdg_workload"))
-                
-                # Plan and Move data
-                db.query(models.Runbook).delete()
-                db.query(models.MoveDependencyGroup).delete()
-                db.query(models.Wave).delete()
-                
-                # Workload and CI data
-                db.query(models.Dependency).delete()
-                db.query(models.Workload).delete()
-                db.query(models.ConfigurationItem).delete()
-                
-                # Ingestion and Discovery data
-                db.query(models.DiscoveredDataField).delete()
-                db.query(models.DiscoveredDataEntity).delete()
-                db.query(models.S2TMapping).delete()
-                db.query(models.FieldMapping).delete()
-                db.query(models.DataSource).delete()
-                db.query(models.NetworkScan).delete()
-                
-                # Configuration data
-                db.query(models.Environment).delete()
-                db.query(models.MovePrinciple).delete()
-                db.query(models.ScoreCardOption).delete()
-                db.query(models.ScoreCardFactor).delete()
+                cleared = [
+                    # Many-to-many association tables
+                    models.workload_ci,
+                    models.wave_workload,
+                    models.wave_mdg,
+                    models.mdg_workload,
+
+                    # Plan and Move data
+                    models.Runbook.__table__,
+                    models.MoveDependencyGroup.__table__,
+                    models.Wave.__table__,
+
+                    # Workload and CI data
+                    models.Dependency.__table__,
+                    models.Workload.__table__,
+                    models.ConfigurationItem.__table__,
+
+                    # Ingestion and Discovery data
+                    models.DiscoveredDataField.__table__,
+                    models.DiscoveredDataEntity.__table__,
+                    models.DiscoveredDataSheet.__table__,
+                    models.S2TMapping.__table__,
+                    models.FieldMapping.__table__,
+                    models.DataSource.__table__,
+                    models.NetworkScan.__table__,
+
+                    # Configuration data
+                    models.Environment.__table__,
+                    models.MovePrinciple.__table__,
+                    models.ScoreCardOption.__table__,
+                    models.ScoreCardFactor.__table__
+                ]
+                # Children before parents, so it also works where foreign keys
+                # are enforced (PostgreSQL)
+                cleared_names = {table.name for table in cleared}
+                for table in reversed(Base.metadata.sorted_tables):
+                    if table.name in cleared_names:
+                        db.execute(table.delete())
                 
                 # We KEEP:
                 # models.DataField
                 # models.StandardValue
                 # models.DataEntity
                 # models.DataEntityField
+                # models.RecommendationMemo
                 # models.User
                 # models.Role
                 # models.AccessRight
                 
-                db.commit()
+                self._commit(db)
                 return True
             except Exception as e:
                 db.rollback()
@@ -1644,3 +2103,31 @@ class DatabaseStorage:
                 raise e
 
 storage = DatabaseStorage()
+
+class AsyncStorage:
+    """
+    Awaitable view of a DatabaseStorage for request handlers: every public
+    method is run through run_in_session on the async engine.
+    """
+
+    def __init__(self, storage: DatabaseStorage):
+        self._storage = storage
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._storage, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        peek = getattr(attr, "peek", None)
+
+        async def call(*args, **kwargs):
+            if peek is not None:
+                # Cached reads are answered without a session
+                hit, value = peek(*args, **kwargs)
+                if hit:
+                    return value
+            return await run_in_session(attr, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+async_storage = AsyncStorage(storage)
@@ -0,0 +1,168 @@
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+import threading
+import time
+import uuid
+from fastapi import HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import models
+
+class TableVersions:
+    """
+    Change counter per table, bumped after every committed write made through
+    a Session. Read endpoints derive ETags from the counters of the tables
+    they read. Shared tables use the counters of the table_versions table,
+    so every worker sends the same ETag for the same data. Other tables use
+    this process's counters with an epoch that changes on every start, so
+    their ETags from before a restart (when the counters were reset) never
+    match.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Tables whose writes are published to other workers through the
+        # table_versions table, with the counters last read from it
+        self.shared: Set[str] = set()
+        self._shared_seen: Dict[str, int] = {}
+        self._next_sync = 0.0
+
+    def bump(self, tables: Iterable[str]):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, *tables: str) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def etag(self, *tables: str) -> str:
+        with self._lock:
+            if settings.cache.shared_versions and all(table in self._shared_seen for table in tables):
+                return 'W/"' + ".".join(str(self._shared_seen[table]) for table in tables) + '"'
+        versions = ".".join(str(v) for v in self.get(*tables))
+        return f'W/"{self.epoch}-{versions}"'
+
+    def share(self, *tables: str):
+        self.shared.update(tables)
+
+    def published(self, rows: Iterable[Tuple[str, int]]):
+        # Shared counters written by this process's own commits
+        with self._lock:
+            for table, version in rows:
+                self._shared_seen[table] = max(version, self._shared_seen.get(table, version))
+
+    def sync_due(self) -> bool:
+        return bool(self.shared) and settings.cache.shared_versions and time.monotonic() >= self._next_sync
+
+    def sync(self, db: Optional[Session] = None):
+        """
+        Bumps the local version of every shared table another worker wrote
+        since the last call. Polls the database at most once per
+        cache.sync_interval.
+        """
+        if not self.sync_due():
+            return
+        self._next_sync = time.monotonic() + settings.cache.sync_interval
+        query = select(models.TableVersion.table_name, models.TableVersion.version).where(
+            models.TableVersion.table_name.in_(self.shared)
+        )
+        if db is None:
+            with SessionLocal() as own:
+                rows = own.execute(query).all()
+        else:
+            rows = db.execute(query).all()
+        with self._lock:
+            # Counters only grow; a poll that raced with one of our own
+            # commits must not move them back
+            changed = [table for table, version in rows
+                       if table in self._shared_seen and self._shared_seen[table] < version]
+            for table, version in rows:
+                self._shared_seen[table] = max(version, self._shared_seen.get(table, version))
+        if changed:
+            self.bump(changed)
+
+table_versions = TableVersions()
+
+def _written(session: Session) -> Set[str]:
+    return session.info.setdefault("written_tables", set())
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context):
+    written = _written(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        mapper = type(obj).__mapper__
+        written.update(table.name for table in mapper.tables)
+        # Collections stored in association tables (workload_ci, ...)
+        written.update(rel.secondary.name for rel in mapper.relationships if rel.secondary is not None)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement(orm_execute_state):
+    # Bulk insert()/update()/delete() statements and Query.delete()
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table
+        _written(orm_execute_state.session).add(getattr(table, "name", str(table)))
+
+@event.listens_for(Session, "before_commit")
+def _publish_shared(session: Session):
+    # In the committing transaction, so other workers never see the new
+    # counter before the rows it stands for
+    if not (table_versions.shared and settings.cache.shared_versions):
+        return
+    session.flush()
+    tables = _written(session) & table_versions.shared
+    if tables:
+        # On the connection, so the update itself is not recorded as a write
+        conn = session.connection()
+        conn.execute(
+            update(models.TableVersion)
+            .where(models.TableVersion.table_name.in_(tables))
+            .values(version=models.TableVersion.version + 1)
+        )
+        # The new counters, for this worker's ETags once the commit succeeds
+        session.info["published_versions"] = conn.execute(
+            select(models.TableVersion.table_name, models.TableVersion.version)
+            .where(models.TableVersion.table_name.in_(tables))
+        ).all()
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session: Session):
+    # After the commit, so a reader never pairs a new ETag with old rows
+    written = session.info.pop("written_tables", None)
+    published = session.info.pop("published_versions", None)
+    if published:
+        table_versions.published(published)
+    if written:
+        table_versions.bump(written)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_rolled_back(session: Session, transaction):
+    # Whatever is left when the outermost transaction ends was rolled back;
+    # savepoints ending leave the outer transaction's writes pending
+    if transaction.parent is None:
+        session.info.pop("written_tables", None)
+        session.info.pop("published_versions", None)
+
+def conditional_get(*tables: str) -> Callable:
+    """
+    Dependency for read endpoints: sends an ETag built from the versions of
+    `tables` and answers a matching If-None-Match with 304 before the
+    endpoint runs. The tables are shared, so writes of other workers change
+    the ETag after the next sync.
+    """
+    table_versions.share(*tables)
+
+    async def check(request: Request, response: Response):
+        if table_versions.sync_due():
+            await run_in_threadpool(table_versions.sync)
+        etag = table_versions.etag(*tables)
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        # Let browsers keep the body but revalidate it on every use
+        response.headers["Cache-Control"] = "no-cache"
+    return check
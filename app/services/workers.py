@@ -0,0 +1,128 @@
+from typing import Dict, Any, Optional, Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from app.config import settings
+
+class WorkerPoolFull(HTTPException):
+    def __init__(self, pool: str):
+        super().__init__(
+            status_code=503,
+            detail=f"The {pool} pool is busy, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+class WorkerPool:
+    # A lazily started executor that refuses work beyond max_pending queued or
+    # running tasks and keeps counters for GET /jobs/workers
+    def __init__(self, name: str, factory: Callable[[int], Executor], max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise WorkerPoolFull(self.name)
+            if self._executor is None:
+                self._executor = self._factory(self.max_workers)
+            self.pending += 1
+            self.submitted += 1
+            executor = self._executor
+        submitted = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(lambda f: self._finished(f, submitted))
+        return future
+
+    def _finished(self, future: Future, submitted: float):
+        elapsed = time.perf_counter() - submitted
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        # Await a task from the event loop without blocking it
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                # Seconds from submission to completion, queueing included
+                "avg_seconds": round(self._total_seconds / finished, 4) if finished else 0.0,
+                "max_seconds": round(self._max_seconds, 4)
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+class WorkerPools:
+    """
+    Pools for CPU-heavy work requested by the API: threads for pandas parsing
+    and ingestion pipelines that also write to the database, processes for
+    pure computation (file parsing to records, recommendation scoring). Work
+    sent to the processes must be importable without app.services.
+    """
+
+    def __init__(self, max_threads: int, max_processes: Optional[int], max_pending: int):
+        self.threads = WorkerPool(
+            "thread",
+            lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="api-worker"),
+            max_threads,
+            max_pending
+        )
+        self.processes = WorkerPool(
+            "process",
+            # Spawned, not forked: a forked child would inherit the server's
+            # listening socket and database connections
+            lambda n: ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn")),
+            max_processes or os.cpu_count() or 1,
+            max_pending
+        )
+
+    async def run_in_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self.threads.run(fn, *args, **kwargs)
+
+    async def run_in_process(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self.processes.run(fn, *args, **kwargs)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {"threads": self.threads.metrics(), "processes": self.processes.metrics()}
+
+worker_pools = WorkerPools(settings.workers.max_threads, settings.workers.max_processes, settings.workers.max_pending)
@@ -0,0 +1,106 @@
+"""
+Response compression for large JSON, NDJSON and CSV bodies. Negotiates
+brotli (when the brotli package is installed) or gzip from Accept-Encoding
+and reuses Starlette's GZip responders, which already handle the minimum
+size, streamed bodies and the Vary header. Only the content types listed in
+the compression config are compressed.
+"""
+from typing import Dict, List, Optional
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import CompressionConfig
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Chunks at least this large are compressed off the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+class _Allowlisted:
+    # Starlette's responders take a list of excluded content types; exclude
+    # the response's own type unless it is allowed
+    allowed_content_types: List[str] = []
+
+    async def send_with_compression(self, message: Message):
+        if message["type"] == "http.response.start":
+            media_type = Headers(raw=message["headers"]).get("content-type", "").partition(";")[0].strip().lower()
+            allowed = media_type in self.allowed_content_types or f"{media_type.partition('/')[0]}/*" in self.allowed_content_types
+            self.exclude_content_types = () if allowed else (media_type,)
+        await super().send_with_compression(message)
+
+class _IdentityResponder(_Allowlisted, IdentityResponder):
+    pass
+
+class _GZipResponder(_Allowlisted, GZipResponder):
+    pass
+
+class _BrotliResponder(_Allowlisted, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        # Flush every chunk, so streamed exports still reach the client as they are written
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+def available_encodings(config: CompressionConfig) -> List[str]:
+    return [encoding for encoding in config.encodings if encoding == "gzip" or (encoding == "br" and brotli is not None)]
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    # Highest q-value wins; ties go to the order of `encodings`
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        if params.strip().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, config: CompressionConfig):
+        self.app = app
+        self.config = config
+        self.encodings = available_encodings(config)
+        self.allowed_content_types = [t.strip().lower() for t in config.content_types]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.config.enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding == "br":
+            responder = _BrotliResponder(self.app, self.config.minimum_size, self.config.brotli_quality)
+        elif encoding == "gzip":
+            responder = _GZipResponder(self.app, self.config.minimum_size, compresslevel=self.config.gzip_level,
+                                       thread_minimum_size=THREAD_MINIMUM_SIZE)
+        else:
+            # Still adds Vary: Accept-Encoding to compressible responses
+            responder = _IdentityResponder(self.app, self.config.minimum_size)
+        responder.allowed_content_types = self.allowed_content_types
+        await responder(scope, receive, send)
@@ -0,0 +1,58 @@
+import base64
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException, Query, Response
+from app.config import settings
+
+class Page:
+    def __init__(self, limit: Optional[int], cursor: Optional[str], include_total: bool):
+        self.limit = limit
+        self.cursor = cursor
+        self.include_total = include_total
+
+def page_params(
+    limit: Optional[int] = Query(None, ge=1, description="Rows per page; omit with cursor to get the whole list"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    include_total: bool = Query(False, description="Return the row count in X-Total-Count")
+) -> Page:
+    if limit is not None:
+        limit = min(limit, settings.pagination.max_limit)
+    elif cursor is not None:
+        limit = settings.pagination.default_limit
+    return Page(limit, cursor, include_total)
+
+def encode_cursor(key: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key_type: type = str) -> Any:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Well-formed cursors must still hold a row id of the listed table
+    if not isinstance(key, key_type) or isinstance(key, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+async def paginate(
+    response: Response,
+    page: Page,
+    list_rows: Callable[..., Awaitable[List[Dict[str, Any]]]],
+    count_rows: Optional[Callable[[], Awaitable[int]]] = None,
+    key_type: type = str,
+    **filters
+) -> List[Dict[str, Any]]:
+    # Pages are ordered by row id and resume after the last id of the
+    # previous page, so each page costs one index range scan
+    after = decode_cursor(page.cursor, key_type) if page.cursor else None
+    if page.limit is None:
+        rows = await list_rows(**filters)
+    else:
+        # One extra row tells whether another page follows
+        rows = await list_rows(limit=page.limit + 1, after=after, **filters)
+        if len(rows) > page.limit:
+            rows = rows[:page.limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    if page.include_total and count_rows is not None:
+        response.headers["X-Total-Count"] = str(await count_rows())
+    return rows
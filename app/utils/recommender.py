@@ -1,179 +1,525 @@
 import difflib
-from typing import List, Dict, Optional, Tuple
+import hashlib
+from collections import Counter
+from typing import Any, Iterable, List, Dict, Optional, Tuple
+import numpy as np
 
-def get_field_recommendation(
-    source_field: str, 
-    column_values: List[str], 
-    data_fields: List[Dict],
-    entities: Optional[List[Dict]] = None
-) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    """
-    Returns (entity, field_name, field_id) or (None, None, None)
-    Based on source field name and/or column values matching standard values.
-    """
-    if not source_field:
-        return None, None, None
-        
-    source_field_lower = str(source_field).lower().strip()
-    
-    def normalize(s: str) -> str:
-        if not s: return ""
-        s = s.lower().strip()
-        # Basic plural to singular
-        if s.endswith('s') and len(s) > 3:
-            if s.endswith('ies'): return s[:-3] + 'y'
-            return s[:-1]
-        return s
-
-    def calculate_match_score(source: str, target: str) -> float:
-        if not source or not target: return 0.0
-        s_norm = source.lower().strip()
-        t_norm = target.lower().strip()
-        
-        if s_norm == t_norm: return 1.0
-        
-        # Check normalized (singular) version
-        if normalize(s_norm) == normalize(t_norm): return 0.95
-        
-        # Substring match
+SYNONYMS = {
+    "hostname": ["host name", "server name", "node name", "name", "dns name"],
+    "ip": ["ip address", "ipv4", "address"],
+    "os": ["operating system", "os type", "os name"],
+    "cpu": ["cpu count", "cores", "processors", "cpu core count"],
+    "ram": ["ram size", "memory", "memory size", "ram (gb)"],
+}
+
+def normalize(s: str) -> str:
+    if not s: return ""
+    s = s.lower().strip()
+    # Basic plural to singular
+    if s.endswith('s') and len(s) > 3:
+        if s.endswith('ies'): return s[:-3] + 'y'
+        return s[:-1]
+    return s
+
+def calculate_match_score(source: str, target: str) -> float:
+    if not source or not target: return 0.0
+    s_norm = source.lower().strip()
+    t_norm = target.lower().strip()
+
+    if s_norm == t_norm: return 1.0
+
+    # Check normalized (singular) version
+    if normalize(s_norm) == normalize(t_norm): return 0.95
+
+    # Substring match
+    if s_norm in t_norm or t_norm in s_norm:
+        # Prefer longer matches relative to targets
+        return 0.8 * (min(len(s_norm), len(t_norm)) / max(len(s_norm), len(t_norm))) + 0.1
+
+    # Fuzzy match
+    return difflib.SequenceMatcher(None, s_norm, t_norm).ratio()
+
+def normalize_standard_value(value: Any) -> str:
+    return str(value).lower().strip()
+
+def build_standard_value_index(data_fields: List[Dict]) -> Dict[str, set]:
+    # Normalized standard value -> ids of the data fields that list it
+    index: Dict[str, set] = {}
+    for df in data_fields:
+        for sv in df.get("standard_values", []):
+            index.setdefault(normalize_standard_value(sv["value"]), set()).add(df["id"])
+    return index
+
+def memo_key(source_field: str) -> str:
+    # Source field as used to look up remembered recommendations
+    return " ".join(str(source_field).lower().split())
+
+def values_fingerprint(values: Optional[List[Any]]) -> str:
+    # Order-independent digest of a column's sampled values. Missing values are
+    # ignored, so a stored str(nan) and a dropped NaN fingerprint the same.
+    clean = set(str(v).strip().lower() for v in values or [] if v is not None and str(v).strip())
+    clean.discard("nan")
+    return hashlib.sha1("\x1f".join(sorted(clean)).encode("utf-8")).hexdigest()
+
+# Headers whose name scores are remembered per index
+NAME_SCORE_MEMO_SIZE = 10000
+# Entity and field names per source form that get exact scoring
+SHORTLIST_SIZE = 25
+
+def trigrams(s: str) -> set:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+class _Term:
+    # A target entity or field name with its forms precomputed for scoring
+    __slots__ = ("raw", "lower", "singular", "grams", "chars")
+
+    def __init__(self, raw: Optional[str]):
+        self.raw = raw
+        self.lower = raw.lower().strip() if raw else ""
+        self.singular = normalize(self.lower)
+        self.grams = trigrams(self.lower)
+        self.chars = Counter(self.lower)
+
+    def bound(self, source: "_Source") -> Tuple[float, bool]:
+        # (score, True) when calculate_match_score(source, self.raw) needs no
+        # fuzzy matching, else (upper bound of the fuzzy ratio, False)
+        if not source.raw or not self.raw: return 0.0, True
+        s_norm, t_norm = source.lower, self.lower
+        if s_norm == t_norm: return 1.0, True
+        if source.singular == self.singular: return 0.95, True
         if s_norm in t_norm or t_norm in s_norm:
-            # Prefer longer matches relative to targets
-            return 0.8 * (min(len(s_norm), len(t_norm)) / max(len(s_norm), len(t_norm))) + 0.1
-            
-        # Fuzzy match
-        return difflib.SequenceMatcher(None, s_norm, t_norm).ratio()
-
-    # 1. Try to identify potential entity and field parts from source
-    extracted_entity_part = None
-    extracted_field_part = source_field_lower
-    
-    for sep in ["|", "-", ":", "/"]:
-        if sep in source_field:
-            parts = [p.strip() for p in source_field.split(sep)]
-            if len(parts) >= 2:
-                extracted_entity_part = parts[0]
-                extracted_field_part = " ".join(parts[1:])
+            return 0.8 * (min(len(s_norm), len(t_norm)) / max(len(s_norm), len(t_norm))) + 0.1, True
+        # SequenceMatcher.quick_ratio: characters in common, ignoring order
+        return 2.0 * sum((source.chars & self.chars).values()) / (len(s_norm) + len(t_norm)), False
+
+    def best_score(self, sources: List["_Source"]) -> float:
+        # max(calculate_match_score(s, self.raw) for s in sources), running the
+        # fuzzy ratio only where its bound could still raise the maximum
+        best = 0.0
+        bounds = sorted(((self.bound(source), source) for source in sources), key=lambda b: -b[0][0])
+        for (score, exact), source in bounds:
+            if score <= best:
                 break
+            if not exact:
+                score = difflib.SequenceMatcher(None, source.lower, self.lower).ratio()
+            best = max(best, score)
+        return best
 
-    # 2. Collect all possible targets
-    all_targets = []
-    
-    # Data Dictionary fields
-    for df in data_fields:
-        all_targets.append({
-            "entity": df["entity"],
-            "field": df["name"],
-            "id": df["id"],
-            "type": "dictionary",
-            "standard_values": df.get("standard_values", [])
-        })
-        
-    # Entity Fields
-    if entities:
-        for ent in entities:
-            # Also add the entity itself as a possible target (with no field)
-            all_targets.append({
-                "entity": ent["name"],
-                "field": None,
-                "id": None,
-                "type": "entity_only"
+class _Source:
+    __slots__ = ("raw", "lower", "singular", "grams", "chars")
+
+    def __init__(self, raw: Optional[str]):
+        self.raw = raw
+        self.lower = raw.lower().strip() if raw else ""
+        self.singular = normalize(self.lower)
+        self.grams = trigrams(self.lower)
+        self.chars = Counter(self.lower)
+
+class _TrigramIndex:
+    """
+    Character-trigram inverted index over entity or field names. A name that
+    shares no trigram with a source header cannot be an exact, singular or
+    substring match of it, so only the best overlapping names are shortlisted.
+    """
+
+    # Cells of the (source x name) overlap matrix computed at once
+    BLOCK_CELLS = 4_000_000
+
+    def __init__(self, terms: Dict[Any, _Term], size: int):
+        self.size = size
+        self.names = list(terms)
+        # Names too short to have a trigram are always candidates
+        self.short = [name for name in self.names if not terms[name].grams]
+        self.gram_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        for i, name in enumerate(self.names):
+            for gram in terms[name].grams:
+                gram_id = self.gram_ids.setdefault(gram, len(postings))
+                if gram_id == len(postings):
+                    postings.append([])
+                postings[gram_id].append(i)
+        lengths = np.array([len(p) for p in postings], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self.postings = np.array([i for p in postings for i in p], dtype=np.int64)
+        self.gram_counts = np.array([len(terms[name].grams) for name in self.names], dtype=np.float64)
+
+    def shortlist(self, sources_per_header: List[List[_Source]]) -> List[set]:
+        # Scores every source form of every header against every name as one
+        # matrix of shared trigram counts, then keeps the top names per form:
+        # names fully contained in the source first, then by Dice overlap.
+        if len(self.names) <= self.size:
+            # Every name fits in the shortlist, including those sharing no trigram
+            return [set(self.names) for _ in sources_per_header]
+        result = [set(self.short) for _ in sources_per_header]
+        rows = [
+            (h, [self.gram_ids[g] for g in source.grams if g in self.gram_ids], len(source.grams))
+            for h, sources in enumerate(sources_per_header) for source in sources
+        ]
+        rows = [row for row in rows if row[1]]
+        n = len(self.names)
+        if not rows or not n:
+            return result
+
+        block = max(1, self.BLOCK_CELLS // n)
+        for start in range(0, len(rows), block):
+            part = rows[start:start + block]
+            row_ids = np.repeat(np.arange(len(part)), [len(r[1]) for r in part])
+            gram_ids = np.array([g for r in part for g in r[1]], dtype=np.int64)
+            # Expand each (row, gram) pair into that gram's posting list
+            lengths = self.offsets[gram_ids + 1] - self.offsets[gram_ids]
+            starts = np.repeat(self.offsets[gram_ids] - np.cumsum(lengths) + lengths, lengths)
+            names = self.postings[starts + np.arange(lengths.sum())]
+            cells = np.repeat(row_ids, lengths) * n + names
+            shared = np.bincount(cells, minlength=len(part) * n).reshape(len(part), n)
+
+            sizes = np.array([r[2] for r in part], dtype=np.float64)
+            key = 2 * shared / (self.gram_counts[None, :] + sizes[:, None])
+            key += 2.0 * (shared == self.gram_counts[None, :])
+            for r, (h, _, _) in enumerate(part):
+                candidates = np.flatnonzero(shared[r])
+                if len(candidates) > self.size:
+                    # Ties go to the name that comes first in the dictionary
+                    order = np.lexsort((candidates, -key[r, candidates]))
+                    candidates = candidates[order[:self.size]]
+                result[h].update(self.names[i] for i in candidates)
+        return result
+
+class _Header:
+    # One source header with its entity and field name scores, filled on demand
+    def __init__(self, index: "RecommenderIndex", source_field: str):
+        self.index = index
+        source_field_lower = str(source_field).lower().strip()
+
+        # 1. Try to identify potential entity and field parts from source
+        extracted_entity_part = None
+        extracted_field_part = source_field_lower
+
+        for sep in ["|", "-", ":", "/"]:
+            if sep in source_field:
+                parts = [p.strip() for p in source_field.split(sep)]
+                if len(parts) >= 2:
+                    extracted_entity_part = parts[0]
+                    extracted_field_part = " ".join(parts[1:])
+                    break
+
+        self.source_field = source_field
+        self.source_field_lower = source_field_lower
+        self.has_entity_part = bool(extracted_entity_part)
+        self.whole = _Source(source_field_lower)
+        self.entity_part = _Source(extracted_entity_part)
+        self.field_part = _Source(extracted_field_part)
+        self.synonym_hits = {
+            canonical: any(v in extracted_field_part for v in variations) or any(v in source_field_lower for v in variations)
+            for canonical, variations in SYNONYMS.items()
+        }
+        self.entity_sources = [self.entity_part, self.whole] if self.has_entity_part else [self.whole]
+        self.field_sources = [self.field_part, self.whole]
+        self.entity_bounds: Dict[Any, float] = {}
+        self.entity_scores: Dict[Any, float] = {}
+        self.field_bounds: Dict[Any, float] = {}
+        self.field_scores: Dict[Any, float] = {}
+
+        self.candidates: List[int] = []
+
+    def set_shortlist(self, entities: set, fields: set):
+        # Names the synonym table ties to this header always qualify
+        for canonical, hit in self.synonym_hits.items():
+            if hit:
+                fields.update(self.index.synonym_fields.get(canonical, ()))
+        self.candidates = sorted(
+            set(pos for name in entities for pos in self.index.targets_by_entity.get(name, ()))
+            | set(pos for name in fields for pos in self.index.targets_by_field.get(name, ()))
+        )
+
+    def entity_bound(self, name: Any) -> float:
+        bound = self.entity_bounds.get(name)
+        if bound is None:
+            term = self.index.entity_terms[name]
+            bound = max(term.bound(source)[0] for source in self.entity_sources)
+            if self._entity_contained(name):
+                bound = max(bound, 0.8)
+            self.entity_bounds[name] = bound
+        return bound
+
+    def entity_score(self, name: Any) -> float:
+        score = self.entity_scores.get(name)
+        if score is None:
+            # Also try matching entity name against the WHOLE source field
+            score = self.index.entity_terms[name].best_score(self.entity_sources)
+            # Or check if entity name is CONTAINED in the source field
+            if self._entity_contained(name):
+                score = max(score, 0.8) # Boosted from 0.7
+            self.entity_scores[name] = score
+        return score
+
+    def _entity_contained(self, name: Any) -> bool:
+        lower, singular = self.index.entity_needles[name]
+        return lower in self.source_field_lower or singular in self.source_field_lower
+
+    def field_bound(self, name: Any) -> float:
+        bound = self.field_bounds.get(name)
+        if bound is None:
+            term = self.index.field_terms[name]
+            bound = max(term.bound(source)[0] for source in self.field_sources)
+            if self._synonym_boosted(name):
+                bound = max(bound, 0.9)
+            self.field_bounds[name] = bound
+        return bound
+
+    def field_score(self, name: Any) -> float:
+        score = self.field_scores.get(name)
+        if score is None:
+            # Also try matching field name against the WHOLE source field
+            score = self.index.field_terms[name].best_score(self.field_sources)
+            # Synonym boost for field
+            if self._synonym_boosted(name):
+                score = max(score, 0.9)
+            self.field_scores[name] = score
+        return score
+
+    def _synonym_boosted(self, name: Any) -> bool:
+        return any(self.synonym_hits[canonical] for canonical in self.index.field_synonyms[name])
+
+def combined_score(entity_score: float, field_score: Optional[float]) -> float:
+    # Name score of a target; field_score is None for targets without a field
+    if field_score is None:
+        # Entity only match - should be strong if entity is found
+        return entity_score * 95
+
+    # If field score is very low, it shouldn't help much, and should even penalize
+    if field_score > 0.7:
+        effective_field_score = field_score
+    elif field_score > 0.45:
+        effective_field_score = field_score * 0.1
+    else:
+        effective_field_score = -1.0 # Heavier penalty for bad field match
+
+    if entity_score > 0.7:
+        return entity_score * 85 + effective_field_score * 15
+    # If entity doesn't match well, field must match VERY well
+    return entity_score * 15 + field_score * 85
+
+def combined_bound(entity_bound: float, field_bound: Optional[float]) -> float:
+    # Upper bound of combined_score for scores up to the given bounds. It rises
+    # with both scores within each entity branch, so check the top of each.
+    bound = combined_score(entity_bound, field_bound)
+    if entity_bound > 0.7 and field_bound is not None:
+        bound = max(bound, combined_score(0.7, field_bound))
+    return bound
+
+class RecommenderIndex:
+    """
+    The data dictionary compiled for field recommendations: every target with
+    the lower-cased and singular forms of its names, the synonym groups its
+    field belongs to, the targets listing each standard value and trigram
+    indexes over the names.
+    Build once, recommend many times.
+    """
+
+    def __init__(
+        self,
+        data_fields: List[Dict],
+        entities: Optional[List[Dict]] = None,
+        shortlist_size: int = SHORTLIST_SIZE,
+        standard_value_index: Optional[Dict[str, Iterable[str]]] = None,
+        dictionary_version: int = 0
+    ):
+        # Shared data dictionary version the index was compiled from, stored
+        # with the recommendations it scores
+        self.dictionary_version = dictionary_version
+        self.entity_terms: Dict[Any, _Term] = {}
+        self.field_terms: Dict[Any, _Term] = {}
+        self.targets: List[Dict[str, Any]] = []
+        self.targets_by_entity: Dict[Any, List[int]] = {}
+        self.targets_by_field: Dict[Any, List[int]] = {}
+        self._headers: Dict[str, _Header] = {}
+        seen = set()
+
+        def add_target(entity: str, field: Optional[str], field_id: Optional[str], target_type: str):
+            seen.add((entity, field))
+            if entity not in self.entity_terms:
+                self.entity_terms[entity] = _Term(entity)
+            if field and field not in self.field_terms:
+                self.field_terms[field] = _Term(field)
+            pos = len(self.targets)
+            self.targets_by_entity.setdefault(entity, []).append(pos)
+            if field:
+                self.targets_by_field.setdefault(field, []).append(pos)
+            self.targets.append({
+                "entity": entity,
+                "field": field,
+                "id": field_id,
+                "type": target_type
             })
+
+        # Data Dictionary fields
+        for df in data_fields:
+            add_target(df["entity"], df["name"], df["id"], "dictionary")
+
+        # Entity Fields
+        for ent in entities or []:
+            # Also add the entity itself as a possible target (with no field)
+            add_target(ent["name"], None, None, "entity_only")
             for f in ent.get("fields", []):
                 # Avoid duplicates
-                if not any(t["entity"] == ent["name"] and t["field"] == f["name"] for t in all_targets):
-                    all_targets.append({
-                        "entity": ent["name"],
-                        "field": f["name"],
-                        "id": None,
-                        "type": "entity_field"
-                    })
-
-    # 3. Score targets
-    best_match = None
-    max_score = 0.0
-
-    synonyms = {
-        "hostname": ["host name", "server name", "node name", "name", "dns name"],
-        "ip": ["ip address", "ipv4", "address"],
-        "os": ["operating system", "os type", "os name"],
-        "cpu": ["cpu count", "cores", "processors", "cpu core count"],
-        "ram": ["ram size", "memory", "memory size", "ram (gb)"],
-    }
-
-    for target in all_targets:
-        score = 0.0
-        target_entity = target["entity"]
-        target_field = target["field"]
-        
-        # Entity matching
-        entity_score = 0.0
-        if extracted_entity_part:
-            entity_score = calculate_match_score(extracted_entity_part, target_entity)
-        
-        # Also try matching entity name against the WHOLE source field
-        whole_entity_score = calculate_match_score(source_field_lower, target_entity)
-        # Or check if entity name is CONTAINED in the source field
-        if target_entity.lower() in source_field_lower or normalize(target_entity) in source_field_lower:
-            whole_entity_score = max(whole_entity_score, 0.8) # Boosted from 0.7
-            
-        entity_score = max(entity_score, whole_entity_score)
-        
-        # Field matching
-        field_score = 0.0
-        if target_field:
-            field_score = calculate_match_score(extracted_field_part, target_field)
-            # Also try matching field name against the WHOLE source field
-            whole_field_score = calculate_match_score(source_field_lower, target_field)
-            field_score = max(field_score, whole_field_score)
-            
-            # Synonym boost for field
-            for canonical, variations in synonyms.items():
-                if canonical in target_field.lower() or any(v in target_field.lower() for v in variations):
-                    if any(v in extracted_field_part for v in variations) or any(v in source_field_lower for v in variations):
-                        field_score = max(field_score, 0.9)
-
-        elif target["type"] == "entity_only":
-            # Baseline for entity-only match if entity matches well
-            if entity_score > 0.6:
-                field_score = 0.1 
-        
-        # Combined score
-        if target_field:
-            # If field score is very low, it shouldn't help much, and should even penalize
-            if field_score > 0.7:
-                effective_field_score = field_score
-            elif field_score > 0.45:
-                effective_field_score = field_score * 0.1
-            else:
-                effective_field_score = -1.0 # Heavier penalty for bad field match
-            
-            if entity_score > 0.7:
-                score = entity_score * 85 + effective_field_score * 15
-            else:
-                # If entity doesn't match well, field must match VERY well
-                score = entity_score * 15 + field_score * 85
-        else:
-            # Entity only match - should be strong if entity is found
-            score = entity_score * 95
-            
-        # Value-based boost
-        if column_values and target.get("standard_values"):
+                if (ent["name"], f["name"]) not in seen:
+                    add_target(ent["name"], f["name"], None, "entity_field")
+
+        # Containment checks against the whole source field
+        self.entity_needles = {
+            name: (name.lower() if name is not None else "", term.singular)
+            for name, term in self.entity_terms.items()
+        }
+        # Synonym groups each field name belongs to, and the reverse
+        self.field_synonyms = {
+            name: [
+                canonical for canonical, variations in SYNONYMS.items()
+                if canonical in term.raw.lower() or any(v in term.raw.lower() for v in variations)
+            ]
+            for name, term in self.field_terms.items()
+        }
+        self.synonym_fields: Dict[str, List[Any]] = {}
+        for name, groups in self.field_synonyms.items():
+            for canonical in groups:
+                self.synonym_fields.setdefault(canonical, []).append(name)
+
+        # Normalized standard value -> positions of the dictionary targets listing it
+        if standard_value_index is None:
+            standard_value_index = build_standard_value_index(data_fields)
+        dictionary_targets = {t["id"]: pos for pos, t in enumerate(self.targets) if t["type"] == "dictionary"}
+        self.value_targets: Dict[str, List[int]] = {}
+        for value, field_ids in standard_value_index.items():
+            positions = sorted(dictionary_targets[fid] for fid in field_ids if fid in dictionary_targets)
+            if positions:
+                self.value_targets[value] = positions
+        self.entity_grams = _TrigramIndex(self.entity_terms, shortlist_size)
+        self.field_grams = _TrigramIndex(self.field_terms, shortlist_size)
+
+    def __getstate__(self):
+        # Shipped to worker processes without the per-header memo
+        state = self.__dict__.copy()
+        state["_headers"] = {}
+        return state
+
+    def _headers_for(self, source_fields: List[str]) -> Dict[str, _Header]:
+        # Name scores only depend on the header, so repeated headers reuse them.
+        # New headers are shortlisted together through the trigram indexes.
+        headers: Dict[str, _Header] = {}
+        new_headers = []
+        for source_field in source_fields:
+            if source_field in headers:
+                continue
+            header = self._headers.get(source_field)
+            if header is None:
+                header = _Header(self, source_field)
+                new_headers.append(header)
+            headers[source_field] = header
+
+        if new_headers:
+            entities = self.entity_grams.shortlist([h.entity_sources for h in new_headers])
+            fields = self.field_grams.shortlist([h.field_sources for h in new_headers])
+            for header, entity_names, field_names in zip(new_headers, entities, fields):
+                header.set_shortlist(entity_names, field_names)
+            if len(self._headers) + len(new_headers) > NAME_SCORE_MEMO_SIZE:
+                self._headers.clear()
+            self._headers.update((h.source_field, h) for h in new_headers)
+        return headers
+
+    def recommend(self, source_field: str, column_values: List[Any]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Returns (entity, field_name, field_id) or (None, None, None)
+        Based on source field name and/or column values matching standard values.
+        """
+        return self.recommend_batch([source_field], {source_field: column_values})[0]
+
+    def recommend_batch(
+        self,
+        columns: List[str],
+        samples: Optional[Dict[str, List[Any]]] = None
+    ) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        # Recommendations for every column of a worksheet, in column order
+        samples = samples or {}
+        headers = self._headers_for([c for c in columns if c])
+        return [
+            self._recommend_header(headers[c], samples.get(c)) if c else (None, None, None)
+            for c in columns
+        ]
+
+    def _recommend_header(self, header: _Header, column_values: Optional[List[Any]]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        # Targets whose standard values overlap the sample are always scored
+        value_matches = {}
+        if column_values:
             clean_values = set(str(v).strip().lower() for v in column_values if v is not None and str(v).strip())
             if clean_values:
-                standard_values = set(str(sv["value"]).lower().strip() for sv in target["standard_values"])
-                matches = len(clean_values.intersection(standard_values))
-                if matches > 0:
-                    match_ratio = matches / len(clean_values)
-                    if match_ratio >= 0.2:
-                        score += 40 # Increased boost
-                    score += int(match_ratio * 20)
-
-        if score > max_score:
-            max_score = score
-            best_match = target
-
-    # Final decision
-    if best_match and max_score >= 40: # Increased threshold
-        return best_match["entity"], best_match["field"], best_match["id"]
-
-    return None, None, None
+                # One lookup per sampled value, however large the dictionary
+                matches: Dict[int, int] = {}
+                for value in clean_values:
+                    for pos in self.value_targets.get(value, ()):
+                        matches[pos] = matches.get(pos, 0) + 1
+                value_matches = {pos: n / len(clean_values) for pos, n in matches.items()}
+
+        candidates = header.candidates
+        if value_matches:
+            candidates = sorted(set(candidates) | set(value_matches))
+
+        # Value-based boost
+        boosts = {}
+        for pos, match_ratio in value_matches.items():
+            boost = 0
+            if match_ratio >= 0.2:
+                boost += 40 # Increased boost
+            boosts[pos] = boost + int(match_ratio * 20)
+
+        # 3. Score targets. Targets outside the shortlist share no trigram with
+        # the header and carry no value boost, so they are not considered. The
+        # rest are visited by descending upper bound and exact (fuzzy) scoring
+        # stops once no remaining target can beat the best one or reach 40.
+        ranked = []
+        for pos in candidates:
+            target = self.targets[pos]
+            field = target["field"]
+            bound = combined_bound(
+                header.entity_bound(target["entity"]),
+                header.field_bound(field) if field else None
+            ) + boosts.get(pos, 0)
+            ranked.append((-bound, pos))
+        ranked.sort()
+
+        best_match = None
+        best_pos = None
+        max_score = 0.0
+
+        for neg_bound, pos in ranked:
+            bound = -neg_bound
+            if bound < 40 or bound < max_score or (bound == max_score and pos > best_pos):
+                break
+            target = self.targets[pos]
+            field = target["field"]
+            score = combined_score(
+                header.entity_score(target["entity"]),
+                header.field_score(field) if field else None
+            ) + boosts.get(pos, 0)
+            # Ties go to the target that comes first in the dictionary
+            if score > max_score or (score == max_score and best_pos is not None and pos < best_pos):
+                max_score = score
+                best_match = target
+                best_pos = pos
+
+        # Final decision
+        if best_match and max_score >= 40: # Increased threshold
+            return best_match["entity"], best_match["field"], best_match["id"]
+
+        return None, None, None
+
+def get_field_recommendation(
+    source_field: str,
+    column_values: List[str],
+    data_fields: List[Dict],
+    entities: Optional[List[Dict]] = None
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Returns (entity, field_name, field_id) or (None, None, None)
+    Based on source field name and/or column values matching standard values.
+    Compiles the dictionary on every call; prefer a cached RecommenderIndex.
+    """
+    return RecommenderIndex(data_fields, entities).recommend(source_field, column_values)
@@ -0,0 +1,125 @@
+import io
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import openpyxl
+import pandas as pd
+
+class WorkbookReader:
+    """
+    Opens an .xlsx workbook once in openpyxl read-only mode and streams the rows
+    of any of its worksheets as DataFrame chunks, mirroring pd.read_excel(header=...).
+    """
+
+    def __init__(self, path: str):
+        self.workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    def __enter__(self) -> "WorkbookReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.workbook.close()
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheetnames
+
+    def iter_chunks(self, sheet_name: Optional[str] = None, header_row: int = 1, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        # sheet_name=None reads the first worksheet, like pd.read_excel's default
+        ws = self.workbook[sheet_name] if sheet_name is not None else self.workbook.worksheets[0]
+        rows = ws.iter_rows(min_row=header_row, values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        header = _trim([_cell_value(v) for v in header])
+
+        columns = None
+        chunk = []
+        blank_rows = 0
+        yielded = False
+        for row in rows:
+            values = _trim([_cell_value(v) for v in row])
+            if not values:
+                # Blank lines are kept unless they trail the data, as in pandas
+                blank_rows += 1
+                continue
+            chunk.extend([[]] * blank_rows)
+            blank_rows = 0
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                columns = _column_names(header, chunk, columns)
+                yield _frame(chunk, columns)
+                yielded = True
+                chunk = []
+        # A header without data rows still gives its (empty) frame
+        if chunk or not yielded:
+            yield _frame(chunk, _column_names(header, chunk, columns))
+
+def _frame(rows: List[List[Any]], columns: List[str]) -> pd.DataFrame:
+    width = len(columns)
+    data = []
+    for values in rows:
+        values = values[:width] + [None] * (width - len(values))
+        data.append([math.nan if v is None else v for v in values])
+    return pd.DataFrame(data, columns=columns)
+
+def _trim(values: List[Any]) -> List[Any]:
+    while values and values[-1] is None:
+        values.pop()
+    return values
+
+def _cell_value(value: Any) -> Any:
+    # pandas' openpyxl reader turns whole-number floats into ints
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value == "":
+        return None
+    return value
+
+def _column_names(header: List[Any], rows: List[List[Any]], columns: Optional[List[str]] = None) -> List[str]:
+    # The frame is as wide as the widest of the header and the rows read so
+    # far: a chunk with wider rows than earlier ones adds columns at the end.
+    # Empty headers become "Unnamed: <i>", duplicates get ".1", ".2", ...
+    width = max([len(header), len(columns or [])] + [len(r) for r in rows])
+    if columns is not None and width == len(columns):
+        return columns
+    columns = []
+    seen = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            candidate = f"{name}.{seen[name]}"
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f"{name}.{seen[name]}"
+            name = candidate
+        seen[name] = 0
+        columns.append(name)
+    return columns
+
+# Parsers for uploads that are read whole. They only depend on pandas so the
+# API can run them in its spawned worker processes.
+
+def read_records(contents: bytes, filename: str) -> List[Dict[str, Any]]:
+    if filename.endswith('.csv'):
+        df = pd.read_csv(io.BytesIO(contents))
+    elif filename.endswith(('.xls', '.xlsx')):
+        df = pd.read_excel(io.BytesIO(contents))
+    else:
+        raise ValueError("Invalid file format")
+    return df.to_dict(orient="records")
+
+def read_data_entity_workbook(contents: bytes) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    df_entities = pd.read_excel(io.BytesIO(contents), sheet_name='Data Entities')
+    df_fields = pd.read_excel(io.BytesIO(contents), sheet_name='Data Entity Fields')
+    
+    # Handle NaN values
+    df_entities = df_entities.where(pd.notnull(df_entities), None)
+    df_fields = df_fields.where(pd.notnull(df_fields), None)
+    
+    return df_entities.to_dict(orient='records'), df_fields.to_dict(orient='records')
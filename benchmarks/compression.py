@@ -0,0 +1,86 @@
+"""
+Measures response compression on typical list payloads: size, CPU time and
+the resulting transfer time over a slow link.
+
+    python benchmarks/compression.py [rows] [link_mbit]
+
+Builds the JSON bodies of `rows` CIs, workloads and discovered data records
+(five fields each), shaped like the list endpoints return them, and
+compresses each with gzip and, if the brotli package is installed, brotli at
+several levels. Transfer time is body size over a `link_mbit` Mbit/s link
+(default 20, a VPN user) plus the compression time; decompression on the
+client is not counted. Prints the best of three runs.
+"""
+import os
+import sys
+import time
+import uuid
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RUNS = 3
+
+def ci_row(i: int) -> dict:
+    return {"id": str(uuid.uuid4()), "name": f"SRV-{i:06d}", "type": "server",
+            "description": "Imported from CMDB", "properties": {"cpu": 4 + i % 4 * 4, "ram": f"{8 + i % 8 * 8}GB", "os": ["Linux", "Windows"][i % 2]}}
+
+def workload_row(i: int) -> dict:
+    return {"id": str(uuid.uuid4()), "name": f"Workload {i}", "description": None, "environment": ["PROD", "UAT", "DEV"][i % 3],
+            "hosting_model": "On-Premise", "ci_ids": [str(uuid.uuid4()) for _ in range(3)],
+            "relationships": [{"source_id": "a", "target_id": "b", "type": "runs_on"}]}
+
+def discovered_row(i: int) -> dict:
+    entity_id = str(uuid.uuid4())
+    return {"id": entity_id, "created_time": f"2024-01-01 10:{i % 60:02d}:00", "source_type": "file", "user": "admin",
+            "data_entity_name": "Server", "data_source_id": None, "source_name": "cmdb_export.xlsx", "status": "Ingested",
+            "fields": [{"id": str(uuid.uuid4()), "created_time": f"2024-01-01 10:{i % 60:02d}:00", "discovered_data_entity_id": entity_id,
+                        "field_name": f"Column {j}", "field_value": f"value-{i}-{j}", "rating": "high"} for j in range(5)]}
+
+PAYLOADS = [
+    ("/prepare/items", ci_row),
+    ("/map/workloads", workload_row),
+    ("/discovered-data", discovered_row),
+]
+
+def codecs():
+    for level in (1, 6, 9):
+        yield f"gzip {level}", lambda body, level=level: zlib.compress(body, level, wbits=16 + zlib.MAX_WBITS)
+    if brotli is not None:
+        for quality in (1, 4, 6, 11):
+            yield f"br {quality}", lambda body, quality=quality: brotli.compress(body, quality=quality)
+
+def best_of(fn, body):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        compressed = fn(body)
+        timings.append(time.perf_counter() - start)
+    return min(timings), compressed
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    link = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    bytes_per_second = link * 1e6 / 8
+    if brotli is None:
+        print("brotli is not installed; gzip only")
+    print(f"{rows} rows, {link:g} Mbit/s link, best of {RUNS}")
+    print(f"{'payload':<18}{'codec':<9}{'size':>11}{'ratio':>8}{'cpu':>10}{'transfer':>11}")
+    for path, make_row in PAYLOADS:
+        body = orjson.dumps([make_row(i) for i in range(rows)])
+        print(f"{path:<18}{'none':<9}{len(body) / 1024:>9.0f}KB{1:>7.1f}x{0:>8.1f}ms{len(body) / bytes_per_second * 1000:>9.0f}ms")
+        for name, compress in codecs():
+            seconds, compressed = best_of(compress, body)
+            transfer = len(compressed) / bytes_per_second + seconds
+            print(f"{'':<18}{name:<9}{len(compressed) / 1024:>9.0f}KB{len(body) / len(compressed):>7.1f}x"
+                  f"{seconds * 1000:>8.1f}ms{transfer * 1000:>9.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measures how light requests fare while heavy listings run on the same
+worker. Start the app first (python main.py or uvicorn main:app), then:
+
+    python benchmarks/event_loop_latency.py [base_url] [rows]
+
+Uploads a CSV of `rows` servers if there is less discovered data than that,
+then probes GET /environments/ alone and while clients keep requesting
+GET /discovered-data, and prints latency percentiles for the probe.
+"""
+import asyncio
+import io
+import statistics
+import sys
+import time
+import httpx
+
+PROBE_INTERVAL = 0.02
+DURATION = 10.0
+HEAVY_CLIENTS = 2
+
+def csv_payload(rows: int) -> bytes:
+    lines = ["Server Name,Environment,IP Address"]
+    for i in range(rows):
+        lines.append(f"SRV-LAT-{i:06d},PROD,10.{i // 65025 % 255}.{i // 255 % 255}.{i % 255}")
+    return "\n".join(lines).encode()
+
+async def ensure_data(client: httpx.AsyncClient, rows: int):
+    existing = len((await client.get("/discovered-data", timeout=None)).json())
+    if existing >= rows:
+        return
+    files = {"file": ("latency.csv", io.BytesIO(csv_payload(rows - existing)), "text/csv")}
+    response = await client.post("/prepare/upload", data={
+        "name": "Latency Benchmark", "rating": "low", "worksheet": "latency", "header_row": 1
+    }, files=files, timeout=None)
+    response.raise_for_status()
+
+async def probe(client: httpx.AsyncClient, duration: float):
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        (await client.get("/environments/")).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+async def heavy(client: httpx.AsyncClient, stop: asyncio.Event, counter: list):
+    while not stop.is_set():
+        (await client.get("/discovered-data", timeout=None)).raise_for_status()
+        counter.append(1)
+
+def report(label: str, latencies):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{label}: {len(latencies)} probes, p50 {p(0.5):.0f} ms, p99 {p(0.99):.0f} ms, max {latencies[-1] * 1000:.0f} ms, mean {statistics.mean(latencies) * 1000:.0f} ms")
+
+async def main(base_url: str, rows: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await ensure_data(client, rows)
+        report("idle", await probe(client, DURATION / 2))
+
+        stop = asyncio.Event()
+        listings = []
+        workers = [asyncio.create_task(heavy(client, stop, listings)) for _ in range(HEAVY_CLIENTS)]
+        await asyncio.sleep(0.5)
+        latencies = await probe(client, DURATION)
+        stop.set()
+        await asyncio.gather(*workers)
+        report(f"with {HEAVY_CLIENTS} clients listing discovered data", latencies)
+        print(f"  discovered-data listings completed: {len(listings)}")
+
+if __name__ == "__main__":
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    asyncio.run(main(base_url, rows))
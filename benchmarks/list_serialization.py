@@ -0,0 +1,79 @@
+"""
+Measures the response side of the largest list endpoints: turning the rows
+the storage layer returns into a JSON body.
+
+    python benchmarks/list_serialization.py [rows]
+
+For `rows` CIs, workloads and discovered data records (five fields each):
+- validated: response_model validation plus Pydantic's JSON dump, FastAPI's
+  path for endpoints with a response_model
+- jsonable: jsonable_encoder plus json.dumps, FastAPI's path for endpoints
+  without one
+- trusted: FastJSONResponse (orjson) on the rows as built, the path taken
+  with responses.trust_storage_payloads
+Prints the best of three runs.
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.schemas.discovered_data import DiscoveredDataEntity
+from app.schemas.prepare import ConfigurationItem
+from app.schemas.workload import Workload
+from app.utils.responses import FastJSONResponse
+
+RUNS = 3
+
+def ci_row(i: int) -> dict:
+    return {"id": str(uuid.uuid4()), "name": f"SRV-{i:06d}", "type": "server",
+            "description": "Benchmark server", "properties": {"cpu": 8, "ram": "32GB", "os": "Linux"}}
+
+def workload_row(i: int) -> dict:
+    return {"id": str(uuid.uuid4()), "name": f"Workload {i}", "description": None, "environment": "PROD",
+            "hosting_model": "On-Premise", "ci_ids": [str(uuid.uuid4()) for _ in range(3)],
+            "relationships": [{"source_id": "a", "target_id": "b", "type": "runs_on"}]}
+
+def discovered_row(i: int) -> dict:
+    entity_id = str(uuid.uuid4())
+    return {"id": entity_id, "created_time": "2024-01-01 00:00:00", "source_type": "file", "user": "benchmark",
+            "data_entity_name": "Server", "data_source_id": None, "source_name": None, "status": "Ingested",
+            "fields": [{"id": str(uuid.uuid4()), "created_time": "2024-01-01 00:00:00", "discovered_data_entity_id": entity_id,
+                        "field_name": f"Column {j}", "field_value": f"value-{i}-{j}", "rating": "high"} for j in range(5)]}
+
+CASES = [
+    ("/prepare/items", ConfigurationItem, ci_row),
+    ("/map/workloads", Workload, workload_row),
+    ("/discovered-data", DiscoveredDataEntity, discovered_row),
+]
+
+def best_of(fn, rows) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"{count} rows, best of {RUNS}")
+    print(f"{'endpoint':<20}{'validated':>11}{'jsonable':>11}{'trusted':>11}")
+    for path, model, make_row in CASES:
+        rows: List[dict] = [make_row(i) for i in range(count)]
+        adapter = TypeAdapter(List[model])
+        validated = lambda rows: adapter.dump_json(adapter.validate_python(rows))
+        jsonable = lambda rows: json.dumps(jsonable_encoder(rows)).encode()
+        trusted = lambda rows: FastJSONResponse(rows).body
+        assert json.loads(validated(rows)) == json.loads(trusted(rows)) == json.loads(jsonable(rows))
+        timings = [best_of(fn, rows) for fn in (validated, jsonable, trusted)]
+        print(f"{path:<20}" + "".join(f"{t * 1000:>9.0f}ms" for t in timings))
+
+if __name__ == "__main__":
+    main()
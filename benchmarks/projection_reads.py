@@ -0,0 +1,85 @@
+"""
+Compares ORM hydration with the Core select() projections the storage read
+paths use, on a scratch SQLite database:
+
+    python benchmarks/projection_reads.py [rows]
+
+For each table, `rows` rows are inserted and then read back into dicts twice:
+- orm: query the mapped class and copy attributes into dicts, as the storage
+  layer did before
+- projection: select the columns and take each row's mapping
+Prints the best of three runs and the cost per row.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models import models
+
+RUNS = 3
+
+TABLES = {
+    models.ConfigurationItem: lambda i: {
+        "id": str(uuid.uuid4()), "name": f"SRV-{i}", "type": "server",
+        "description": "Benchmark server", "properties": {"cpu": 8, "ram": "32GB", "os": "Linux"}
+    },
+    models.Dependency: lambda i: {
+        "source_workload_id": f"wl-{i}", "target_workload_id": f"wl-{i + 1}", "environment": "PROD",
+        "level": "Medium", "latency_sensitive": False, "type": "dependency"
+    },
+    models.FieldMapping: lambda i: {
+        "id": str(uuid.uuid4()), "source_field": f"Column {i % 50}", "data_source": f"Source {i // 50}",
+        "worksheet": "Sheet1", "data_entity": "Server", "target_field": "Hostname",
+        "data_dictionary_field_id": None, "status": "Recommended", "process": True
+    },
+    models.S2TMapping: lambda i: {
+        "id": str(uuid.uuid4()), "workload_id": f"wl-{i}", "move_principle_id": None,
+        "target_environment_id": None, "target_location": "eu-west-1",
+        "score_card_results": {"f1": "o1"}, "total_score": 3, "status": "Draft"
+    },
+}
+
+def orm_read(engine, model, columns):
+    with Session(engine) as db:
+        return [{name: getattr(obj, name) for name in columns} for obj in db.query(model).all()]
+
+def projection_read(engine, model, columns):
+    with Session(engine) as db:
+        query = select(*(getattr(model, name) for name in columns))
+        return [dict(row) for row in db.execute(query).mappings()]
+
+def best_of(fn, *args) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'projection.db')}")
+        Base.metadata.create_all(bind=engine)
+        print(f"{rows} rows per table, best of {RUNS}")
+        print(f"{'table':<22}{'orm':>10}{'projection':>12}{'orm/row':>10}{'proj/row':>10}")
+        for model, make_row in TABLES.items():
+            with engine.begin() as conn:
+                conn.execute(insert(model.__table__), [make_row(i) for i in range(rows)])
+            columns = [c.name for c in model.__table__.columns]
+            assert orm_read(engine, model, columns) == projection_read(engine, model, columns)
+            orm = best_of(orm_read, engine, model, columns)
+            projection = best_of(projection_read, engine, model, columns)
+            print(f"{model.__tablename__:<22}{orm:>9.2f}s{projection:>11.2f}s"
+                  f"{orm / rows * 1e6:>8.1f}us{projection / rows * 1e6:>8.1f}us")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares SQLite's defaults with the profile in config.yaml (database.sqlite)
+on a scratch database:
+
+    python benchmarks/sqlite_profile.py [rows]
+
+- small commits: one row per transaction, like single-item API writes
+- bulk insert: rows written in bulk_batch_size batches in one transaction,
+  like a dataset upload
+- reads during upload: a reader thread counting CIs while the bulk insert
+  runs; reports how many reads finished and the slowest one
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from app.config import settings, SQLiteConfig
+from app.database import Base, configure_sqlite
+from app.models import models
+
+SMALL_COMMITS = 1000
+
+def make_engine(path: str, sqlite: SQLiteConfig):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine, sqlite)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def small_commits(engine) -> float:
+    table = models.ConfigurationItem.__table__
+    start = time.perf_counter()
+    for i in range(SMALL_COMMITS):
+        with engine.begin() as conn:
+            conn.execute(insert(table), {"id": str(uuid.uuid4()), "name": f"CI-{i}", "type": "server", "properties": {}})
+    return time.perf_counter() - start
+
+def bulk_insert(engine, rows: int) -> float:
+    table = models.DiscoveredDataField.__table__
+    batch_size = settings.ingestion.bulk_batch_size
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            conn.execute(insert(table), [
+                {"id": str(uuid.uuid4()), "field_name": "Server Name", "field_value": f"SRV-{i}", "rating": "high"}
+                for i in range(offset, min(rows, offset + batch_size))
+            ])
+    return time.perf_counter() - start
+
+def reads_during_upload(engine, rows: int):
+    done = threading.Event()
+    latencies = []
+    errors = []
+
+    def reader():
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(select(func.count()).select_from(models.ConfigurationItem.__table__)).scalar()
+            except Exception as e:
+                errors.append(e)
+            latencies.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        elapsed = bulk_insert(engine, rows)
+    finally:
+        done.set()
+        thread.join()
+    return elapsed, len(latencies), max(latencies or [0.0]), len(errors)
+
+def run(label: str, sqlite: SQLiteConfig, rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), sqlite)
+        commits = small_commits(engine)
+        bulk = bulk_insert(engine, rows)
+        elapsed, reads, slowest, errors = reads_during_upload(engine, rows)
+        engine.dispose()
+    print(f"{label}:")
+    print(f"  {SMALL_COMMITS} small commits: {commits:.2f}s ({SMALL_COMMITS / commits:.0f}/s)")
+    print(f"  bulk insert of {rows} rows: {bulk:.2f}s")
+    print(f"  reads during upload: {reads} in {elapsed:.2f}s, slowest {slowest * 1000:.0f} ms, {errors} errors")
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    run("SQLite defaults", SQLiteConfig(), rows)
+    run("config.yaml profile", settings.database.sqlite, rows)
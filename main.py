@@ -1,8 +1,9 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from app.api import prepare, map as mapping, plan, move, evaluate, data_dictionary, data_entities, discovered_data, environments, move_principles, score_card, users, admin_project
+from app.api import prepare, map as mapping, plan, move, evaluate, data_dictionary, data_entities, discovered_data, environments, move_principles, score_card, users, admin_project, jobs, exports
 from app.config import settings
+from app.utils.compression import CompressionMiddleware
 import os
 
 app = FastAPI(
@@ -11,6 +12,8 @@ app = FastAPI(
     version=settings.app.version
 )
 
+app.add_middleware(CompressionMiddleware, config=settings.compression)
+
 # Include Routers
 app.include_router(prepare.router)
 app.include_router(mapping.router)
@@ -25,6 +28,8 @@ app.include_router(move_principles.router)
 app.include_router(score_card.router)
 app.include_router(users.router)
 app.include_router(admin_project.router)
+app.include_router(jobs.router)
+app.include_router(exports.router)
 
 # Mount Static Files
 base_dir = os.path.dirname(os.path.abspath(__file__))
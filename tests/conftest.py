@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def another_worker():
+    # Runs storage code in a separate process with its own engine, counters
+    # and caches, like another uvicorn worker sharing the database; returns
+    # the last line the code printed
+    def run(code: str) -> str:
+        result = subprocess.run([sys.executable, "-c", "import main\nfrom app.services.storage import storage\n" + code],
+                                cwd=ROOT, check=True, capture_output=True, text=True)
+        lines = result.stdout.strip().splitlines()
+        return lines[-1] if lines else ""
+    return run
@@ -0,0 +1,100 @@
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from main import app
+from app.config import settings
+from app.database import SessionLocal, _call_in_session, async_engine, engine
+from app.models import models
+from app.services.cache import ReadCache
+from app.services.storage import storage
+from app.services.table_versions import table_versions
+
+client = TestClient(app)
+
+def _count_queries(fn):
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", count)
+    try:
+        result = fn()
+    finally:
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "before_cursor_execute", count)
+    return result, statements
+
+def _shared_version(table: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(models.TableVersion.version).where(models.TableVersion.table_name == table)).scalar()
+
+def test_reference_reads_are_served_from_cache(monkeypatch):
+    # No shared version poll falls between the two reads
+    monkeypatch.setattr(settings.cache, "sync_interval", 60.0)
+    for path in ["/environments/", "/move-principles/", "/score-card/factors", "/data-entities", "/data-dictionary/fields"]:
+        first = client.get(path)
+        second, statements = _count_queries(lambda: client.get(path))
+        assert second.json() == first.json(), path
+        assert statements == [], path
+    metrics = client.get("/jobs/cache").json()
+    assert metrics["hits"] >= 5
+    assert metrics["methods"]["get_environments"]["hits"] >= 1
+
+def test_writes_invalidate_cached_reads():
+    client.get("/environments/")
+    shared = _shared_version("environments")
+    env_id = client.post("/environments/", json={"name": "Cache-Env"}).json()
+    assert any(e["id"] == env_id for e in client.get("/environments/").json())
+    assert _shared_version("environments") == shared + 1
+
+    client.put(f"/environments/{env_id}", json={"description": "Updated"})
+    assert [e["description"] for e in client.get("/environments/").json() if e["id"] == env_id] == ["Updated"]
+    client.delete(f"/environments/{env_id}")
+    assert all(e["id"] != env_id for e in client.get("/environments/").json())
+
+def test_unit_of_work_sees_its_own_writes_only():
+    storage.get_environments()
+    with SessionLocal() as db:
+        def add_and_list():
+            storage.add_environment({"id": "cache-uncommitted", "name": "Uncommitted"})
+            return storage.get_environments()
+        assert any(e["id"] == "cache-uncommitted" for e in _call_in_session(db, add_and_list, (), {}))
+        db.rollback()
+    assert all(e["id"] != "cache-uncommitted" for e in storage.get_environments())
+
+def test_writes_of_other_workers_are_picked_up_on_sync(monkeypatch, another_worker):
+    # Polls happen only where the test forces them
+    monkeypatch.setattr(settings.cache, "sync_interval", 60.0)
+    monkeypatch.setattr(table_versions, "_next_sync", 0.0)
+    # Records the shared versions the other worker's writes are compared with
+    client.get("/environments/")
+
+    # Cached reads
+    another_worker('storage.add_environment({"id": "cache-other-worker", "name": "Other Worker"})')
+    assert all(e["id"] != "cache-other-worker" for e in storage.get_environments())
+    table_versions._next_sync = 0.0
+    assert any(e["id"] == "cache-other-worker" for e in storage.get_environments())
+
+    # Revalidations, which answer 304 without reading through the cache
+    etag = client.get("/environments/").headers["ETag"]
+    another_worker('storage.delete_environment("cache-other-worker")')
+    assert client.get("/environments/", headers={"If-None-Match": etag}).status_code == 304
+    table_versions._next_sync = 0.0
+    revalidated = client.get("/environments/", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 200
+    assert all(e["id"] != "cache-other-worker" for e in revalidated.json())
+
+def test_ttl_and_max_entries():
+    cache = ReadCache(ttl=0.05, max_entries=2)
+    cache.put(("a",), (1,), ["a"])
+    assert cache.get(("a",), (1,)) == (True, ["a"])
+    assert cache.get(("a",), (2,)) == (False, None)
+    cache.put(("a",), (1,), ["a"])
+    time.sleep(0.06)
+    assert cache.get(("a",), (1,)) == (False, None)
+    for name in "bcd":
+        cache.put((name,), (1,), [name])
+    assert cache.get(("b",), (1,)) == (False, None)
+    metrics = cache.metrics()
+    assert (metrics["stale"], metrics["expired"], metrics["evictions"], metrics["entries"]) == (1, 1, 1, 2)
+    assert metrics["hit_rate"] == 0.25
@@ -0,0 +1,80 @@
+import gzip
+import json
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.config import CompressionConfig
+from app.utils.compression import CompressionMiddleware, negotiate
+
+ROWS = [{"id": i, "name": f"SRV-{i:06d}", "type": "server", "properties": {"cpu": 4}} for i in range(500)]
+
+def _client(**config) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, config=CompressionConfig(**config))
+
+    @app.get("/rows")
+    async def rows():
+        return ROWS
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" + b"\x00" * 4096, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for row in ROWS:
+                yield (json.dumps(row) + "\n").encode()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+def _raw(client: TestClient, path: str, accept_encoding: str):
+    # Read the bytes as sent, without httpx decoding them
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+def test_gzip_large_json():
+    response, body = _raw(_client(encodings=["gzip"]), "/rows", "gzip, deflate")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert json.loads(gzip.decompress(body)) == ROWS
+
+def test_small_excluded_and_unrequested_bodies_are_sent_as_is():
+    client = _client()
+    for path, accept_encoding in [("/small", "gzip"), ("/image", "gzip"), ("/rows", "identity")]:
+        response, _ = _raw(client, path, accept_encoding)
+        assert "content-encoding" not in response.headers, path
+    assert "vary" not in _raw(client, "/image", "gzip")[0].headers
+    assert _raw(client, "/rows", "gzip")[0].headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in _raw(_client(enabled=False), "/rows", "gzip")[0].headers
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk():
+    response, body = _raw(_client(encodings=["gzip"]), "/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [json.loads(line) for line in gzip.decompress(body).splitlines()] == ROWS
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip("brotli")
+    client = _client(encodings=["br", "gzip"])
+    response, body = _raw(client, "/rows", "gzip, deflate, br")
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(body)) == ROWS
+    response, body = _raw(client, "/stream", "br")
+    assert [json.loads(line) for line in brotli.decompress(body).splitlines()] == ROWS
+
+def test_negotiate():
+    assert negotiate("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert negotiate("gzip, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate("br;q=0, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("*", ["gzip"]) == "gzip"
+    assert negotiate("gzip;q=0, *", ["gzip"]) is None
+    assert negotiate("", ["br", "gzip"]) is None
+    assert negotiate("deflate", ["br", "gzip"]) is None
@@ -21,3 +21,33 @@ def test_config_loading():
     assert settings.app.host == "0.0.0.0"
     assert settings.app.port == 8000
     assert settings.app.reload is True
+
+def test_sqlite_profile_is_applied_to_connections():
+    from sqlalchemy import text
+    from app.database import engine
+    sqlite = settings.database.sqlite
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().upper() == sqlite.journal_mode
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == sqlite.busy_timeout
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == sqlite.cache_size
+
+def test_engine_options_per_backend():
+    from app.config import DatabaseConfig
+    from app.database import engine_options
+    options = engine_options(DatabaseConfig(url="sqlite:///./prototype.db"))
+    assert options["connect_args"] == {"check_same_thread": False}
+    assert "pool_size" not in options
+
+    options = engine_options(DatabaseConfig(
+        url="postgresql+psycopg://db.internal:5432/nubirix",
+        username="nubirix",
+        password="p@ss:word",
+        pool_size=20,
+        statement_timeout=15000
+    ))
+    assert options["url"].username == "nubirix"
+    assert options["url"].password == "p@ss:word"
+    assert options["url"].host == "db.internal"
+    assert options["pool_size"] == 20
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=15000"}
@@ -0,0 +1,96 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from main import app
+from app.config import settings
+from app.database import async_engine, engine
+from app.services.table_versions import table_versions
+
+client = TestClient(app)
+
+VERSIONED_LISTS = [
+    "/map/workloads", "/map/dependencies", "/map/s2t", "/prepare/items",
+    "/prepare/field-mappings", "/environments/", "/score-card/factors"
+]
+
+def _count_queries(fn):
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", count)
+    try:
+        response = fn()
+    finally:
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "before_cursor_execute", count)
+    return response, statements
+
+def test_unchanged_lists_answer_304_without_queries(monkeypatch):
+    # The first request polls the shared versions; no poll falls due after it
+    monkeypatch.setattr(settings.cache, "sync_interval", 60.0)
+    monkeypatch.setattr(table_versions, "_next_sync", 0.0)
+    for path in VERSIONED_LISTS:
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "no-cache"
+
+        revalidated, statements = _count_queries(lambda: client.get(path, headers={"If-None-Match": etag}))
+        assert revalidated.status_code == 304, path
+        assert revalidated.content == b""
+        assert revalidated.headers["ETag"] == etag
+        assert statements == [], path
+
+        assert client.get(path, headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+
+def test_writes_change_the_etag_of_affected_lists():
+    workloads = client.get("/map/workloads").headers["ETag"]
+    environments = client.get("/environments/").headers["ETag"]
+
+    client.post("/map/workloads", json={"name": "ETag-Workload"})
+    changed = client.get("/map/workloads", headers={"If-None-Match": workloads})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != workloads
+    assert any(w["name"] == "ETag-Workload" for w in changed.json())
+    # Other tables keep their versions
+    assert client.get("/environments/", headers={"If-None-Match": environments}).status_code == 304
+
+    env_id = client.post("/environments/", json={"name": "ETag-Env"}).json()
+    after_add = client.get("/environments/").headers["ETag"]
+    assert after_add != environments
+    client.delete(f"/environments/{env_id}")
+    assert client.get("/environments/").headers["ETag"] != after_add
+
+def test_rolled_back_writes_do_not_bump_versions():
+    from app.database import SessionLocal
+    from app.models import models
+    before = table_versions.etag("environments")
+    with SessionLocal() as db:
+        db.add(models.Environment(id="etag-rolled-back", name="Rolled-Back"))
+        db.flush()
+        db.rollback()
+        db.commit()
+    assert table_versions.etag("environments") == before
+
+def test_writes_of_other_workers_change_the_etag(monkeypatch, another_worker):
+    monkeypatch.setattr(table_versions, "_next_sync", 0.0)
+    etag = client.get("/map/workloads").headers["ETag"]
+    assert client.get("/map/workloads", headers={"If-None-Match": etag}).status_code == 304
+
+    another_worker('storage.add_workload({"name": "ETag-Other-Worker"})')
+    # Revalidations within cache.sync_interval may still get 304
+    table_versions._next_sync = 0.0
+    revalidated = client.get("/map/workloads", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 200
+    assert any(w["name"] == "ETag-Other-Worker" for w in revalidated.json())
+
+def test_workers_send_the_same_etag_for_the_same_data(monkeypatch, another_worker):
+    other_etag = 'from app.services.table_versions import table_versions\ntable_versions.sync()\nprint(table_versions.etag("workloads", "workload_ci"))'
+    monkeypatch.setattr(table_versions, "_next_sync", 0.0)
+    etag = client.get("/map/workloads").headers["ETag"]
+    assert another_worker(other_etag) == etag
+
+    client.post("/map/workloads", json={"name": "ETag-Shared-Workload"})
+    changed = client.get("/map/workloads").headers["ETag"]
+    assert changed != etag
+    assert another_worker(other_etag) == changed
@@ -0,0 +1,59 @@
+import asyncio
+import csv
+import io
+import json
+from fastapi.testclient import TestClient
+from main import app
+from app.config import settings
+from app.services.exports import stream_export
+
+client = TestClient(app)
+
+def _ndjson(name: str):
+    response = client.get(f"/exports/{name}")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def _by_id(rows):
+    return {row["id"]: row for row in rows}
+
+def test_ndjson_exports_match_list_endpoints():
+    ci = client.post("/prepare/items", json={"name": "Export-Server", "type": "server", "properties": {"cpu": 4}}).json()
+    client.post("/map/workloads", json={"name": "Export-Workload", "ci_ids": [ci["id"]]})
+
+    assert _by_id(_ndjson("cis")) == _by_id(client.get("/prepare/items").json())
+    exported = _by_id(_ndjson("workloads"))
+    listed = _by_id(client.get("/map/workloads").json())
+    assert exported.keys() == listed.keys()
+    for workload_id, workload in listed.items():
+        assert sorted(exported[workload_id].pop("ci_ids")) == sorted(workload.pop("ci_ids"))
+        assert exported[workload_id] == workload
+    exported = _by_id(_ndjson("discovered-data"))
+    listed = _by_id(client.get("/discovered-data").json())
+    assert exported.keys() == listed.keys()
+    for entity_id, entity in listed.items():
+        assert _by_id(exported[entity_id].pop("fields")) == _by_id(entity.pop("fields"))
+        assert exported[entity_id] == entity
+    assert len(_ndjson("dependencies")) == len(client.get("/map/dependencies").json())
+
+def test_csv_export_has_one_row_per_discovered_field():
+    response = client.get("/exports/discovered-data", params={"format": "csv"})
+    assert response.headers["content-disposition"] == 'attachment; filename="discovered-data.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    listed = client.get("/discovered-data").json()
+    assert len(rows) == sum(max(len(e["fields"]), 1) for e in listed)
+
+    rows = list(csv.DictReader(io.StringIO(client.get("/exports/cis", params={"format": "csv"}).text)))
+    assert all(isinstance(json.loads(row["properties"]), (dict, type(None))) for row in rows if row["properties"])
+
+def test_export_is_streamed_in_partitions(monkeypatch):
+    monkeypatch.setattr(settings.exports, "yield_per", 2)
+
+    async def chunks():
+        return [chunk async for chunk in stream_export("cis", "ndjson")]
+
+    chunks = asyncio.run(chunks())
+    cis = client.get("/prepare/items").json()
+    assert len(chunks) == (len(cis) + 1) // 2
+    assert all(chunk.count(b"\n") <= 2 for chunk in chunks)
@@ -0,0 +1,275 @@
+from fastapi.testclient import TestClient
+from main import app
+import io
+
+client = TestClient(app)
+
+def _csv(rows: int) -> bytes:
+    lines = ["Server Name,Environment,IP Address"]
+    for i in range(rows):
+        lines.append(f"SRV-BULK-{i:05d},PROD,10.9.{i // 250}.{i % 250}")
+    return "\n".join(lines).encode()
+
+def test_upload_ingests_all_rows():
+    files = {"file": ("bulk.csv", io.BytesIO(_csv(250)), "text/csv")}
+    response = client.post("/prepare/upload", data={
+        "name": "Bulk Upload Test",
+        "rating": "high",
+        "worksheet": "bulk",
+        "header_row": 1
+    }, files=files)
+    assert response.status_code == 200
+    data = response.json()
+    # The former 100-row prototype cap no longer applies
+    assert data["rows_ingested"] == 250
+    assert data["rows_per_second"] > 0
+
+    response = client.get(f"/prepare/data-sources/{data['source_id']}/discovered-data")
+    entities = response.json()
+    assert len(entities) == 250
+    assert all(len(e["fields"]) == 3 for e in entities)
+    assert any(f["field_value"] == "SRV-BULK-00249" for e in entities for f in e["fields"])
+
+def test_upload_streams_csv_in_chunks(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings.ingestion, "csv_chunk_size", 40)
+    files = {"file": ("chunked.csv", io.BytesIO(_csv(130)), "text/csv")}
+    response = client.post("/prepare/upload", data={
+        "name": "Chunked Upload Test",
+        "rating": "medium",
+        "worksheet": "chunked",
+        "header_row": 1
+    }, files=files)
+    assert response.status_code == 200
+    source_id = response.json()["source_id"]
+
+    sources = client.get("/prepare/data-sources").json()
+    source = next(s for s in sources if s["id"] == source_id)
+    assert source["records"] == 130
+    assert source["status"] == "Success"
+
+    response = client.get(f"/prepare/data-sources/{source_id}/discovered-data")
+    assert len(response.json()) == 130
+
+def test_background_upload_job_reports_progress():
+    import time
+    files = {"file": ("background.csv", io.BytesIO(_csv(60)), "text/csv")}
+    response = client.post("/prepare/upload", data={
+        "name": "Background Upload Test",
+        "rating": "low",
+        "worksheet": "background",
+        "header_row": 1,
+        "background": "true"
+    }, files=files)
+    assert response.status_code == 202
+    accepted = response.json()
+    assert accepted["job_id"] and accepted["source_id"]
+    documented = app.openapi()["paths"]["/prepare/upload"]["post"]["responses"]["202"]
+    assert documented["content"]["application/json"]["schema"]["$ref"].endswith("/IngestionJobAccepted")
+
+    job = None
+    for _ in range(100):
+        job = client.get(f"/jobs/{accepted['job_id']}").json()
+        if job["status"] in ("Completed", "Failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "Completed"
+    assert job["rows_processed"] == 60
+    assert job["current_worksheet"] == "background"
+    assert job["result"]["rows_ingested"] == 60
+
+    sources = client.get("/prepare/data-sources").json()
+    source = next(s for s in sources if s["id"] == accepted["source_id"])
+    assert source["status"] == "Success"
+
+def test_unknown_job_returns_404():
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+def test_ci_ingest_inserts_each_chunk_in_one_batch(monkeypatch):
+    from sqlalchemy import event
+    from app.config import settings
+    from app.database import async_engine, engine
+    monkeypatch.setattr(settings.ingestion, "csv_chunk_size", 10)
+    rows = [f"Batch-CI-{i},server,Batched,{{}}" for i in range(25)] + ['Batch-CI-bad,server,Invalid,"{not json"']
+    content = "name,type,description,properties\n" + "\n".join(rows) + "\n"
+    inserts = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO configuration_items"):
+            inserts.append(executemany)
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", count)
+    try:
+        response = client.post("/prepare/ingest", files={"file": ("cis.csv", io.BytesIO(content.encode()), "text/csv")})
+    finally:
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "before_cursor_execute", count)
+    assert response.status_code == 200
+    assert inserts == [True, True, True]
+    names = {item["name"] for item in client.get("/prepare/items").json()}
+    assert {f"Batch-CI-{i}" for i in range(25)} <= names
+    assert "Batch-CI-bad" not in names
+
+def test_failed_job_is_logged_with_traceback(caplog):
+    from app.services.jobs import JobManager
+    def fail(job=None):
+        raise ValueError("broken worksheet")
+    manager = JobManager(max_workers=1)
+    with caplog.at_level("ERROR", logger="app.services.jobs"):
+        job = manager.submit("upload", fail)
+        manager._executor.shutdown(wait=True)
+    assert job.status == "Failed" and job.errors == ["broken worksheet"]
+    record = next(r for r in caplog.records if job.id in r.getMessage())
+    assert record.exc_info[0] is ValueError
+
+def test_columnar_layout_reads_back_like_rows(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings.ingestion, "discovered_data_layout", "columnar")
+    files = {"file": ("columnar.csv", io.BytesIO(_csv(20)), "text/csv")}
+    response = client.post("/prepare/upload", data={
+        "name": "Columnar Upload Test",
+        "rating": "high",
+        "worksheet": "columnar",
+        "header_row": 1
+    }, files=files)
+    assert response.status_code == 200
+    source_id = response.json()["source_id"]
+
+    entities = client.get("/discovered-data", params={"data_source_id": source_id}).json()
+    assert len(entities) == 20
+    first = next(e for e in entities if e["fields"][0]["field_value"] == "SRV-BULK-00000")
+    assert [f["field_name"] for f in first["fields"]] == ["Server Name", "Environment", "IP Address"]
+    assert first["fields"][1]["field_value"] == "PROD"
+    assert first["fields"][0]["rating"] == "high"
+
+    fields = client.get(f"/discovered-data/{first['id']}/fields").json()
+    assert fields == first["fields"]
+    assert client.delete(f"/discovered-data/{first['id']}").status_code == 200
+
+def test_discovered_data_filters_match_both_layouts(monkeypatch):
+    from app.config import settings
+    for layout in ["rows", "columnar"]:
+        monkeypatch.setattr(settings.ingestion, "discovered_data_layout", layout)
+        files = {"file": ("filters.csv", io.BytesIO(_csv(20)), "text/csv")}
+        response = client.post("/prepare/upload", data={
+            "name": f"Filter Test {layout}", "rating": "high", "worksheet": "filters", "header_row": 1
+        }, files=files)
+        source_id = response.json()["source_id"]
+
+        def search(**params):
+            response = client.get("/discovered-data", params={"data_source_id": source_id, "include_total": True, **params})
+            assert response.status_code == 200
+            assert int(response.headers["X-Total-Count"]) == len(response.json())
+            return response.json()
+
+        match = search(field_name="Server Name", field_value="SRV-BULK-00007")
+        assert len(match) == 1
+        assert match[0]["fields"][0]["field_value"] == "SRV-BULK-00007"
+        assert len(search(field_value="PROD")) == 20
+        assert search(field_name="Environment", field_value="SRV-BULK-00007") == []
+        assert len(search(field_name="IP Address")) == 20
+        assert len(search(status="Ingested", source_type=match[0]["source_type"])) == 20
+        assert search(status="Published") == []
+        assert search(created_to="2000-01-01T00:00:00") == []
+        assert len(search(created_from="2000-01-01")) == 20
+
+def test_multi_sheet_workbook_upload_honors_header_rows():
+    import json
+    import openpyxl
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Servers"
+    ws.append(["Server Name", "Environment"])
+    for i in range(5):
+        ws.append([f"SRV-WB-{i}", "PROD"])
+    ws = wb.create_sheet("Apps")
+    ws.append(["Exported from CMDB"])
+    ws.append(["Application", "Owner"])
+    for i in range(3):
+        ws.append([f"APP-WB-{i}", "Finance"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+
+    files = {"file": ("inventory.xlsx", buffer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    response = client.post("/prepare/upload", data={
+        "name": "Workbook Upload Test",
+        "rating": "medium",
+        "worksheets_json": json.dumps([
+            {"name": "Servers", "header_row": 1},
+            {"name": "Apps", "header_row": 2}
+        ])
+    }, files=files)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["rows_ingested"] == 8
+
+    entities = client.get(f"/prepare/data-sources/{data['source_id']}/discovered-data").json()
+    apps = [e for e in entities if e["data_entity_name"] == "Apps"]
+    assert len(apps) == 3
+    assert [f["field_name"] for f in apps[0]["fields"]] == ["Application", "Owner"]
+
+def _workbook(tmp_path, rows):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    for row in rows:
+        wb.active.append(row)
+    path = str(tmp_path / "sheet.xlsx")
+    wb.save(path)
+    return path
+
+def test_workbook_reader_header_without_rows(tmp_path):
+    import pandas as pd
+    from app.utils.workbook import WorkbookReader
+    path = _workbook(tmp_path, [["Host", "IP"]])
+    with WorkbookReader(path) as reader:
+        chunks = list(reader.iter_chunks())
+    assert len(chunks) == 1
+    assert list(chunks[0].columns) == list(pd.read_excel(path).columns) == ["Host", "IP"]
+    assert len(chunks[0]) == 0
+
+def test_workbook_reader_widens_for_wider_later_rows(tmp_path):
+    import pandas as pd
+    from app.utils.workbook import WorkbookReader
+    path = _workbook(tmp_path, [["Host", "IP"], ["a", "1"], ["b", "2"], ["c", "3", "extra", "more"]])
+    with WorkbookReader(path) as reader:
+        chunks = list(reader.iter_chunks(chunk_size=2))
+    assert [list(c.columns) for c in chunks] == [["Host", "IP"], list(pd.read_excel(path).columns)]
+    assert chunks[1].iloc[0].tolist() == ["c", "3", "extra", "more"]
+
+def test_header_only_worksheet_still_gets_field_mappings():
+    import openpyxl
+    wb = openpyxl.Workbook()
+    wb.active.title = "Empty"
+    wb.active.append(["Header Only Host", "Header Only IP"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    files = {"file": ("header_only.xlsx", buffer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    response = client.post("/prepare/upload", data={
+        "name": "Header Only Test", "rating": "low", "worksheet": "Empty", "header_row": 1
+    }, files=files)
+    assert response.status_code == 200
+    assert response.json()["rows_ingested"] == 0
+    mappings = [m for m in client.get("/prepare/field-mappings").json() if m["data_source"] == "Header Only Test"]
+    assert sorted(m["source_field"] for m in mappings) == ["Header Only Host", "Header Only IP"]
+
+def test_columnar_sheet_columns_widen_with_later_chunks(monkeypatch):
+    import openpyxl
+    from app.config import settings
+    monkeypatch.setattr(settings.ingestion, "discovered_data_layout", "columnar")
+    monkeypatch.setattr(settings.ingestion, "csv_chunk_size", 2)
+    wb = openpyxl.Workbook()
+    wb.active.title = "Wide"
+    for row in [["Host", "IP"], ["w-a", "1"], ["w-b", "2"], ["w-c", "3", "late"]]:
+        wb.active.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    files = {"file": ("wide.xlsx", buffer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    response = client.post("/prepare/upload", data={
+        "name": "Widening Test", "rating": "low", "worksheet": "Wide", "header_row": 1
+    }, files=files)
+    entities = client.get("/discovered-data", params={"data_source_id": response.json()["source_id"]}).json()
+    fields = {e["fields"][0]["field_value"]: [(f["field_name"], f["field_value"]) for f in e["fields"]] for e in entities}
+    assert fields["w-a"] == [("Host", "w-a"), ("IP", "1")]
+    assert fields["w-c"] == [("Host", "w-c"), ("IP", "3"), ("Unnamed: 2", "late")]
@@ -0,0 +1,85 @@
+from sqlalchemy import create_engine, event, inspect, text
+from app.models import models
+from app.services import migrations
+
+def _engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+
+def test_current_schema_skips_introspection(tmp_path):
+    engine = _engine(tmp_path)
+    assert migrations.migrate(engine) == migrations.LATEST_VERSION
+    with engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_version ORDER BY version"))]
+    assert versions == [step for step, _, _ in migrations.MIGRATIONS]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        migrations.migrate(engine)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+
+def test_legacy_database_is_upgraded(tmp_path, caplog):
+    engine = _engine(tmp_path)
+    migrations.migrate(engine)
+    # Roll the database back to a schema from before the migrations
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_workloads_name_environment"))
+        conn.execute(text("DROP INDEX ix_dependencies_source_workload_id"))
+        conn.execute(text("ALTER TABLE field_mappings DROP COLUMN values_fingerprint"))
+        conn.execute(text("DROP TABLE schema_version"))
+    assert migrations.schema_version(engine) == 0
+
+    with caplog.at_level("INFO", logger="app.services.migrations"):
+        assert migrations.migrate(engine) == migrations.LATEST_VERSION
+    assert [r.getMessage() for r in caplog.records][0].startswith("Migrating database schema to version 1:")
+    inspector = inspect(engine)
+    assert "values_fingerprint" in [c["name"] for c in inspector.get_columns("field_mappings")]
+    assert "ix_workloads_name_environment" in [i["name"] for i in inspector.get_indexes("workloads")]
+    assert "ix_dependencies_source_workload_id" in [i["name"] for i in inspector.get_indexes("dependencies")]
+
+def test_steps_applied_by_another_worker_are_skipped(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    migrations.migrate(engine)
+    # Each step runs twice against the same database
+    for step, description, apply in migrations.MIGRATIONS:
+        with engine.begin() as conn:
+            apply(conn)
+
+    # A worker that checked the schema before another worker's DDL, and whose
+    # schema_version row then conflicts with the other worker's
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM schema_version"))
+    column = models.FieldMapping.__table__.c.values_fingerprint
+    index = next(ix for ix in models.Workload.__table__.indexes if ix.name == "ix_workloads_name_environment")
+    attempts = []
+
+    def stale_column(conn):
+        attempts.append("column")
+        if attempts.count("column") == 1:
+            migrations._add_column(conn, column)
+
+    def stale_index(conn):
+        attempts.append("index")
+        if attempts.count("index") == 1:
+            index.create(conn)
+
+    def stamped_by_other_worker(conn):
+        attempts.append("stamp")
+        if attempts.count("stamp") == 1:
+            with engine.begin() as other:
+                other.execute(text("INSERT INTO schema_version (version, description) VALUES (3, 'other worker')"))
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        (1, "Stale column check", stale_column),
+        (2, "Stale index check", stale_index),
+        (3, "Applied by another worker", stamped_by_other_worker),
+    ])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", 3)
+    assert migrations.migrate(engine) == 3
+    # The retry finds the other worker's row and skips the step
+    assert attempts == ["column", "column", "index", "index", "stamp"]
+    with engine.connect() as conn:
+        assert [row[0] for row in conn.execute(text("SELECT version FROM schema_version ORDER BY version"))] == [1, 2, 3]
@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.utils.pagination import encode_cursor
+
+client = TestClient(app)
+
+def _pages(path: str, limit: int):
+    rows, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit, "include_total": True}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= limit
+        rows.extend(page)
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows, pages, int(response.headers["X-Total-Count"])
+
+def test_paging_returns_every_row_once():
+    for i in range(5):
+        client.post("/prepare/items", json={"name": f"Page-Server-{i}", "type": "server", "properties": {}})
+    unpaged = client.get("/prepare/items")
+    assert "X-Next-Cursor" not in unpaged.headers
+    everything = unpaged.json()
+
+    rows, pages, total = _pages("/prepare/items", 2)
+    assert total == len(everything)
+    assert pages == (len(everything) + 1) // 2
+    assert sorted(r["id"] for r in rows) == sorted(r["id"] for r in everything)
+    assert [r["id"] for r in rows] == sorted(r["id"] for r in rows)
+
+def test_dependencies_page_on_integer_ids():
+    source, target = [client.post("/map/workloads", json={"name": f"Page-Workload-{i}"}).json()["id"] for i in range(2)]
+    for _ in range(3):
+        client.post("/map/dependencies", json={"source_workload_id": source, "target_workload_id": target})
+    everything = client.get("/map/dependencies").json()
+    rows, _, total = _pages("/map/dependencies", 2)
+    assert total == len(everything) == len(rows)
+    # The row id used for the cursor is not part of the response
+    assert all("id" not in r for r in rows)
+
+def test_invalid_cursor_is_rejected():
+    response = client.get("/map/workloads", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    # Well-formed cursors holding a key of the wrong type
+    for path, key in [("/map/workloads", [1]), ("/map/workloads", {"id": "x"}), ("/map/workloads", 5),
+                      ("/map/dependencies", "abc"), ("/map/dependencies", [1]), ("/map/dependencies", True)]:
+        response = client.get(path, params={"cursor": encode_cursor(key)})
+        assert response.status_code == 400, (path, key)
@@ -0,0 +1,224 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.config import settings
+from app.services.recommendations import recommend_fields_batch
+from app.services.storage import storage
+from app.services.table_versions import table_versions
+from app.utils.recommender import RecommenderIndex, get_field_recommendation
+
+client = TestClient(app)
+
+DATA_FIELDS = [
+    {"id": "f-host", "name": "Hostname", "entity": "Server", "standard_values": []},
+    {"id": "f-os", "name": "Operating System", "entity": "Server", "standard_values": [
+        {"id": "sv-1", "field_id": "f-os", "value": "Windows"},
+        {"id": "sv-2", "field_id": "f-os", "value": "Linux"}
+    ]},
+    {"id": "f-db", "name": "Database Technology", "entity": "Database", "standard_values": []}
+]
+ENTITIES = [
+    {"id": "e-app", "name": "Application", "fields": [{"id": "ef-1", "name": "Owner"}]}
+]
+
+# Results of the per-call scorer before the index was introduced
+BASELINE = [
+    ("Server Name", ["srv-01"], ("Server", "Hostname", "f-host")),
+    ("Server - OS", ["Windows", "Linux"], ("Server", "Operating System", "f-os")),
+    ("Server - OS", ["Windows"], ("Server", "Operating System", "f-os")),
+    ("Platform", ["windows", "linux", "aix"], ("Server", "Operating System", "f-os")),
+    ("Platform", [], ("Application", None, None)),
+    ("Application Owner", ["Finance"], ("Application", None, None)),
+    ("Application", [], ("Application", None, None)),
+    ("Owner", [], ("Application", "Owner", None)),
+    ("Databases", [], ("Database", "Database Technology", "f-db")),
+    ("Database | Technology", [], ("Database", "Database Technology", "f-db")),
+    ("DB Tech", [], ("Database", "Database Technology", "f-db")),
+    ("Host Name", [], ("Server", "Hostname", "f-host")),
+    ("Server: Hostname", [], ("Server", "Hostname", "f-host")),
+    ("OS Type", [], ("Server", "Hostname", "f-host")),
+    ("Operating Systems", [], ("Server", "Operating System", "f-os")),
+    ("Unrelated", ["x"], (None, None, None)),
+]
+
+def test_index_matches_baseline_recommendations():
+    index = RecommenderIndex(DATA_FIELDS, ENTITIES)
+    for source_field, values, expected in BASELINE:
+        assert index.recommend(source_field, values) == expected, source_field
+        # Repeated headers are served from the name score memo
+        assert index.recommend(source_field, values) == expected, source_field
+    for source_field, values, expected in BASELINE:
+        assert get_field_recommendation(source_field, values, DATA_FIELDS, ENTITIES) == expected, source_field
+
+def test_recommender_index_is_cached_until_dictionary_changes():
+    index = storage.get_recommender_index()
+    assert storage.get_recommender_index() is index
+
+    field_id = storage.add_data_field({"name": "Recommender Cache Probe", "entity": "Server"})
+    rebuilt = storage.get_recommender_index()
+    assert rebuilt is not index
+    assert any(t["id"] == field_id for t in rebuilt.targets)
+
+    storage.add_standard_value({"field_id": field_id, "value": "probe-value"})
+    assert storage.get_recommender_index() is not rebuilt
+    assert storage.get_recommender_index().recommend("Probe Column", ["probe-value"])[2] == field_id
+
+def test_dictionary_edits_of_other_workers_rebuild_the_index(monkeypatch, another_worker):
+    monkeypatch.setattr(table_versions, "_next_sync", 0.0)
+    index = storage.get_recommender_index()
+    assert storage.get_recommender_index() is index
+
+    another_worker('field_id = storage.add_data_field({"id": "other-worker-probe", "name": "Other Worker Probe", "entity": "Server"})\n'
+                   'storage.add_standard_value({"field_id": field_id, "value": "other-worker-value"})')
+    table_versions._next_sync = 0.0
+    rebuilt = storage.get_recommender_index()
+    assert rebuilt is not index
+    assert rebuilt.recommend("Probe Column", ["other-worker-value"])[2] == "other-worker-probe"
+    assert "other-worker-probe" in storage.get_standard_value_index()["other-worker-value"]
+
+def test_standard_value_index_tracks_new_values():
+    field_id = storage.add_data_field({"name": "Value Index Probe", "entity": "Server"})
+    storage.get_standard_value_index()
+    storage.add_standard_value({"field_id": field_id, "value": " Value-Index-Probe "})
+    assert field_id in storage.get_standard_value_index()["value-index-probe"]
+
+    # Large samples resolve through the index the same way as the per-call scan
+    values = ["Linux", "Windows"] * 5 + [f"noise-{i}" for i in range(5000)]
+    index = RecommenderIndex(DATA_FIELDS, ENTITIES)
+    # Ten matches out of 5002 distinct values are too few for the value boost
+    assert index.recommend("Platform", values) == ("Application", None, None)
+
+def test_trigram_shortlist_finds_matches_in_large_dictionary():
+    fields = list(DATA_FIELDS)
+    for i in range(2000):
+        fields.append({"id": f"bulk-{i}", "name": f"Attribute {i}", "entity": f"Catalog {i % 40}", "standard_values": []})
+    index = RecommenderIndex(fields, ENTITIES, shortlist_size=5)
+    # Expected results of the per-call scorer before the index was introduced
+    expected = [
+        ("Server Name", [], ("Server", "Hostname", "f-host")),
+        ("Server - OS", ["Linux"], ("Server", "Operating System", "f-os")),
+        ("Platform", ["windows", "linux"], ("Server", "Operating System", "f-os")),
+        ("Catalog 7 | Attribute 287", [], ("Catalog 7", "Attribute 287", "bulk-287")),
+        ("Attribute 1999", [], ("Catalog 39", "Attribute 1999", "bulk-1999")),
+        ("Catalogs - Attrib 12", [], ("Catalog 0", "Attribute 120", "bulk-120")),
+        ("Atribute 5", [], ("Catalog 5", "Attribute 5", "bulk-5")),
+    ]
+    for source_field, values, match in expected:
+        assert index.recommend(source_field, values) == match, source_field
+
+def test_small_dictionary_scores_names_sharing_no_trigram():
+    # "Platform" shares no trigram with "Application" but is a close enough fuzzy match
+    index = RecommenderIndex(DATA_FIELDS, ENTITIES, shortlist_size=5)
+    assert index.recommend("Platform", []) == ("Application", None, None)
+    assert index.recommend("Platform", ["x"]) == ("Application", None, None)
+
+def test_recommend_fields_batch_matches_single_columns(monkeypatch):
+    index = RecommenderIndex(DATA_FIELDS, ENTITIES)
+    columns = ["Server Name", "Server - OS", "Platform", "Application Owner", "", "Unrelated"]
+    samples = {"Server - OS": ["Windows"], "Platform": ["linux", "windows"]}
+    expected = [index.recommend(c, samples.get(c)) if c else (None, None, None) for c in columns]
+    assert recommend_fields_batch(columns, samples, index) == expected
+
+    # Wide worksheets are split across worker processes
+    from app.services.workers import WorkerPools, worker_pools
+    pool = WorkerPools(1, 2, 8).processes
+    monkeypatch.setattr(settings.recommender, "process_pool_min_columns", 2)
+    monkeypatch.setattr(worker_pools, "processes", pool)
+    try:
+        assert recommend_fields_batch(columns, samples, RecommenderIndex(DATA_FIELDS, ENTITIES)) == expected
+    finally:
+        pool.shutdown()
+    assert pool.metrics()["completed"] == 2
+
+def test_recommendations_endpoint():
+    response = client.post("/prepare/recommendations", json={
+        "columns": ["Server Name", "Not A Known Column Header"],
+        "samples": {"Server Name": ["srv-01", "srv-02"]}
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["source_field"] for r in data] == ["Server Name", "Not A Known Column Header"]
+    index = storage.get_recommender_index()
+    entity, field, field_id = index.recommend("Server Name", ["srv-01", "srv-02"])
+    assert data[0]["data_entity"] == entity and data[0]["target_field"] == field
+    assert data[0]["data_dictionary_field_id"] == field_id
+
+def _upload(name: str, content: bytes):
+    import io
+    files = {"file": ("memo.csv", io.BytesIO(content), "text/csv")}
+    response = client.post("/prepare/upload", data={
+        "name": name, "rating": "high", "worksheet": "memo", "header_row": 1
+    }, files=files)
+    assert response.status_code == 200
+    mappings = client.get("/prepare/field-mappings").json()
+    return {m["source_field"]: m for m in mappings if m["data_source"] == name}
+
+def test_repeat_upload_is_answered_from_recommendation_memo(monkeypatch):
+    import uuid
+    content = b"Memo Host Name,Memo OS Type\nsrv-1,Linux\nsrv-2,Windows\n"
+    first = _upload(f"Memo Upload {uuid.uuid4()}", content)
+
+    def no_scoring(*args, **kwargs):
+        raise AssertionError("columns should come from the memo")
+    monkeypatch.setattr(RecommenderIndex, "recommend_batch", no_scoring)
+    second = _upload(f"Memo Upload {uuid.uuid4()}", content)
+    for column in ["Memo Host Name", "Memo OS Type"]:
+        assert (second[column]["data_entity"], second[column]["target_field"]) == \
+            (first[column]["data_entity"], first[column]["target_field"])
+
+def test_resolved_mapping_is_reused_for_same_column():
+    import uuid
+    content = b"Memo Resolved Column,Other\nalpha,1\nbeta,2\n"
+    first = _upload(f"Memo Resolve {uuid.uuid4()}", content)
+    mapping = first["Memo Resolved Column"]
+    response = client.post(f"/prepare/field-mappings/{mapping['id']}", json={
+        "data_entity": "Storage", "target_field": "IOPS", "status": "Resolved"
+    })
+    assert response.status_code == 200
+
+    second = _upload(f"Memo Resolve {uuid.uuid4()}", content)
+    assert second["Memo Resolved Column"]["data_entity"] == "Storage"
+    assert second["Memo Resolved Column"]["target_field"] == "IOPS"
+
+    # Different values in the same column are scored again
+    third = _upload(f"Memo Resolve {uuid.uuid4()}", b"Memo Resolved Column,Other\ngamma,1\n")
+    assert third["Memo Resolved Column"]["target_field"] != "IOPS"
+
+def test_legacy_resolved_mapping_fingerprint_matches_upload_sample(monkeypatch):
+    import uuid
+    from app.database import SessionLocal
+    from app.models import models
+    # More distinct values than recommender.sample_size, so only the first ones are fingerprinted
+    content = b"Memo Legacy Column,Other\n" + b"".join(f"legacy-{i},{i}\n".encode() for i in range(120))
+    for layout in ["rows", "columnar"]:
+        monkeypatch.setattr(settings.ingestion, "discovered_data_layout", layout)
+        mapping = _upload(f"Memo Legacy {uuid.uuid4()}", content)["Memo Legacy Column"]
+        # Mappings created before fingerprints were recorded have none
+        with SessionLocal() as db:
+            db.query(models.FieldMapping).filter(models.FieldMapping.id == mapping["id"]).update({"values_fingerprint": None})
+            db.commit()
+        target = {"rows": "IOPS", "columnar": "Capacity"}[layout]
+        response = client.post(f"/prepare/field-mappings/{mapping['id']}", json={
+            "data_entity": "Storage", "target_field": target, "status": "Resolved"
+        })
+        assert response.status_code == 200
+
+        second = _upload(f"Memo Legacy {uuid.uuid4()}", content)
+        assert (second["Memo Legacy Column"]["data_entity"], second["Memo Legacy Column"]["target_field"]) == ("Storage", target)
+
+def test_memos_scored_against_an_older_dictionary_are_ignored():
+    import uuid
+    from app.utils.recommender import memo_key, values_fingerprint
+    key = (memo_key(f"Memo Version Column {uuid.uuid4()}"), values_fingerprint(["a"]))
+    old_index = storage.get_recommender_index()
+    # A dictionary edit, then a worker still holding the old index remembers what it scored
+    storage.add_data_field({"name": "Memo Version Probe", "entity": "Server"})
+    storage.save_recommendation_memos({key: ("Server", "Stale", None)}, old_index.dictionary_version)
+    assert storage.get_recommendation_memos([key[0]]) == {}
+
+    index = storage.get_recommender_index()
+    assert index.dictionary_version > old_index.dictionary_version
+    storage.save_recommendation_memos({key: ("Server", "Current", None)}, index.dictionary_version)
+    assert storage.get_recommendation_memos([key[0]]) == {key: ("Server", "Current", None)}
+    # An index older than the stored memo does not overwrite it
+    storage.save_recommendation_memos({key: ("Server", "Stale", None)}, old_index.dictionary_version)
+    assert storage.get_recommendation_memos([key[0]]) == {key: ("Server", "Current", None)}
@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.config import settings
+
+client = TestClient(app)
+
+TRUSTED_LISTS = [
+    "/prepare/items", "/prepare/field-mappings", "/map/workloads", "/map/dependencies",
+    "/map/s2t", "/discovered-data"
+]
+
+def test_trusted_payloads_match_validated_responses(monkeypatch):
+    # Rows of every kind, including optional fields left empty
+    client.post("/prepare/items", json={"name": "Trusted-Server", "type": "server", "properties": {"cpu": 2}})
+    source, target = [client.post("/map/workloads", json={
+        "name": f"Trusted-Workload-{i}",
+        "relationships": [{"source_id": "a", "target_id": "b", "type": "depends_on"}]
+    }).json()["id"] for i in range(2)]
+    client.post("/map/dependencies", json={"source_workload_id": source, "target_workload_id": target})
+    client.get(f"/map/s2t/{source}")
+
+    for path in TRUSTED_LISTS:
+        monkeypatch.setattr(settings.responses, "trust_storage_payloads", True)
+        trusted = client.get(path, params={"limit": 50, "include_total": True})
+        monkeypatch.setattr(settings.responses, "trust_storage_payloads", False)
+        validated = client.get(path, params={"limit": 50, "include_total": True})
+        assert trusted.status_code == validated.status_code == 200
+        assert trusted.json() == validated.json(), path
+        assert trusted.headers["X-Total-Count"] == validated.headers["X-Total-Count"]
+        assert trusted.headers.get("X-Next-Cursor") == validated.headers.get("X-Next-Cursor")
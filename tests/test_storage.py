@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from main import app
+from app.database import async_engine, engine, unit_of_work
+from app.services.storage import async_storage, storage
+
+client = TestClient(app)
+
+def test_create_ci_commits_once():
+    commits = []
+    listener = lambda conn: commits.append(1)
+    event.listen(async_engine.sync_engine, "commit", listener)
+    try:
+        response = client.post("/prepare/items", json={
+            "name": "UoW-Server-01",
+            "type": "server",
+            "description": "Unit of work probe",
+            "properties": {"cpu": 8, "ram": "32GB", "os": "Linux"}
+        })
+    finally:
+        event.remove(async_engine.sync_engine, "commit", listener)
+    assert response.status_code == 200
+    # CI, discovered entity and five fields in one transaction
+    assert len(commits) == 1
+
+    entities = client.get("/discovered-data").json()
+    probe = [e for e in entities if any(f["field_value"] == "UoW-Server-01" for f in e["fields"])]
+    assert len(probe) == 1
+    assert len(probe[0]["fields"]) == 5
+
+def test_unit_of_work_rolls_back_on_error():
+    async def failing_request():
+        work = unit_of_work()
+        await work.__anext__()
+        await async_storage.add_environment({"name": "UoW Rollback Probe", "description": "never committed"})
+        assert any(e["name"] == "UoW Rollback Probe" for e in await async_storage.get_environments())
+        try:
+            await work.athrow(RuntimeError("endpoint failed"))
+        except RuntimeError:
+            pass
+
+    asyncio.run(failing_request())
+    assert not any(e["name"] == "UoW Rollback Probe" for e in storage.get_environments())
+
+def test_failed_bulk_insert_leaves_the_unit_of_work_to_roll_back():
+    from app.database import SessionLocal, _call_in_session
+    from app.models import models
+
+    def rows():
+        yield ["srv-1"]
+        raise ValueError("bad row")
+
+    def add_then_fail():
+        storage.add_environment({"id": "uow-bulk-probe", "name": "UoW Bulk Probe"})
+        try:
+            storage.bulk_add_discovered_data({"source_type": "file", "user": "test", "data_entity_name": "Server"}, ["name"], rows())
+        except ValueError:
+            pass
+
+    with SessionLocal() as db:
+        _call_in_session(db, add_then_fail, (), {})
+        # The request's earlier writes are still pending; the unit of work decides
+        assert db.get(models.Environment, "uow-bulk-probe") is not None
+        db.rollback()
+    assert all(e["id"] != "uow-bulk-probe" for e in storage.get_environments())
+
+LISTINGS = [
+    storage.get_workloads, storage.get_waves, storage.get_mdgs, storage.get_data_fields,
+    storage.get_data_entities, storage.get_score_card_factors, storage.get_discovered_data_entities
+]
+
+def _count_queries(fn):
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(queries)
+
+def _add_listing_rows(count: int):
+    for _ in range(count):
+        tag = str(uuid.uuid4())
+        ci_id = storage.add_ci({"name": f"N+1 CI {tag}", "type": "server"})
+        workload_id = storage.add_workload({"name": f"N+1 Workload {tag}", "ci_ids": [ci_id]})
+        mdg_id = storage.add_mdg({"name": f"N+1 MDG {tag}", "workload_ids": [workload_id]})
+        storage.add_wave({"name": f"N+1 Wave {tag}", "workload_ids": [workload_id], "mdg_ids": [mdg_id]})
+        field_id = storage.add_data_field({"name": f"N+1 Field {tag}", "entity": "Server"})
+        storage.add_standard_value({"field_id": field_id, "value": tag})
+        entity_id = storage.add_data_entity({"name": f"N+1 Entity {tag}"})
+        storage.add_data_entity_field({"name": "Owner", "entity_id": entity_id})
+        factor_id = storage.add_score_card_factor({"name": f"N+1 Factor {tag}"})
+        storage.add_score_card_option({"factor_id": factor_id, "name": "High", "score": 3})
+        discovered_id = storage.add_discovered_data_entity({"source_type": "Manual", "user": "test", "data_entity_name": "Server"})
+        storage.add_discovered_data_field({"discovered_data_entity_id": discovered_id, "field_name": "name", "field_value": tag})
+
+def test_listings_use_constant_query_count():
+    _add_listing_rows(1)
+    before = [_count_queries(listing) for listing in LISTINGS]
+    _add_listing_rows(5)
+    after = [_count_queries(listing) for listing in LISTINGS]
+    assert after == before
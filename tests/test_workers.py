@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.services.workers import WorkerPool, WorkerPoolFull
+
+client = TestClient(app)
+
+def test_pool_rejects_work_beyond_max_pending():
+    pool = WorkerPool("thread", lambda n: ThreadPoolExecutor(max_workers=n), 1, 2)
+    release = threading.Event()
+    try:
+        running = pool.submit(release.wait)
+        queued = pool.submit(lambda: 42)
+        with pytest.raises(WorkerPoolFull):
+            pool.submit(lambda: 0)
+        release.set()
+        assert queued.result(timeout=5) == 42
+        running.result(timeout=5)
+    finally:
+        release.set()
+        pool.shutdown()
+    metrics = pool.metrics()
+    assert (metrics["submitted"], metrics["completed"], metrics["rejected"], metrics["pending"]) == (2, 2, 1, 0)
+
+def test_wave_upload_is_parsed_in_worker_process():
+    before = client.get("/jobs/workers").json()["processes"]["completed"]
+    csv = b"name,workload_ids\nWorker Wave A,[]\nWorker Wave B,[]\n"
+    response = client.post("/plan/ingest/waves", files={"file": ("waves.csv", io.BytesIO(csv), "text/csv")})
+    assert response.status_code == 200
+    assert response.json()["message"] == "Successfully ingested 2 waves"
+    assert client.get("/jobs/workers").json()["processes"]["completed"] == before + 1
+    names = [w["name"] for w in client.get("/plan/waves").json()]
+    assert "Worker Wave A" in names and "Worker Wave B" in names